@@ -0,0 +1,205 @@
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Literal
+
+from src.core.request_context import deadline_exhausted
+from src.core.settings import get_settings
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+@dataclass
+class BreakerSnapshot:
+    name: str
+    state: BreakerState
+    calls: int
+    error_rate: float
+    p95_latency_ms: float | None
+    retry_after_seconds: float | None
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for one provider.
+
+    The breaker opens once at least ``min_calls`` recent calls show an error rate
+    at or above ``error_rate_threshold`` or, when latency tracking is enabled, a
+    p95 latency at or above ``p95_latency_ms``. While open, ``allow`` refuses
+    calls so resolvers fall back immediately. After ``cooldown_seconds`` a single
+    half-open probe is let through: success closes the breaker with a fresh
+    window, failure reopens it. A probe that never reports back (for example a
+    cache hit after resolution) is replaced once another cooldown has passed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_size: int,
+        min_calls: int,
+        error_rate_threshold: float,
+        p95_latency_ms: float | None,
+        cooldown_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_latency_ms = p95_latency_ms
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: deque[tuple[bool, float]] = deque(maxlen=window_size)
+        self._state: BreakerState = "closed"
+        self._opened_at = 0.0
+        self._probe_started_at: float | None = None
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            now = self._clock()
+            if self._state == "open":
+                if now - self._opened_at < self.cooldown_seconds:
+                    return False
+                self._state = "half_open"
+            elif (
+                self._probe_started_at is not None
+                and now - self._probe_started_at < self.cooldown_seconds
+            ):
+                return False
+            self._probe_started_at = now
+            return True
+
+    def record_success(self, latency_seconds: float) -> None:
+        self._record(True, latency_seconds)
+
+    def record_failure(self, latency_seconds: float) -> None:
+        self._record(False, latency_seconds)
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Time the enclosed provider call and record its outcome.
+
+        A call that fails once the request's own deadline is (nearly) spent is not
+        recorded: its timeout was set by the caller's budget, not the provider.
+        """
+        started = self._clock()
+        try:
+            yield
+        except Exception:
+            if deadline_exhausted():
+                self._release_probe()
+            else:
+                self.record_failure(self._clock() - started)
+            raise
+        self.record_success(self._clock() - started)
+
+    def p95_latency(self) -> float | None:
+        """p95 latency in milliseconds over the rolling window, if any calls were seen."""
+        with self._lock:
+            return self._p95_locked()
+
+    def snapshot(self) -> BreakerSnapshot:
+        with self._lock:
+            retry_after = None
+            if self._state == "open":
+                retry_after = max(0.0, self.cooldown_seconds - (self._clock() - self._opened_at))
+            p95 = self._p95_locked()
+            return BreakerSnapshot(
+                name=self.name,
+                state=self._state,
+                calls=len(self._outcomes),
+                error_rate=self._error_rate_locked(),
+                p95_latency_ms=round(p95, 1) if p95 is not None else None,
+                retry_after_seconds=retry_after,
+            )
+
+    def _record(self, ok: bool, latency_seconds: float) -> None:
+        with self._lock:
+            if self._state == "half_open":
+                self._probe_started_at = None
+                if ok:
+                    self._state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open_locked()
+                    return
+            self._outcomes.append((ok, latency_seconds * 1000))
+            if self._state == "closed" and self._unhealthy_locked():
+                self._open_locked()
+
+    def _release_probe(self) -> None:
+        """Let the next caller probe again without judging the current probe."""
+        with self._lock:
+            self._probe_started_at = None
+
+    def _unhealthy_locked(self) -> bool:
+        if len(self._outcomes) < self.min_calls:
+            return False
+        if self._error_rate_locked() >= self.error_rate_threshold:
+            return True
+        p95 = self._p95_locked()
+        return self.p95_latency_ms is not None and p95 is not None and p95 >= self.p95_latency_ms
+
+    def _open_locked(self) -> None:
+        self._state = "open"
+        self._opened_at = self._clock()
+
+    def _error_rate_locked(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        failures = sum(1 for ok, _ in self._outcomes if not ok)
+        return failures / len(self._outcomes)
+
+    def _p95_locked(self) -> float | None:
+        if not self._outcomes:
+            return None
+        latencies = sorted(latency for _, latency in self._outcomes)
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(name: str, *, track_latency: bool = True) -> CircuitBreaker:
+    """Return the process-wide breaker for a provider name.
+
+    Transcription providers pass ``track_latency=False`` because their latency
+    grows with audio length rather than with provider health.
+    """
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                name,
+                window_size=settings.breaker_window_size,
+                min_calls=settings.breaker_min_calls,
+                error_rate_threshold=settings.breaker_error_rate,
+                p95_latency_ms=settings.breaker_p95_latency_ms if track_latency else None,
+                cooldown_seconds=settings.breaker_cooldown_seconds,
+            )
+            _BREAKERS[name] = breaker
+    return breaker
+
+
+def circuit_breaker_snapshots() -> list[BreakerSnapshot]:
+    with _BREAKERS_LOCK:
+        breakers = sorted(_BREAKERS.values(), key=lambda breaker: breaker.name)
+    return [breaker.snapshot() for breaker in breakers]
+
+
+def clear_circuit_breakers() -> None:
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+from src.core.settings import get_settings
+
+_CLIENTS: dict[tuple[str, str | None], object] = {}
+_ASYNC_CLIENTS: dict[tuple[str, str | None], object] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_openai_client(*, api_key: str, base_url: str | None):
+    """Return the process-wide OpenAI client for these credentials.
+
+    Clients share keep-alive connections across calls, so reusing one avoids a
+    TCP and TLS handshake per provider request.
+    """
+    return _get_client(_CLIENTS, api_key=api_key, base_url=base_url, use_async=False)
+
+
+def get_async_openai_client(*, api_key: str, base_url: str | None):
+    """Return the process-wide ``AsyncOpenAI`` client for these credentials."""
+    return _get_client(_ASYNC_CLIENTS, api_key=api_key, base_url=base_url, use_async=True)
+
+
+def call_with_deadline(client, timeout: float | None, call):
+    """Return ``call(client)``, with any retries kept inside the remaining request budget.
+
+    The first attempt may use the whole budget. Connection errors, 408, 409, 429
+    and 5xx responses are retried after the SDK's backoff, up to
+    ``openai_max_retries`` times, while at least ``_MIN_ATTEMPT_SECONDS`` of the
+    budget would be left for the next attempt.
+    """
+    if timeout is None:
+        return call(client)
+    from openai import APIConnectionError, APIStatusError
+
+    deadline = time.monotonic() + timeout
+    retry = 0
+    while True:
+        attempt = client.with_options(timeout=_remaining(deadline), max_retries=0)
+        try:
+            return call(attempt)
+        except (APIConnectionError, APIStatusError) as exc:
+            delay = _retry_delay(exc, retry, deadline)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        retry += 1
+
+
+async def acall_with_deadline(client, timeout: float | None, call):
+    """Async variant of ``call_with_deadline`` for ``AsyncOpenAI`` clients."""
+    if timeout is None:
+        return await call(client)
+    from openai import APIConnectionError, APIStatusError
+
+    deadline = time.monotonic() + timeout
+    retry = 0
+    while True:
+        attempt = client.with_options(timeout=_remaining(deadline), max_retries=0)
+        try:
+            return await call(attempt)
+        except (APIConnectionError, APIStatusError) as exc:
+            delay = _retry_delay(exc, retry, deadline)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        retry += 1
+
+
+# Below this an attempt is unlikely to finish, so a retry would only waste budget.
+_MIN_ATTEMPT_SECONDS = 1.0
+# Matches the OpenAI SDK: 0.5s before the first retry, doubling up to 8s.
+_INITIAL_RETRY_DELAY_SECONDS = 0.5
+_MAX_RETRY_DELAY_SECONDS = 8.0
+_RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
+
+
+def _retry_delay(exc: Exception, retry: int, deadline: float) -> float | None:
+    """Seconds to wait before retrying ``exc``, or ``None`` to give up."""
+    # Connection errors carry no status code and are always worth retrying.
+    status_code = getattr(exc, "status_code", None)
+    retryable = status_code is None or status_code >= 500 or status_code in _RETRYABLE_STATUS_CODES
+    if not retryable or retry >= get_settings().openai_max_retries:
+        return None
+    delay = min(_INITIAL_RETRY_DELAY_SECONDS * 2**retry, _MAX_RETRY_DELAY_SECONDS)
+    if _remaining(deadline) - delay < _MIN_ATTEMPT_SECONDS:
+        return None
+    return delay
+
+
+def close_openai_clients() -> None:
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_openai_clients() -> None:
+    with _CLIENTS_LOCK:
+        clients = list(_ASYNC_CLIENTS.values())
+        _ASYNC_CLIENTS.clear()
+    for client in clients:
+        await client.close()
+    close_openai_clients()
+
+
+def _get_client(registry: dict, *, api_key: str, base_url: str | None, use_async: bool):
+    try:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+    except ModuleNotFoundError as exc:
+        raise RuntimeError("openai package is not installed") from exc
+
+    key = (api_key, base_url)
+    with _CLIENTS_LOCK:
+        client = registry.get(key)
+        if client is None:
+            settings = get_settings()
+            client_type = AsyncOpenAI if use_async else OpenAI
+            http_client_type = DefaultAsyncHttpxClient if use_async else DefaultHttpxClient
+            client = client_type(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=settings.openai_max_retries,
+                http_client=http_client_type(
+                    limits=httpx.Limits(
+                        max_connections=settings.openai_max_connections,
+                        max_keepalive_connections=settings.openai_max_keepalive_connections,
+                    ),
+                    timeout=settings.openai_timeout_seconds,
+                ),
+            )
+            registry[key] = client
+    return client
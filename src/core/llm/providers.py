@@ -1,9 +1,19 @@
+import asyncio
 import json
 import re
 from collections import Counter
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 
+from src.core.llm.breaker import get_circuit_breaker
+from src.core.llm.clients import (
+    acall_with_deadline,
+    call_with_deadline,
+    get_async_openai_client,
+    get_openai_client,
+)
 from src.core.settings import get_settings
+from src.core.llm.tokens import count_tokens
 from src.core.llm.types import LLMResponse, LLMUsage
 
 _AMBIGUITY_MARKERS = (
@@ -43,6 +53,9 @@ _STOPWORDS = {
 }
 
 
+_LOCAL_STREAM_CHUNK_CHARS = 16
+
+
 @dataclass
 class ProviderResolution:
     provider: "LocalHeuristicLLMProvider | OpenAILLMProvider"
@@ -54,22 +67,45 @@ class LocalHeuristicLLMProvider:
 
     name = "local-heuristic"
 
-    def generate(self, *, model: str, prompt: str, transcript: str) -> LLMResponse:
+    def generate(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> LLMResponse:
         payload = self._build_reflection_payload(transcript)
-        prompt_tokens = max(1, int((len(prompt) + len(transcript)) / 4))
-        completion_tokens = max(1, int(len(json.dumps(payload)) / 4))
+        content = json.dumps(payload)
+        prompt_tokens = max(1, count_tokens(prompt, model))
+        completion_tokens = max(1, count_tokens(content, model))
         usage = LLMUsage(
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             usd=round(prompt_tokens * 0.0000002 + completion_tokens * 0.0000008, 8),
         )
         return LLMResponse(
-            content=json.dumps(payload),
+            content=content,
             usage=usage,
             provider=self.name,
             model=model,
         )
 
+    async def agenerate(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> LLMResponse:
+        # Counting tokens is CPU work, so it stays off the event loop.
+        return await asyncio.to_thread(
+            self.generate, model=model, prompt=prompt, transcript=transcript
+        )
+
+    async def astream(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> AsyncIterator[str | LLMResponse]:
+        """Replay ``generate`` output in small chunks so streaming works offline."""
+        response = await asyncio.to_thread(
+            self.generate, model=model, prompt=prompt, transcript=transcript
+        )
+        for start in range(0, len(response.content), _LOCAL_STREAM_CHUNK_CHARS):
+            yield response.content[start : start + _LOCAL_STREAM_CHUNK_CHARS]
+            await asyncio.sleep(0)
+        yield response
+
     def _build_reflection_payload(self, transcript: str) -> dict:
         cleaned = " ".join(transcript.split())
         sentences = [
@@ -138,25 +174,89 @@ class OpenAILLMProvider:
         self.prompt_cost_per_1k = prompt_cost_per_1k
         self.completion_cost_per_1k = completion_cost_per_1k
 
-    def generate(self, *, model: str, prompt: str, transcript: str) -> LLMResponse:
-        try:
-            from openai import OpenAI
-        except ModuleNotFoundError as exc:
-            raise RuntimeError("openai package is not installed") from exc
+    def generate(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> LLMResponse:
+        completion = call_with_deadline(
+            get_openai_client(api_key=self.api_key, base_url=self.base_url),
+            timeout,
+            lambda client: client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+            ),
+        )
+        return self._build_response(
+            content=completion.choices[0].message.content or "",
+            usage=completion.usage,
+            model=model,
+            prompt=prompt,
+            transcript=transcript,
+        )
+
+    async def agenerate(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> LLMResponse:
+        completion = await acall_with_deadline(
+            get_async_openai_client(api_key=self.api_key, base_url=self.base_url),
+            timeout,
+            lambda client: client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+            ),
+        )
+        return self._build_response(
+            content=completion.choices[0].message.content or "",
+            usage=completion.usage,
+            model=model,
+            prompt=prompt,
+            transcript=transcript,
+        )
 
-        client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-        completion = client.chat.completions.create(
+    async def astream(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> AsyncIterator[str | LLMResponse]:
+        # Only opening the stream is retried; once tokens flow they have been emitted.
+        stream = await acall_with_deadline(
+            get_async_openai_client(api_key=self.api_key, base_url=self.base_url),
+            timeout,
+            lambda client: client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                stream=True,
+                stream_options={"include_usage": True},
+            ),
+        )
+        parts: list[str] = []
+        usage = None
+        async for chunk in stream:
+            # The usage chunk arrives last and carries no choices.
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        yield self._build_response(
+            content="".join(parts),
+            usage=usage,
             model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
+            prompt=prompt,
+            transcript=transcript,
         )
-        content = completion.choices[0].message.content or ""
-        usage = completion.usage
+
+    def _build_response(
+        self, *, content: str, usage, model: str, prompt: str, transcript: str
+    ) -> LLMResponse:
         prompt_tokens = int(getattr(usage, "prompt_tokens", 0) or 0)
         completion_tokens = int(getattr(usage, "completion_tokens", 0) or 0)
         if prompt_tokens == 0 and completion_tokens == 0:
-            prompt_tokens = max(1, int((len(prompt) + len(transcript)) / 4))
-            completion_tokens = max(1, int(len(content) / 4))
+            prompt_tokens = max(1, count_tokens(prompt, model))
+            completion_tokens = max(1, count_tokens(content, model))
 
         usd = round(
             (
@@ -186,7 +286,12 @@ def resolve_llm_provider() -> ProviderResolution:
     if requested in {"openai", "auto"}:
         provider = _build_openai_provider()
         if provider is not None:
-            return ProviderResolution(provider=provider)
+            if get_circuit_breaker(provider.name).allow():
+                return ProviderResolution(provider=provider)
+            return ProviderResolution(
+                provider=local_provider,
+                warning="OpenAI provider circuit is open; falling back to local reflection.",
+            )
         if requested == "openai":
             return ProviderResolution(
                 provider=local_provider,
@@ -1,9 +1,76 @@
+import re
+from dataclasses import dataclass
 from typing import Literal
 
+from src.core.llm.breaker import get_circuit_breaker
+from src.core.llm.tokens import count_tokens
+from src.core.request_context import in_flight_requests, record_routing
 from src.core.settings import get_settings
 
+_WORD_PATTERN = re.compile(r"[a-zA-Z0-9']+")
+
+# Spoken filler that carries little meaning on its own; short words are ignored anyway.
+_FILLER_WORDS = {
+    "actually",
+    "basically",
+    "guess",
+    "just",
+    "kind",
+    "know",
+    "like",
+    "literally",
+    "maybe",
+    "mean",
+    "okay",
+    "really",
+    "right",
+    "sort",
+    "stuff",
+    "thing",
+    "things",
+    "well",
+    "yeah",
+}
+
+
+@dataclass
+class RoutingDecision:
+    model: str
+    tier: Literal["cheap", "default"]
+    reason: str
+
 
 class ModelRouter:
     def route(self, *, tier: Literal["cheap", "default"] = "default") -> str:
         settings = get_settings()
         return settings.llm_cheap_model if tier == "cheap" else settings.llm_default_model
+
+    def decide(self, *, transcript: str, provider: str) -> RoutingDecision:
+        """Pick a model tier for one call and record the decision in request meta.
+
+        The cheap model is used for short or low-signal transcripts, while the
+        process is overloaded, or while the provider's p95 latency is above the
+        configured limit. Everything else goes to the default model.
+        """
+        reason = self._cheap_reason(transcript=transcript, provider=provider)
+        tier: Literal["cheap", "default"] = "cheap" if reason else "default"
+        decision = RoutingDecision(
+            model=self.route(tier=tier), tier=tier, reason=reason or "default"
+        )
+        record_routing(model=decision.model, tier=decision.tier, reason=decision.reason)
+        return decision
+
+    def _cheap_reason(self, *, transcript: str, provider: str) -> str | None:
+        settings = get_settings()
+        if count_tokens(transcript) < settings.router_short_transcript_tokens:
+            return "short_transcript"
+        words = _WORD_PATTERN.findall(transcript.lower())
+        content_words = [word for word in words if len(word) >= 4 and word not in _FILLER_WORDS]
+        if words and len(content_words) / len(words) < settings.router_low_signal_ratio:
+            return "low_signal"
+        if in_flight_requests() >= settings.router_overload_in_flight:
+            return "overload"
+        p95_latency = get_circuit_breaker(provider).p95_latency()
+        if p95_latency is not None and p95_latency >= settings.router_latency_p95_ms:
+            return "provider_latency"
+        return None
@@ -0,0 +1,81 @@
+import math
+import re
+from functools import lru_cache
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.?!])\s+")
+# Used when the model is unknown to tiktoken (for example the local echo-* names).
+_DEFAULT_ENCODING = "o200k_base"
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Count tokens with tiktoken when installed, else a word-piece approximation.
+
+    The approximation counts punctuation as one token and words as one token per
+    four characters, which tracks BPE tokenizers closely on English prose.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model or "")
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE_PATTERN.findall(text))
+
+
+def split_by_tokens(text: str, max_tokens: int, model: str | None = None) -> list[str]:
+    """Split text into chunks of at most ``max_tokens``, on sentence boundaries.
+
+    Sentences longer than the budget are split between words. Every chunk is
+    non-empty and the chunks, joined with spaces, keep the original word order.
+    """
+    max_tokens = max(1, max_tokens)
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for sentence in _SENTENCE_PATTERN.split(" ".join(text.split())):
+        for piece in _fit_sentence(sentence, max_tokens, model):
+            piece_tokens = count_tokens(piece, model)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _fit_sentence(sentence: str, max_tokens: int, model: str | None) -> list[str]:
+    if count_tokens(sentence, model) <= max_tokens:
+        return [sentence] if sentence else []
+    # Word counts are summed rather than re-measured, which keeps this linear.
+    pieces: list[str] = []
+    words: list[str] = []
+    words_tokens = 0
+    for word in sentence.split():
+        word_tokens = count_tokens(f" {word}", model)
+        if words and words_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(words))
+            words, words_tokens = [], 0
+        words.append(word)
+        words_tokens += word_tokens
+    if words:
+        pieces.append(" ".join(words))
+    return pieces
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ModuleNotFoundError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding(_DEFAULT_ENCODING)
+    except Exception:
+        # Encodings are downloaded on first use; offline hosts fall back to estimates.
+        return None
@@ -1,3 +1,4 @@
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from typing import Protocol
 
@@ -20,5 +21,17 @@ class LLMResponse:
 class LLMProvider(Protocol):
     name: str
 
-    def generate(self, *, model: str, prompt: str, transcript: str) -> LLMResponse:
-        """Return model output and normalized usage."""
+    def generate(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> LLMResponse:
+        """Return model output and normalized usage within ``timeout`` seconds, if given."""
+
+    async def agenerate(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> LLMResponse:
+        """Async variant of ``generate`` that does not block the event loop."""
+
+    def astream(
+        self, *, model: str, prompt: str, transcript: str, timeout: float | None = None
+    ) -> AsyncIterator[str | LLMResponse]:
+        """Yield content deltas as they arrive, then the complete ``LLMResponse``."""
@@ -1,9 +1,17 @@
+import math
 import uuid
 from collections.abc import Awaitable, Callable
 
 from fastapi import Request, Response
 
-from src.core.request_context import RequestMeta, set_request_meta
+from src.core.request_context import (
+    RequestMeta,
+    begin_request,
+    end_request,
+    set_deadline,
+    set_request_meta,
+)
+from src.core.settings import get_settings
 
 
 async def request_context_middleware(
@@ -11,7 +19,25 @@ async def request_context_middleware(
 ) -> Response:
     request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
     set_request_meta(RequestMeta(request_id=request_id))
+    set_deadline(_deadline_ms(request))
 
-    response = await call_next(request)
+    begin_request()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request()
     response.headers["X-Request-Id"] = request_id
     return response
+
+
+def _deadline_ms(request: Request) -> float:
+    """The client's X-Deadline-Ms, unless it is not a positive finite number."""
+    header = request.headers.get("X-Deadline-Ms")
+    if header:
+        try:
+            budget_ms = float(header)
+        except ValueError:
+            budget_ms = math.nan
+        if math.isfinite(budget_ms) and budget_ms > 0:
+            return budget_ms
+    return get_settings().request_deadline_ms
@@ -1,6 +1,13 @@
+import math
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from contextvars import ContextVar
 from dataclasses import dataclass, field
 
+from src.core.settings import get_settings
+
 
 @dataclass
 class CostMeta:
@@ -9,14 +16,33 @@ class CostMeta:
     usd: float = 0.0
 
 
+@dataclass
+class RoutingMeta:
+    model: str
+    tier: str
+    reason: str
+
+
 @dataclass
 class RequestMeta:
     request_id: str = ""
     warnings: list[str] = field(default_factory=list)
+    cache_hits: list[str] = field(default_factory=list)
+    # Stages whose result was produced by an identical concurrent request.
+    shared: list[str] = field(default_factory=list)
+    routing: list[RoutingMeta] = field(default_factory=list)
     cost: CostMeta = field(default_factory=CostMeta)
+    # time.monotonic() value by which the response is due; None means unbounded.
+    deadline: float | None = None
 
 
 _REQUEST_META: ContextVar[RequestMeta | None] = ContextVar("request_meta", default=None)
+# Open ``capture_warnings`` blocks, innermost last.
+_WARNING_CAPTURES: ContextVar[tuple[list[str], ...]] = ContextVar("warning_captures", default=())
+# Pipeline stages of one request can run on parallel threads and share its meta.
+_META_LOCK = threading.Lock()
+_IN_FLIGHT_LOCK = threading.Lock()
+_in_flight = 0
 
 
 def set_request_meta(meta: RequestMeta) -> None:
@@ -33,11 +59,85 @@ def get_request_meta() -> RequestMeta:
 
 def add_warning(warning: str) -> None:
     meta = get_request_meta()
-    meta.warnings.append(warning)
+    with _META_LOCK:
+        meta.warnings.append(warning)
+        for captured in _WARNING_CAPTURES.get():
+            captured.append(warning)
+
+
+@contextmanager
+def capture_warnings() -> Iterator[list[str]]:
+    """Also collect the warnings added inside the block, so they can be replayed.
+
+    Threads and tasks started from the block with a copy of its context are
+    captured too; parallel stages of the same request are not.
+    """
+    captured: list[str] = []
+    token = _WARNING_CAPTURES.set((*_WARNING_CAPTURES.get(), captured))
+    try:
+        yield captured
+    finally:
+        _WARNING_CAPTURES.reset(token)
 
 
 def record_cost(prompt_tokens: int = 0, completion_tokens: int = 0, usd: float = 0.0) -> None:
     meta = get_request_meta()
-    meta.cost.prompt_tokens += prompt_tokens
-    meta.cost.completion_tokens += completion_tokens
-    meta.cost.usd += usd
+    with _META_LOCK:
+        meta.cost.prompt_tokens += prompt_tokens
+        meta.cost.completion_tokens += completion_tokens
+        meta.cost.usd += usd
+
+
+def record_cache_hit(cache_name: str) -> None:
+    meta = get_request_meta()
+    with _META_LOCK:
+        meta.cache_hits.append(cache_name)
+
+
+def record_shared(stage: str) -> None:
+    meta = get_request_meta()
+    with _META_LOCK:
+        meta.shared.append(stage)
+
+
+def record_routing(*, model: str, tier: str, reason: str) -> None:
+    meta = get_request_meta()
+    with _META_LOCK:
+        meta.routing.append(RoutingMeta(model=model, tier=tier, reason=reason))
+
+
+def begin_request() -> None:
+    global _in_flight
+    with _IN_FLIGHT_LOCK:
+        _in_flight += 1
+
+
+def end_request() -> None:
+    global _in_flight
+    with _IN_FLIGHT_LOCK:
+        _in_flight -= 1
+
+
+def in_flight_requests() -> int:
+    """Requests currently being handled by this process."""
+    return _in_flight
+
+
+def set_deadline(budget_ms: float | None) -> None:
+    meta = get_request_meta()
+    valid = budget_ms is not None and math.isfinite(budget_ms) and budget_ms > 0
+    meta.deadline = time.monotonic() + budget_ms / 1000 if valid else None
+
+
+def remaining_budget() -> float | None:
+    """Seconds left before the request deadline, or None when there is none."""
+    deadline = get_request_meta().deadline
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def deadline_exhausted() -> bool:
+    """True when too little budget is left to start another external call."""
+    remaining = remaining_budget()
+    return remaining is not None and remaining * 1000 < get_settings().deadline_reserve_ms
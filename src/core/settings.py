@@ -13,6 +13,35 @@ class Settings(BaseModel):
     database_path: Path = Field(
         default_factory=lambda: Path(os.getenv("ECHO_NOTES_DB_PATH", "data/echo_notes.db"))
     )
+    db_busy_timeout_ms: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_DB_BUSY_TIMEOUT_MS", "5000"))
+    )
+    db_mmap_size_bytes: int = Field(
+        default_factory=lambda: int(
+            os.getenv("ECHO_NOTES_DB_MMAP_SIZE_BYTES", str(256 * 1024 * 1024))
+        )
+    )
+    request_deadline_ms: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_REQUEST_DEADLINE_MS", "30000"))
+    )
+    deadline_reserve_ms: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_DEADLINE_RESERVE_MS", "250"))
+    )
+    idempotency_ttl_seconds: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_IDEMPOTENCY_TTL_SECONDS", "86400"))
+    )
+    idempotency_lock_seconds: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_IDEMPOTENCY_LOCK_SECONDS", "120"))
+    )
+    vector_index_backend: str = Field(
+        default_factory=lambda: os.getenv("ECHO_NOTES_VECTOR_INDEX", "exact")
+    )
+    vector_index_nprobe: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_VECTOR_INDEX_NPROBE", "16"))
+    )
+    vector_index_sync_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_VECTOR_INDEX_SYNC_SECONDS", "2"))
+    )
     llm_provider: str = Field(default_factory=lambda: os.getenv("ECHO_NOTES_LLM_PROVIDER", "auto"))
     llm_default_model: str = Field(
         default_factory=lambda: os.getenv("ECHO_NOTES_LLM_DEFAULT_MODEL", "echo-default-v1")
@@ -20,14 +49,65 @@ class Settings(BaseModel):
     llm_cheap_model: str = Field(
         default_factory=lambda: os.getenv("ECHO_NOTES_LLM_CHEAP_MODEL", "echo-cheap-v1")
     )
+    router_short_transcript_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_ROUTER_SHORT_TRANSCRIPT_TOKENS", "48"))
+    )
+    router_low_signal_ratio: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_ROUTER_LOW_SIGNAL_RATIO", "0.3"))
+    )
+    router_overload_in_flight: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_ROUTER_OVERLOAD_IN_FLIGHT", "32"))
+    )
+    router_latency_p95_ms: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_ROUTER_LATENCY_P95_MS", "8000"))
+    )
     openai_api_key: str | None = Field(default_factory=lambda: os.getenv("OPENAI_API_KEY"))
     openai_base_url: str | None = Field(default_factory=lambda: os.getenv("OPENAI_BASE_URL"))
+    openai_timeout_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_OPENAI_TIMEOUT_SECONDS", "60"))
+    )
+    openai_max_retries: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_OPENAI_MAX_RETRIES", "2"))
+    )
+    openai_max_connections: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_OPENAI_MAX_CONNECTIONS", "50"))
+    )
+    openai_max_keepalive_connections: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    )
+    breaker_window_size: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_BREAKER_WINDOW_SIZE", "20"))
+    )
+    breaker_min_calls: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_BREAKER_MIN_CALLS", "5"))
+    )
+    breaker_error_rate: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_BREAKER_ERROR_RATE", "0.5"))
+    )
+    breaker_p95_latency_ms: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_BREAKER_P95_LATENCY_MS", "15000"))
+    )
+    breaker_cooldown_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_BREAKER_COOLDOWN_SECONDS", "30"))
+    )
     llm_prompt_cost_per_1k: float = Field(
         default_factory=lambda: float(os.getenv("ECHO_NOTES_LLM_PROMPT_COST_PER_1K", "0.0"))
     )
     llm_completion_cost_per_1k: float = Field(
         default_factory=lambda: float(os.getenv("ECHO_NOTES_LLM_COMPLETION_COST_PER_1K", "0.0"))
     )
+    reflection_chunk_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_REFLECTION_CHUNK_TOKENS", "6000"))
+    )
+    reflection_max_parallel_chunks: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_REFLECTION_MAX_PARALLEL_CHUNKS", "4"))
+    )
+    reflection_cache_size: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_REFLECTION_CACHE_SIZE", "512"))
+    )
+    reflection_cache_ttl_seconds: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_REFLECTION_CACHE_TTL_SECONDS", "86400"))
+    )
     embedding_provider: str = Field(
         default_factory=lambda: os.getenv("ECHO_NOTES_EMBEDDING_PROVIDER", "auto")
     )
@@ -37,6 +117,75 @@ class Settings(BaseModel):
     embedding_cost_per_1k: float = Field(
         default_factory=lambda: float(os.getenv("ECHO_NOTES_EMBEDDING_COST_PER_1K", "0.0"))
     )
+    embedding_batch_window_ms: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_EMBEDDING_BATCH_WINDOW_MS", "5"))
+    )
+    embedding_batch_max_inputs: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_EMBEDDING_BATCH_MAX_INPUTS", "64"))
+    )
+    embedding_cache_size: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_EMBEDDING_CACHE_SIZE", "2048"))
+    )
+    embedding_cache_db_size: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_EMBEDDING_CACHE_DB_SIZE", "20000"))
+    )
+    chunk_max_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_CHUNK_MAX_TOKENS", "256"))
+    )
+    chunk_overlap_tokens: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_CHUNK_OVERLAP_TOKENS", "32"))
+    )
+    chunk_aggregation: str = Field(
+        default_factory=lambda: os.getenv("ECHO_NOTES_CHUNK_AGGREGATION", "max")
+    )
+    search_min_score: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_SEARCH_MIN_SCORE", "0"))
+    )
+    upload_max_bytes: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_UPLOAD_MAX_BYTES", "104857600"))
+    )
+    upload_chunk_bytes: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_UPLOAD_CHUNK_BYTES", "1048576"))
+    )
+    transcription_workers: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_TRANSCRIPTION_WORKERS", "2"))
+    )
+    transcription_job_poll_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_TRANSCRIPTION_JOB_POLL_SECONDS", "1.0"))
+    )
+    transcription_job_stale_seconds: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_TRANSCRIPTION_JOB_STALE_SECONDS", "60"))
+    )
+    transcription_callback_allowed_hosts: str = Field(
+        default_factory=lambda: os.getenv("ECHO_NOTES_TRANSCRIPTION_CALLBACK_ALLOWED_HOSTS", "")
+    )
+    transcription_callback_timeout_seconds: float = Field(
+        default_factory=lambda: float(
+            os.getenv("ECHO_NOTES_TRANSCRIPTION_CALLBACK_TIMEOUT_SECONDS", "10")
+        )
+    )
+    transcription_processes: int = Field(
+        default_factory=lambda: int(
+            os.getenv("ECHO_NOTES_TRANSCRIPTION_PROCESSES", str(os.cpu_count() or 1))
+        )
+    )
+    transcription_segment_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("ECHO_NOTES_TRANSCRIPTION_SEGMENT_SECONDS", "120"))
+    )
+    transcription_segment_overlap_seconds: float = Field(
+        default_factory=lambda: float(
+            os.getenv("ECHO_NOTES_TRANSCRIPTION_SEGMENT_OVERLAP_SECONDS", "2")
+        )
+    )
+    whisper_replicas: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_WHISPER_REPLICAS", "1"))
+    )
+    whisper_memory_budget_mb: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_WHISPER_MEMORY_BUDGET_MB", "0"))
+    )
+    transcription_cache_size: int = Field(
+        default_factory=lambda: int(os.getenv("ECHO_NOTES_TRANSCRIPTION_CACHE_SIZE", "1024"))
+    )
     transcription_provider: str = Field(
         default_factory=lambda: os.getenv("ECHO_NOTES_TRANSCRIPTION_PROVIDER", "auto")
     )
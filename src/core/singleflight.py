@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+from src.core.request_context import add_warning, capture_warnings, remaining_budget
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Deduplicates concurrent calls that share a key.
+
+    The first caller for a key becomes the leader and runs the work; callers that
+    arrive while it is in flight wait for the leader's result instead of repeating
+    the call. Sync and async callers share the same flights, so a request served
+    on a worker thread can follow one running on the event loop and vice versa.
+    A follower whose leader fails, or who runs out of request budget while
+    waiting, does the work itself. ``do`` and ``ado`` return the result together
+    with whether it was shared from another caller. Warnings the leader added
+    while producing the result (e.g. a provider fallback) are added to each
+    follower's request as well.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future[tuple[T, list[str]]]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        future, leader = self._join(key)
+        if leader:
+            try:
+                with capture_warnings() as warnings:
+                    result = fn()
+            except BaseException as exc:
+                self._settle(key, future, exception=exc)
+                raise
+            self._settle(key, future, result=(result, warnings))
+            return result, False
+        try:
+            shared = future.result(timeout=remaining_budget())
+        except Exception:
+            return fn(), False
+        return self._follow(shared), True
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        future, leader = self._join(key)
+        if leader:
+            try:
+                with capture_warnings() as warnings:
+                    result = await fn()
+            except BaseException as exc:
+                self._settle(key, future, exception=exc)
+                raise
+            self._settle(key, future, result=(result, warnings))
+            return result, False
+        try:
+            # Shield the shared future so a follower timing out never cancels it.
+            waiter = asyncio.shield(asyncio.wrap_future(future))
+            shared = await asyncio.wait_for(waiter, remaining_budget())
+        except Exception:
+            return await fn(), False
+        return self._follow(shared), True
+
+    @staticmethod
+    def _follow(shared: tuple[T, list[str]]) -> T:
+        result, warnings = shared
+        for warning in warnings:
+            add_warning(warning)
+        return result
+
+    def _join(self, key: Hashable) -> tuple[Future[tuple[T, list[str]]], bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _settle(
+        self,
+        key: Hashable,
+        future: Future[tuple[T, list[str]]],
+        *,
+        result: tuple[T, list[str]] | None = None,
+        exception: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        if exception is None:
+            future.set_result(result)
+        elif isinstance(exception, Exception):
+            future.set_exception(exception)
+        else:
+            # Cancellation of the leader must not cancel followers; they retry.
+            future.set_exception(RuntimeError("singleflight leader was interrupted"))
@@ -1,29 +1,156 @@
+import json
+import logging
 import sqlite3
+import threading
 from pathlib import Path
 
+from src.core.request_context import remaining_budget
 from src.core.settings import get_settings
 from src.db.models import SCHEMA_STATEMENTS
+from src.db.vectors import pack_embedding
+
+EMBEDDING_BACKFILL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """Hands out one long-lived connection per thread and database path.
+
+    Connections are configured once when opened (WAL journal, relaxed fsync, busy
+    timeout, mmap) and reused for the lifetime of the thread, so callers must not
+    close them. Use the connection as a context manager to scope a transaction.
+    The busy timeout is re-applied on checkout whenever the caller's remaining
+    request budget is shorter than the configured one.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+        self._generation = 0
+
+    def get(self, db_path: Path, *, busy_timeout_ms: int) -> sqlite3.Connection:
+        key = str(db_path)
+        cache = getattr(self._local, "connections", None)
+        if cache is None or getattr(self._local, "generation", -1) != self._generation:
+            cache = {}
+            self._local.connections = cache
+            self._local.busy_timeouts = {}
+            self._local.generation = self._generation
+
+        connection = cache.get(key)
+        if connection is None:
+            connection = self._open(db_path)
+            cache[key] = connection
+            with self._lock:
+                self._connections.append(connection)
+        if self._local.busy_timeouts.get(key) != busy_timeout_ms:
+            connection.execute(f"PRAGMA busy_timeout = {busy_timeout_ms};")
+            self._local.busy_timeouts[key] = busy_timeout_ms
+        return connection
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self._generation += 1
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+
+    def _open(self, db_path: Path) -> sqlite3.Connection:
+        settings = get_settings()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            str(db_path),
+            timeout=settings.db_busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode = WAL;")
+        connection.execute("PRAGMA synchronous = NORMAL;")
+        connection.execute(f"PRAGMA mmap_size = {int(settings.db_mmap_size_bytes)};")
+        connection.execute("PRAGMA foreign_keys = ON;")
+        return connection
+
+
+_CONNECTIONS = ConnectionManager()
+_MIN_BUSY_TIMEOUT_MS = 500
 
 
 def get_connection() -> sqlite3.Connection:
     settings = get_settings()
-    db_path = settings.database_path
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    connection = sqlite3.connect(str(db_path), check_same_thread=False)
-    connection.row_factory = sqlite3.Row
-    connection.execute("PRAGMA foreign_keys = ON;")
-    return connection
+    busy_timeout_ms = settings.db_busy_timeout_ms
+    remaining = remaining_budget()
+    if remaining is not None:
+        # Never cap to zero: a write that follows a paid provider call must still wait
+        # out a brief lock held by another writer rather than fail the request.
+        floor_ms = min(settings.db_busy_timeout_ms, _MIN_BUSY_TIMEOUT_MS)
+        busy_timeout_ms = max(floor_ms, min(busy_timeout_ms, remaining * 1000))
+    return _CONNECTIONS.get(settings.database_path, busy_timeout_ms=int(busy_timeout_ms))
+
+
+def close_connections() -> None:
+    _CONNECTIONS.close_all()
 
 
 def init_db() -> None:
+    """Create the schema and apply column migrations.
+
+    Converting rows written by older versions is left to ``backfill_legacy_rows``,
+    which the app runs in the background after startup.
+    """
     connection = get_connection()
-    try:
+    with connection:
         for statement in SCHEMA_STATEMENTS:
             connection.execute(statement)
         _apply_lightweight_migrations(connection)
-        connection.commit()
-    finally:
-        connection.close()
+
+
+def backfill_legacy_rows(stop: threading.Event | None = None) -> None:
+    """Convert legacy JSON embeddings to blobs, then give pre-chunking notes a chunk.
+
+    Works in short batches and returns early once ``stop`` is set; the rest is
+    picked up on the next run. Until a row is converted, ``row_embedding`` reads
+    its JSON column.
+    """
+    connection = get_connection()
+    _backfill_embedding_blobs(connection, stop)
+    _backfill_note_chunks(connection, stop)
+
+
+_BACKFILL_STOP = threading.Event()
+_BACKFILL_THREAD: threading.Thread | None = None
+
+
+def start_legacy_backfill() -> threading.Thread:
+    """Run ``backfill_legacy_rows`` on a background thread so startup doesn't wait."""
+    global _BACKFILL_THREAD
+    _BACKFILL_STOP.clear()
+    _BACKFILL_THREAD = threading.Thread(
+        target=_run_legacy_backfill, name="legacy-backfill", daemon=True
+    )
+    _BACKFILL_THREAD.start()
+    return _BACKFILL_THREAD
+
+
+def stop_legacy_backfill() -> None:
+    """Stop the background backfill after its current batch."""
+    global _BACKFILL_THREAD
+    thread, _BACKFILL_THREAD = _BACKFILL_THREAD, None
+    _BACKFILL_STOP.set()
+    if thread is not None:
+        thread.join()
+
+
+def _run_legacy_backfill() -> None:
+    try:
+        backfill_legacy_rows(_BACKFILL_STOP)
+    except sqlite3.Error:
+        logger.exception("Backfilling legacy note rows failed; it resumes at the next startup.")
 
 
 def _apply_lightweight_migrations(connection: sqlite3.Connection) -> None:
@@ -33,6 +160,95 @@ def _apply_lightweight_migrations(connection: sqlite3.Connection) -> None:
             connection.execute("ALTER TABLE notes ADD COLUMN transcript_metadata_json TEXT")
         if "reflection_internal_json" not in note_columns:
             connection.execute("ALTER TABLE notes ADD COLUMN reflection_internal_json TEXT")
+        if "embedding_blob" not in note_columns:
+            connection.execute("ALTER TABLE notes ADD COLUMN embedding_blob BLOB")
+        if "embedding_dim" not in note_columns:
+            connection.execute("ALTER TABLE notes ADD COLUMN embedding_dim INTEGER")
+        if "embedding_model" not in note_columns:
+            connection.execute("ALTER TABLE notes ADD COLUMN embedding_model TEXT")
+
+    cache_columns = _table_columns(connection, "embedding_cache")
+    if cache_columns and "last_used_at" not in cache_columns:
+        connection.execute(
+            "ALTER TABLE embedding_cache ADD COLUMN last_used_at REAL NOT NULL DEFAULT 0"
+        )
+    connection.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used_at
+        ON embedding_cache (last_used_at)
+        """
+    )
+
+    job_columns = _table_columns(connection, "transcription_jobs")
+    if job_columns and "heartbeat_at" not in job_columns:
+        connection.execute("ALTER TABLE transcription_jobs ADD COLUMN heartbeat_at TEXT")
+
+    event_columns = _table_columns(connection, "reflection_events")
+    for column in ("transcript_sha256", "provider", "model", "prompt_fingerprint"):
+        if column not in event_columns:
+            connection.execute(f"ALTER TABLE reflection_events ADD COLUMN {column} TEXT")
+    connection.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_reflection_events_cache_key
+        ON reflection_events (transcript_sha256, provider, model, prompt_fingerprint, created_at)
+        """
+    )
+
+
+def _backfill_embedding_blobs(connection: sqlite3.Connection, stop: threading.Event | None) -> None:
+    """Convert legacy ``embedding_json`` rows to float32 blobs in short transactions.
+
+    Each batch commits on its own, so other writers only wait for one batch.
+    """
+    batch_size = EMBEDDING_BACKFILL_BATCH_SIZE
+    while stop is None or not stop.is_set():
+        with connection:
+            rows = connection.execute(
+                """
+                SELECT id, embedding_json
+                FROM notes
+                WHERE embedding_blob IS NULL AND embedding_json != ''
+                LIMIT ?
+                """,
+                (batch_size,),
+            ).fetchall()
+            for row in rows:
+                vector = [float(value) for value in json.loads(row["embedding_json"])]
+                connection.execute(
+                    """
+                    UPDATE notes
+                    SET embedding_blob = ?, embedding_dim = ?, embedding_json = ''
+                    WHERE id = ?
+                    """,
+                    (pack_embedding(vector), len(vector), int(row["id"])),
+                )
+        if len(rows) < batch_size:
+            return
+
+
+def _backfill_note_chunks(connection: sqlite3.Connection, stop: threading.Event | None) -> None:
+    """Give notes stored before chunking a single chunk holding the note's own vector."""
+    batch_size = EMBEDDING_BACKFILL_BATCH_SIZE
+    while stop is None or not stop.is_set():
+        with connection:
+            inserted = connection.execute(
+                """
+                INSERT INTO note_chunks (
+                  note_id, chunk_index, text, start_char, end_char,
+                  embedding_blob, embedding_dim, embedding_model
+                )
+                SELECT id, 0, transcript_text, 0, length(transcript_text), embedding_blob,
+                       COALESCE(embedding_dim, length(embedding_blob) / 4), embedding_model
+                FROM notes
+                WHERE embedding_blob IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM note_chunks WHERE note_chunks.note_id = notes.id)
+                ORDER BY id
+                LIMIT ?
+                """,
+                (batch_size,),
+            ).rowcount
+        if inserted < batch_size:
+            return
 
 
 def _table_columns(connection: sqlite3.Connection, table_name: str) -> set[str]:
@@ -51,7 +267,7 @@ def insert_cost_ledger_row(
     usd: float,
 ) -> None:
     connection = get_connection()
-    try:
+    with connection:
         connection.execute(
             """
             INSERT INTO cost_ledger (
@@ -60,24 +276,34 @@ def insert_cost_ledger_row(
             """,
             (app, request_id, provider, model, prompt_tokens, completion_tokens, usd),
         )
-        connection.commit()
-    finally:
-        connection.close()
 
 
 def insert_reflection_event_row(
-    *, transcript_text: str, reflection_json: str, reflection_internal_json: str
+    *,
+    transcript_text: str,
+    reflection_json: str,
+    reflection_internal_json: str,
+    transcript_sha256: str | None = None,
+    provider: str | None = None,
+    model: str | None = None,
+    prompt_fingerprint: str | None = None,
 ) -> None:
     connection = get_connection()
-    try:
+    with connection:
         connection.execute(
             """
             INSERT INTO reflection_events (
-              transcript_text, reflection_json, reflection_internal_json
-            ) VALUES (?, ?, ?)
+              transcript_text, reflection_json, reflection_internal_json,
+              transcript_sha256, provider, model, prompt_fingerprint
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (transcript_text, reflection_json, reflection_internal_json),
+            (
+                transcript_text,
+                reflection_json,
+                reflection_internal_json,
+                transcript_sha256,
+                provider,
+                model,
+                prompt_fingerprint,
+            ),
         )
-        connection.commit()
-    finally:
-        connection.close()
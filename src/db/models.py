@@ -7,7 +7,10 @@ SCHEMA_STATEMENTS = [
       transcript_metadata_json TEXT,
       reflection_json TEXT,
       reflection_internal_json TEXT,
-      embedding_json TEXT NOT NULL,
+      embedding_json TEXT NOT NULL DEFAULT '',
+      embedding_blob BLOB,
+      embedding_dim INTEGER,
+      embedding_model TEXT,
       created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
       updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
     );
@@ -24,11 +27,30 @@ SCHEMA_STATEMENTS = [
     );
     """,
     """
+    CREATE TABLE IF NOT EXISTS note_chunks (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      note_id INTEGER NOT NULL,
+      chunk_index INTEGER NOT NULL,
+      text TEXT NOT NULL,
+      start_char INTEGER NOT NULL,
+      end_char INTEGER NOT NULL,
+      embedding_blob BLOB NOT NULL,
+      embedding_dim INTEGER NOT NULL,
+      embedding_model TEXT,
+      UNIQUE (note_id, chunk_index),
+      FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE
+    );
+    """,
+    """
     CREATE TABLE IF NOT EXISTS reflection_events (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       transcript_text TEXT NOT NULL,
       reflection_json TEXT NOT NULL,
       reflection_internal_json TEXT NOT NULL,
+      transcript_sha256 TEXT,
+      provider TEXT,
+      model TEXT,
+      prompt_fingerprint TEXT,
       created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
     );
     """,
@@ -45,4 +67,68 @@ SCHEMA_STATEMENTS = [
       created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
     );
     """,
+    """
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+      provider TEXT NOT NULL,
+      model TEXT NOT NULL,
+      text_sha256 TEXT NOT NULL,
+      embedding_blob BLOB NOT NULL,
+      embedding_dim INTEGER NOT NULL,
+      last_used_at REAL NOT NULL DEFAULT 0,
+      created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (provider, model, text_sha256)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transcription_jobs (
+      id TEXT PRIMARY KEY,
+      status TEXT NOT NULL DEFAULT 'queued',
+      filename TEXT NOT NULL,
+      content_type TEXT NOT NULL,
+      audio_path TEXT NOT NULL,
+      audio_format TEXT,
+      audio_sha256 TEXT NOT NULL,
+      size_bytes INTEGER NOT NULL,
+      callback_url TEXT,
+      transcript_json TEXT,
+      warnings_json TEXT NOT NULL DEFAULT '[]',
+      error TEXT,
+      created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      started_at TEXT,
+      heartbeat_at TEXT,
+      finished_at TEXT
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transcription_jobs_status
+    ON transcription_jobs (status, created_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transcription_cache (
+      audio_sha256 TEXT NOT NULL,
+      provider TEXT NOT NULL,
+      model TEXT NOT NULL,
+      transcript_json TEXT NOT NULL,
+      last_used_at REAL NOT NULL,
+      created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (audio_sha256, provider, model)
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transcription_cache_last_used_at
+    ON transcription_cache (last_used_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+      idempotency_key TEXT PRIMARY KEY,
+      request_sha256 TEXT NOT NULL,
+      note_id INTEGER,
+      created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (note_id) REFERENCES notes(id) ON DELETE CASCADE
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at
+    ON idempotency_keys (created_at);
+    """,
 ]
@@ -0,0 +1,54 @@
+"""Binary codec for stored embedding vectors.
+
+Embeddings are stored as packed little-endian float32 so they can be read back
+without parsing, either as a zero-copy ``memoryview`` or as a NumPy array when
+NumPy is installed.
+"""
+
+import json
+import sqlite3
+import sys
+from array import array
+from collections.abc import Sequence
+
+EMBEDDING_DTYPE = "<f4"
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - exercised when the vector extra is absent
+    np = None  # type: ignore[assignment]
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def pack_embedding(vector: Sequence[float]) -> bytes:
+    packed = array("f", vector)
+    if not _LITTLE_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_embedding(blob: bytes) -> Sequence[float]:
+    if _LITTLE_ENDIAN:
+        return memoryview(blob).cast("f")
+    unpacked = array("f")
+    unpacked.frombytes(blob)
+    unpacked.byteswap()
+    return unpacked
+
+
+def embedding_array(blob: bytes):
+    if np is None:
+        raise RuntimeError("numpy is not installed")
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+
+def row_embedding(row: sqlite3.Row) -> Sequence[float]:
+    """Return a note row's vector, reading legacy JSON rows not yet backfilled."""
+    blob = row["embedding_blob"]
+    if blob is not None:
+        return unpack_embedding(blob)
+    return [float(value) for value in json.loads(row["embedding_json"] or "[]")]
@@ -2,22 +2,43 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from src.core.llm.clients import aclose_openai_clients
 from src.core.logging import configure_logging
 from src.core.middleware import request_context_middleware
-from src.db.engine import init_db
+from src.db.engine import (
+    close_connections,
+    init_db,
+    start_legacy_backfill,
+    stop_legacy_backfill,
+)
 from src.routers.audio import router as audio_router
 from src.routers.echo import router as echo_router
 from src.routers.health import router as health_router
 from src.routers.notes import router as notes_router
 from src.schemas.envelope import Envelope, envelope
 from src.schemas.root import RootPayload
+from src.services.audio_segments import shutdown_transcription_pools
+from src.services.transcription_jobs import start_transcription_workers, stop_transcription_workers
+from src.services.vector_index import clear_vector_indexes, load_vector_index
+from src.services.whisper_models import clear_whisper_pools, start_whisper_warmup
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     configure_logging()
     init_db()
+    load_vector_index()
+    start_legacy_backfill()
+    start_whisper_warmup()
+    start_transcription_workers()
     yield
+    stop_transcription_workers()
+    stop_legacy_backfill()
+    shutdown_transcription_pools()
+    clear_whisper_pools()
+    clear_vector_indexes()
+    await aclose_openai_clients()
+    close_connections()
 
 
 app = FastAPI(title="Echo Notes API", lifespan=lifespan)
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, File, UploadFile
+import asyncio
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 
 from src.core.request_context import add_warning
 from src.schemas.envelope import Envelope, envelope
-from src.schemas.transcript import Transcript
+from src.schemas.transcript import Transcript, TranscriptionJob
 from src.services.transcription import transcribe_upload
+from src.services.transcription_jobs import get_transcription_job, submit_transcription_job
+from src.services.uploads import UploadTooLargeError
 
 router = APIRouter(tags=["audio"])
 
@@ -24,9 +28,25 @@ if _MULTIPART_AVAILABLE:
 
     @router.post("/audio/transcribe", response_model=Envelope[Transcript])
     async def transcribe(file: UploadFile = File(...)) -> Envelope[Transcript]:
-        transcript = transcribe_upload(file)
+        try:
+            transcript = await asyncio.to_thread(transcribe_upload, file)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
         return envelope(transcript)
 
+    @router.post("/audio/jobs", response_model=Envelope[TranscriptionJob], status_code=202)
+    async def create_transcription_job(
+        file: UploadFile = File(...),
+        callback_url: str | None = Form(default=None),
+    ) -> Envelope[TranscriptionJob]:
+        try:
+            job = await asyncio.to_thread(submit_transcription_job, file, callback_url=callback_url)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return envelope(job)
+
 else:
 
     @router.post("/audio/transcribe", response_model=Envelope[Transcript])
@@ -47,3 +67,12 @@ else:
                 }
             )
         )
+
+
+@router.get("/audio/jobs/{job_id}", response_model=Envelope[TranscriptionJob])
+async def get_transcription_job_endpoint(job_id: str) -> Envelope[TranscriptionJob]:
+    try:
+        job = await asyncio.to_thread(get_transcription_job, job_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return envelope(job)
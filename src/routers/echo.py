@@ -1,13 +1,37 @@
+import json
+from collections.abc import AsyncIterator
+
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
-from src.schemas.envelope import Envelope, envelope
+from src.schemas.envelope import Envelope, build_meta, envelope
 from src.schemas.reflection import EchoRequest, Reflection
-from src.services.reflection import reflect_transcript
+from src.services.reflection import areflect_transcript, astream_reflection
 
 router = APIRouter(tags=["echo"])
 
 
 @router.post("/echo", response_model=Envelope[Reflection])
 async def echo(payload: EchoRequest) -> Envelope[Reflection]:
-    reflection_result = reflect_transcript(payload.transcript)
+    reflection_result = await areflect_transcript(payload.transcript)
     return envelope(reflection_result.reflection)
+
+
+@router.post("/echo/stream")
+async def echo_stream(payload: EchoRequest) -> StreamingResponse:
+    """Stream ``token``, ``field`` and ``reflection`` events, then the envelope ``meta``."""
+    return StreamingResponse(
+        _reflection_events(payload.transcript),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+async def _reflection_events(transcript: str) -> AsyncIterator[str]:
+    async for event in astream_reflection(transcript):
+        yield _sse(event.event, event.data)
+    yield _sse("meta", build_meta().model_dump())
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -1,11 +1,38 @@
+from dataclasses import asdict
+
 from fastapi import APIRouter
 
+from src.core.llm.breaker import circuit_breaker_snapshots
 from src.schemas.envelope import Envelope, envelope
-from src.schemas.health import HealthPayload
+from src.schemas.health import (
+    CacheStatsPayload,
+    CircuitBreakerPayload,
+    HealthPayload,
+    ProviderStatusPayload,
+    WhisperStatusPayload,
+)
+from src.services.embedding_cache import get_embedding_cache
+from src.services.reflection_cache import get_reflection_cache
+from src.services.transcription_cache import get_transcription_cache
+from src.services.whisper_models import whisper_status
 
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health", response_model=Envelope[HealthPayload])
 async def health() -> Envelope[HealthPayload]:
-    return envelope(HealthPayload())
+    caches = {
+        "embedding": CacheStatsPayload(**asdict(get_embedding_cache().stats())),
+        "reflection": CacheStatsPayload(**asdict(get_reflection_cache().stats())),
+        "transcription": CacheStatsPayload(**asdict(get_transcription_cache().stats())),
+    }
+    whisper = WhisperStatusPayload(**asdict(whisper_status()))
+    return envelope(HealthPayload(caches=caches, whisper=whisper))
+
+
+@router.get("/health/providers", response_model=Envelope[ProviderStatusPayload])
+async def provider_status() -> Envelope[ProviderStatusPayload]:
+    providers = [
+        CircuitBreakerPayload(**asdict(snapshot)) for snapshot in circuit_breaker_snapshots()
+    ]
+    return envelope(ProviderStatusPayload(providers=providers))
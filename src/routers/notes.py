@@ -1,18 +1,43 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 
 from src.schemas.envelope import Envelope, envelope
-from src.schemas.notes import CreateNoteRequest, ListNotesResponse, Note
-from src.services.notes import create_note, get_note, list_notes
+from src.schemas.notes import (
+    CreateNoteRequest,
+    ListNotesResponse,
+    Note,
+    SearchNotesResponse,
+)
+from src.services.idempotency import IdempotencyKeyInProgressError, IdempotencyKeyReusedError
+from src.services.notes import (
+    acreate_note,
+    acreate_note_idempotent,
+    aget_note,
+    alist_notes,
+    asearch_notes,
+)
 
 router = APIRouter(tags=["notes"])
 
 
 @router.post("/notes", response_model=Envelope[Note])
-async def create_note_endpoint(payload: CreateNoteRequest) -> Envelope[Note]:
+async def create_note_endpoint(
+    payload: CreateNoteRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, min_length=1, max_length=255),
+) -> Envelope[Note]:
     try:
-        note = create_note(payload)
+        if idempotency_key is None:
+            note = await acreate_note(payload)
+        else:
+            note, replayed = await acreate_note_idempotent(payload, idempotency_key)
+            if replayed:
+                response.headers["Idempotent-Replayed"] = "true"
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except IdempotencyKeyReusedError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except IdempotencyKeyInProgressError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     return envelope(note)
 
 
@@ -20,14 +45,26 @@ async def create_note_endpoint(payload: CreateNoteRequest) -> Envelope[Note]:
 async def list_notes_endpoint(
     limit: int = Query(default=50, ge=1, le=200)
 ) -> Envelope[ListNotesResponse]:
-    notes = list_notes(limit=limit)
+    notes = await alist_notes(limit=limit)
     return envelope(ListNotesResponse(notes=notes))
 
 
+@router.get("/notes/search", response_model=Envelope[SearchNotesResponse])
+async def search_notes_endpoint(
+    q: str = Query(min_length=1, max_length=4000),
+    k: int = Query(default=10, ge=1, le=50),
+) -> Envelope[SearchNotesResponse]:
+    try:
+        results = await asearch_notes(q, k=k)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return envelope(SearchNotesResponse(query=q, results=results))
+
+
 @router.get("/notes/{note_id}", response_model=Envelope[Note])
 async def get_note_endpoint(note_id: int) -> Envelope[Note]:
     try:
-        note = get_note(note_id)
+        note = await aget_note(note_id)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     return envelope(note)
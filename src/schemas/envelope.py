@@ -1,3 +1,4 @@
+from dataclasses import asdict
 from typing import Generic, TypeVar
 
 from pydantic import BaseModel, Field
@@ -13,10 +14,19 @@ class CostPayload(BaseModel):
     usd: float = 0.0
 
 
+class RoutingPayload(BaseModel):
+    model: str
+    tier: str
+    reason: str
+
+
 class MetaPayload(BaseModel):
     request_id: str
     cost: CostPayload = Field(default_factory=CostPayload)
     warnings: list[str] = Field(default_factory=list)
+    cache_hits: list[str] = Field(default_factory=list)
+    shared: list[str] = Field(default_factory=list)
+    routing: list[RoutingPayload] = Field(default_factory=list)
 
 
 class Envelope(BaseModel, Generic[T]):
@@ -34,6 +44,9 @@ def build_meta() -> MetaPayload:
             usd=request_meta.cost.usd,
         ),
         warnings=request_meta.warnings,
+        cache_hits=request_meta.cache_hits,
+        shared=request_meta.shared,
+        routing=[RoutingPayload(**asdict(decision)) for decision in request_meta.routing],
     )
 
 
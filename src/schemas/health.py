@@ -1,5 +1,40 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class CacheStatsPayload(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+
+
+class WhisperStatusPayload(BaseModel):
+    model: str
+    state: Literal["unavailable", "idle", "loading", "ready", "failed"]
+    ready: bool
+    replicas_target: int
+    replicas_loaded: int
+    replicas_in_use: int
+    model_memory_mb: float | None = None
+    memory_budget_mb: float | None = None
+    error: str | None = None
 
 
 class HealthPayload(BaseModel):
     status: str = "healthy"
+    caches: dict[str, CacheStatsPayload] = Field(default_factory=dict)
+    whisper: WhisperStatusPayload | None = None
+
+
+class CircuitBreakerPayload(BaseModel):
+    name: str
+    state: Literal["closed", "open", "half_open"]
+    calls: int
+    error_rate: float
+    p95_latency_ms: float | None = None
+    retry_after_seconds: float | None = None
+
+
+class ProviderStatusPayload(BaseModel):
+    providers: list[CircuitBreakerPayload] = Field(default_factory=list)
@@ -28,3 +28,13 @@ class CreateNoteRequest(BaseModel):
 
 class ListNotesResponse(BaseModel):
     notes: list[Note]
+
+
+class NoteSearchHit(BaseModel):
+    note: Note
+    score: float
+
+
+class SearchNotesResponse(BaseModel):
+    query: str
+    results: list[NoteSearchHit]
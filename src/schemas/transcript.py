@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class TranscriptMetadata(BaseModel):
@@ -8,6 +10,28 @@ class TranscriptMetadata(BaseModel):
     source: str
 
 
+class TranscriptSegment(BaseModel):
+    start: float
+    end: float
+    text: str
+
+
 class Transcript(BaseModel):
     text: str
     metadata: TranscriptMetadata
+    segments: list[TranscriptSegment] = Field(default_factory=list)
+
+
+class TranscriptionJob(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    filename: str
+    size_bytes: int
+    audio_sha256: str
+    callback_url: str | None = None
+    transcript: Transcript | None = None
+    warnings: list[str] = Field(default_factory=list)
+    error: str | None = None
+    created_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
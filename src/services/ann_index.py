@@ -0,0 +1,404 @@
+"""Persistent inverted-file (IVF) approximate nearest-neighbour index.
+
+Each embedding dimension gets its own directory next to the SQLite database
+(``<ECHO_NOTES_DB_PATH>.ivf/<dimension>/``, or ``.chunks.ivf`` for chunk vectors)
+holding append-only raw files:
+
+- ``vectors.f32``: row-normalized little-endian float32 vectors
+- ``ids.i64``: note (or chunk) id per row
+- ``lists.i32``: inverted-list assignment per row (-1 until the index is trained)
+- ``tombstones.i64``: deleted note ids
+- ``centroids.npy`` and ``meta.json``: written when the index is (re)trained
+
+Files are memory-mapped on startup, so a cold start does not rebuild anything.
+Inserts append to the files and are assigned to their nearest centroid; rows
+written before the first training are scanned exhaustively. The coarse
+quantizer is trained in a background thread once ``IVF_TRAIN_THRESHOLD`` rows
+exist and can be retrained offline as the corpus grows::
+
+    python -m src.services.ann_index rebuild
+    python -m src.services.ann_index benchmark --size 100000 --dimension 256
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from src.core.settings import get_settings
+from src.db.vectors import EMBEDDING_DTYPE, np
+from src.services.embeddings import top_k_similar
+from src.services.vector_index import CHUNKS_TABLE, NOTES_TABLE, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+IVF_TRAIN_THRESHOLD = 4096
+_KMEANS_ITERATIONS = 12
+_KMEANS_SAMPLE_PER_LIST = 64
+_REMAP_EVERY = 256
+_UNASSIGNED = -1
+_ID_DTYPE = "<i8"
+_LIST_DTYPE = "<i4"
+
+
+class IVFVectorStore:
+    """Approximate cosine store for one dimension backed by memory-mapped files."""
+
+    def __init__(self, directory: Path, dimension: int, *, nprobe: int) -> None:
+        self.directory = directory
+        self.dimension = dimension
+        self.nprobe = nprobe
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._training: threading.Thread | None = None
+        self._load()
+
+    @property
+    def size(self) -> int:
+        return self._rows - self._deleted_rows
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def append(self, note_id: int, vector: Sequence[float]) -> None:
+        row = normalize_rows(np.asarray(vector, dtype=np.float32))
+        list_id = _UNASSIGNED
+        if self._centroids is not None:
+            list_id = int(np.argmax(self._centroids @ row))
+
+        with self._lock:
+            self._append_files(
+                vectors=row.astype(EMBEDDING_DTYPE).tobytes(),
+                ids=np.asarray([note_id], dtype=_ID_DTYPE).tobytes(),
+                lists=np.asarray([list_id], dtype=_LIST_DTYPE).tobytes(),
+            )
+            self._tail_vectors.append(row)
+            self._tail_ids.append(note_id)
+            self._rows += 1
+            self.max_note_id = max(self.max_note_id, note_id)
+            if len(self._tail_ids) >= _REMAP_EVERY:
+                self._map_files()
+            # The insert that crosses the threshold should not pay for k-means.
+            if (
+                self._centroids is None
+                and self._training is None
+                and self._rows >= IVF_TRAIN_THRESHOLD
+            ):
+                self._training = threading.Thread(
+                    target=self._train_in_background, name="ivf-train", daemon=True
+                )
+                self._training.start()
+
+    def join_training(self, timeout: float | None = None) -> None:
+        """Wait for a background training run started by ``append``, if any."""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def remove(self, note_id: int) -> bool:
+        with self._lock:
+            if note_id in self._tombstones:
+                return False
+            present = note_id in self._tail_ids or bool(np.any(self._ids == note_id))
+            if not present:
+                return False
+            with (self.directory / "tombstones.i64").open("ab") as handle:
+                handle.write(np.asarray([note_id], dtype=_ID_DTYPE).tobytes())
+            self._tombstones.add(note_id)
+            self._tombstone_array = np.fromiter(self._tombstones, dtype=np.int64)
+            self._deleted_rows += 1
+            return True
+
+    def top_k(self, query: Sequence[float], k: int) -> list[tuple[int, float]]:
+        if self.size == 0 or k <= 0:
+            return []
+        query_row = normalize_rows(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            rows = self._candidate_rows(query_row)
+            matrix = self._vectors[rows]
+            ids = np.asarray(self._ids[rows], dtype=np.int64)
+            if self._tail_ids:
+                matrix = np.vstack([matrix, np.vstack(self._tail_vectors)])
+                ids = np.concatenate([ids, np.asarray(self._tail_ids, dtype=np.int64)])
+            if len(self._tombstone_array):
+                alive = ~np.isin(ids, self._tombstone_array)
+                matrix, ids = matrix[alive], ids[alive]
+        # Rows are stored unit-length, so their norms never need recomputing.
+        return top_k_similar(query_row, matrix, k, ids=ids, norms=1.0)
+
+    def train(self) -> None:
+        """(Re)train the coarse quantizer and compact tombstoned rows.
+
+        k-means runs on a snapshot without holding the lock, so searches and
+        inserts continue meanwhile; rows appended during training are assigned
+        to the new centroids when the files are rewritten.
+        """
+        with self._lock:
+            self._map_files()
+            alive = ~np.isin(self._ids, self._tombstone_array)
+            sample = np.array(self._vectors[alive], dtype=np.float32)
+        if not len(sample):
+            return
+        nlist = max(1, min(len(sample), int(4 * math.sqrt(len(sample)))))
+        centroids = _spherical_kmeans(sample, nlist)
+
+        with self._lock:
+            self._map_files()
+            alive = ~np.isin(self._ids, self._tombstone_array)
+            vectors = np.array(self._vectors[alive], dtype=np.float32)
+            ids = np.array(self._ids[alive], dtype=np.int64)
+            lists = _assign(vectors, centroids)
+
+            _atomic_write(self.directory / "vectors.f32", vectors.astype(EMBEDDING_DTYPE))
+            _atomic_write(self.directory / "ids.i64", ids.astype(_ID_DTYPE))
+            _atomic_write(self.directory / "lists.i32", lists.astype(_LIST_DTYPE))
+            _atomic_write(self.directory / "tombstones.i64", np.empty(0, dtype=_ID_DTYPE))
+            centroids_tmp = self.directory / "centroids.npy.tmp"
+            with centroids_tmp.open("wb") as handle:
+                np.save(handle, centroids)
+            os.replace(centroids_tmp, self.directory / "centroids.npy")
+            meta_tmp = self.directory / "meta.json.tmp"
+            meta_tmp.write_text(
+                json.dumps(
+                    {"dimension": self.dimension, "nlist": nlist, "trained_rows": len(sample)}
+                )
+            )
+            os.replace(meta_tmp, self.directory / "meta.json")
+            self._load_locked()
+
+    def _train_in_background(self) -> None:
+        try:
+            self.train()
+        except Exception:
+            logger.exception("Training the IVF index in %s failed.", self.directory)
+
+    def _load(self) -> None:
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self) -> None:
+        centroids_path = self.directory / "centroids.npy"
+        self._centroids = np.load(centroids_path) if centroids_path.exists() else None
+        tombstones = _read_array(self.directory / "tombstones.i64", _ID_DTYPE)
+        self._tombstones = {int(note_id) for note_id in tombstones}
+        self._tombstone_array = np.fromiter(self._tombstones, dtype=np.int64)
+        self._list_order = np.empty(0, dtype=np.int64)
+        self._sorted_lists = np.empty(0, dtype=_LIST_DTYPE)
+        self._mapped_rows = 0
+        self._map_files()
+        self._truncate_partial_rows()
+        self._rows = len(self._ids)
+        self._deleted_rows = int(np.count_nonzero(np.isin(self._ids, self._tombstone_array)))
+        self.max_note_id = int(self._ids.max()) if len(self._ids) else 0
+
+    def _map_files(self) -> None:
+        ids = _map_array(self.directory / "ids.i64", _ID_DTYPE)
+        lists = _map_array(self.directory / "lists.i32", _LIST_DTYPE)
+        rows = min(len(ids), len(lists))
+        vectors = _map_array(self.directory / "vectors.f32", EMBEDDING_DTYPE)
+        rows = min(rows, len(vectors) // self.dimension)
+        self._ids = ids[:rows]
+        self._lists = lists[:rows]
+        self._vectors = vectors[: rows * self.dimension].reshape(rows, self.dimension)
+        self._tail_vectors: list = []
+        self._tail_ids: list[int] = []
+
+        # Rows already ordered keep their place; only the new tail is sorted and
+        # merged in, after any earlier rows of the same list to keep the order stable.
+        start = self._mapped_rows
+        tail_order = start + np.argsort(self._lists[start:], kind="stable")
+        tail_lists = self._lists[tail_order]
+        positions = np.searchsorted(self._sorted_lists, tail_lists, side="right")
+        self._list_order = np.insert(self._list_order, positions, tail_order)
+        self._sorted_lists = np.insert(self._sorted_lists, positions, tail_lists)
+        self._mapped_rows = rows
+        nlist = len(self._centroids) if self._centroids is not None else 0
+        self._list_bounds = np.searchsorted(self._sorted_lists, np.arange(_UNASSIGNED, nlist + 1))
+
+    def _candidate_rows(self, query_row):
+        def rows_for(list_id: int):
+            position = list_id - _UNASSIGNED
+            return self._list_order[self._list_bounds[position] : self._list_bounds[position + 1]]
+
+        if self._centroids is None:
+            return np.arange(len(self._ids))
+        centroid_scores = self._centroids @ query_row
+        nprobe = min(self.nprobe, len(self._centroids))
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        parts = [rows_for(_UNASSIGNED)] + [rows_for(int(list_id)) for list_id in probes]
+        return np.sort(np.concatenate(parts))
+
+    def _truncate_partial_rows(self) -> None:
+        # A crash between file appends can leave a partial trailing row; drop it
+        # so later appends stay aligned across the three files.
+        rows = len(self._ids)
+        for name, row_bytes in (
+            ("vectors.f32", self.dimension * np.dtype(EMBEDDING_DTYPE).itemsize),
+            ("lists.i32", np.dtype(_LIST_DTYPE).itemsize),
+            ("ids.i64", np.dtype(_ID_DTYPE).itemsize),
+        ):
+            path = self.directory / name
+            if path.exists() and path.stat().st_size > rows * row_bytes:
+                os.truncate(path, rows * row_bytes)
+
+    def _append_files(self, *, vectors: bytes, ids: bytes, lists: bytes) -> None:
+        for name, payload in (("vectors.f32", vectors), ("lists.i32", lists), ("ids.i64", ids)):
+            with (self.directory / name).open("ab") as handle:
+                handle.write(payload)
+
+
+def ivf_directory(database_path: Path, table: str = NOTES_TABLE) -> Path:
+    suffix = ".ivf" if table == NOTES_TABLE else ".chunks.ivf"
+    return database_path.with_name(f"{database_path.name}{suffix}")
+
+
+def open_ivf_index(database_path: Path, *, nprobe: int, table: str = NOTES_TABLE) -> VectorIndex:
+    root = ivf_directory(database_path, table)
+    stores: dict[int, IVFVectorStore] = {}
+    if root.exists():
+        for child in root.iterdir():
+            if child.is_dir() and child.name.isdigit():
+                dimension = int(child.name)
+                stores[dimension] = IVFVectorStore(child, dimension, nprobe=nprobe)
+
+    def store_factory(dimension: int) -> IVFVectorStore:
+        return IVFVectorStore(root / str(dimension), dimension, nprobe=nprobe)
+
+    return VectorIndex(store_factory=store_factory, stores=stores, table=table)
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms != 0)
+
+
+def _spherical_kmeans(vectors, nlist: int):
+    rng = np.random.default_rng(0)
+    sample_size = min(len(vectors), nlist * _KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = ~np.any(sums, axis=1)
+        sums[empty] = centroids[empty]
+        centroids = normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+def _assign(vectors, centroids, batch_size: int = 8192):
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start : start + batch_size]
+        lists[start : start + batch_size] = np.argmax(batch @ centroids.T, axis=1)
+    return lists
+
+
+def _map_array(path: Path, dtype: str):
+    if not path.exists() or path.stat().st_size < np.dtype(dtype).itemsize:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _read_array(path: Path, dtype: str):
+    if not path.exists():
+        return np.empty(0, dtype=dtype)
+    return np.fromfile(path, dtype=dtype)
+
+
+def _atomic_write(path: Path, values) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    values.tofile(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def benchmark(*, size: int, dimension: int, queries: int, k: int, nprobes: Sequence[int]) -> None:
+    """Print recall@k and mean query latency of the IVF index against the exact scan."""
+    import tempfile
+
+    from src.services.vector_index import _NumpyVectorStore
+
+    rng = np.random.default_rng(7)
+    clusters = normalize_rows(rng.standard_normal((max(1, size // 100), dimension)))
+    vectors = clusters[rng.integers(0, len(clusters), size=size)]
+    vectors = normalize_rows(
+        vectors + 0.35 * rng.standard_normal(vectors.shape) / math.sqrt(dimension)
+    )
+    vectors = vectors.astype(np.float32)
+    query_vectors = vectors[rng.choice(size, size=queries, replace=False)]
+
+    exact = _NumpyVectorStore(dimension)
+    for note_id, vector in enumerate(vectors, start=1):
+        exact.append(note_id, vector)
+
+    started = time.perf_counter()
+    truth = [{note_id for note_id, _ in exact.top_k(query, k)} for query in query_vectors]
+    exact_ms = (time.perf_counter() - started) * 1000 / queries
+    print(f"exact scan: {size} x {dimension}, {exact_ms:.2f} ms/query")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = IVFVectorStore(Path(directory), dimension, nprobe=1)
+        for note_id, vector in enumerate(vectors, start=1):
+            store.append(note_id, vector)
+        store.train()
+        print(f"ivf trained: nlist={len(store._centroids)}")
+        for nprobe in nprobes:
+            store.nprobe = nprobe
+            started = time.perf_counter()
+            results = [{note_id for note_id, _ in store.top_k(query, k)} for query in query_vectors]
+            ivf_ms = (time.perf_counter() - started) * 1000 / queries
+            recall = sum(len(hit & want) for hit, want in zip(results, truth, strict=True)) / (
+                k * queries
+            )
+            print(f"nprobe={nprobe:>4}: recall@{k}={recall:.3f}, {ivf_ms:.2f} ms/query")
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.services.ann_index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="retrain and compact the IVF index next to the database")
+    bench = commands.add_parser("benchmark", help="compare recall and latency against exact scan")
+    bench.add_argument("--size", type=int, default=100_000)
+    bench.add_argument("--dimension", type=int, default=256)
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("numpy is required: pip install '.[vector]'")
+    if args.command == "benchmark":
+        benchmark(
+            size=args.size,
+            dimension=args.dimension,
+            queries=args.queries,
+            k=args.k,
+            nprobes=args.nprobe,
+        )
+        return
+
+    from src.db.engine import backfill_legacy_rows, init_db
+
+    settings = get_settings()
+    init_db()
+    backfill_legacy_rows()
+    for table in (NOTES_TABLE, CHUNKS_TABLE):
+        index = open_ivf_index(
+            settings.database_path, nprobe=settings.vector_index_nprobe, table=table
+        )
+        index.sync()
+        for store in index.stores:
+            store.train()
+        directory = ivf_directory(settings.database_path, table)
+        print(f"rebuilt IVF index with {len(index)} vectors at {directory}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,198 @@
+"""Segmented, multi-process local Whisper transcription for long recordings.
+
+Audio is cut at pauses found by a short-time energy VAD into windows of about
+``transcription_segment_seconds``, each padded with ``transcription_segment_overlap_seconds``
+of context on both sides. Windows are transcribed in a process pool whose
+workers load the Whisper model once, and the segments are stitched back on an
+absolute timeline, keeping each segment only from the window whose un-padded
+core contains its midpoint so overlapping speech is not repeated.
+
+Segmentation needs NumPy, which Whisper already depends on.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import pairwise
+
+from src.db.vectors import np
+from src.schemas.transcript import TranscriptSegment
+
+SAMPLE_RATE = 16_000
+_FRAME_SECONDS = 0.03
+# Pauses shorter than this are not worth cutting at; energy is averaged over it.
+_PAUSE_SECONDS = 0.3
+
+
+@dataclass
+class AudioWindow:
+    start: int
+    end: int
+    keep_start: float
+    keep_end: float
+
+
+def plan_windows(
+    samples,
+    *,
+    target_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float | None = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[AudioWindow]:
+    """Split mono samples into overlapping windows cut at the quietest nearby pause.
+
+    Each cut is placed where the smoothed frame energy is lowest within
+    ``search_seconds`` (default: a quarter window) of the ideal boundary.
+    Recordings shorter than one and a half windows are returned as one window.
+    """
+    total = len(samples)
+    target = max(1, int(target_seconds * sample_rate))
+    if total <= target * 1.5:
+        return [AudioWindow(start=0, end=total, keep_start=0.0, keep_end=math.inf)]
+
+    frame = max(1, int(_FRAME_SECONDS * sample_rate))
+    energy = _smoothed_energy(samples, frame)
+    search = int(
+        (search_seconds if search_seconds is not None else target_seconds / 4) * sample_rate
+    )
+    boundaries = [0]
+    while total - boundaries[-1] > target * 1.5:
+        ideal = boundaries[-1] + target
+        low = max(boundaries[-1] + frame, ideal - search) // frame
+        high = max(low + 1, min(total - frame, ideal + search) // frame)
+        quietest = low + int(np.argmin(energy[low:high]))
+        boundaries.append(quietest * frame + frame // 2)
+    boundaries.append(total)
+
+    overlap = int(overlap_seconds * sample_rate)
+    windows = []
+    for position, (start, end) in enumerate(pairwise(boundaries)):
+        last = position == len(boundaries) - 2
+        windows.append(
+            AudioWindow(
+                start=max(0, start - overlap),
+                end=min(total, end + overlap),
+                keep_start=start / sample_rate,
+                keep_end=math.inf if last else end / sample_rate,
+            )
+        )
+    return windows
+
+
+def stitch_segments(
+    window_segments: list[tuple[AudioWindow, list[TranscriptSegment]]],
+) -> list[TranscriptSegment]:
+    """Merge per-window segments (absolute timestamps) into one ordered timeline."""
+    stitched: list[TranscriptSegment] = []
+    for window, segments in window_segments:
+        for segment in segments:
+            midpoint = (segment.start + segment.end) / 2
+            if not window.keep_start <= midpoint < window.keep_end:
+                continue
+            previous = stitched[-1] if stitched else None
+            if (
+                previous is not None
+                and segment.start < previous.end
+                and segment.text.strip().lower() == previous.text.strip().lower()
+            ):
+                continue
+            stitched.append(segment)
+    return stitched
+
+
+def transcribe_windows(
+    samples, windows: list[AudioWindow], *, model_name: str, processes: int
+) -> tuple[list[TranscriptSegment], str | None]:
+    """Transcribe windows in parallel and return stitched segments and the language."""
+    pool = get_transcription_pool(model_name, processes)
+    futures = [
+        pool.submit(_transcribe_window, samples[window.start : window.end], window.start)
+        for window in windows
+    ]
+    results = [future.result() for future in futures]
+    languages = Counter(language for _, language in results if language)
+    window_segments = [
+        (window, [TranscriptSegment(start=start, end=end, text=text) for start, end, text in raw])
+        for window, (raw, _) in zip(windows, results, strict=True)
+    ]
+    language = languages.most_common(1)[0][0] if languages else None
+    return stitch_segments(window_segments), language
+
+
+def _smoothed_energy(samples, frame: int):
+    frames = len(samples) // frame
+    rms = np.sqrt(
+        np.mean(
+            np.square(
+                np.asarray(samples[: frames * frame], dtype=np.float32).reshape(frames, frame)
+            ),
+            axis=1,
+        )
+    )
+    width = max(1, int(_PAUSE_SECONDS / _FRAME_SECONDS))
+    return np.convolve(rms, np.ones(width, dtype=np.float32) / width, mode="same")
+
+
+_WORKER_MODEL = None
+
+
+def _load_worker_model(model_name: str, threads: int) -> None:
+    global _WORKER_MODEL
+    import torch  # type: ignore
+    import whisper  # type: ignore
+
+    # Each worker would otherwise start one intra-op thread per core and the
+    # processes would oversubscribe the CPU instead of running side by side.
+    torch.set_num_threads(threads)
+    _WORKER_MODEL = whisper.load_model(model_name)
+
+
+def _transcribe_window(
+    samples, start_sample: int
+) -> tuple[list[tuple[float, float, str]], str | None]:
+    result = _WORKER_MODEL.transcribe(samples)  # type: ignore[union-attr]
+    offset = start_sample / SAMPLE_RATE
+    segments = [
+        (offset + float(segment["start"]), offset + float(segment["end"]), segment["text"].strip())
+        for segment in result.get("segments") or []
+        if segment["text"].strip()
+    ]
+    return segments, result.get("language")
+
+
+_POOLS: dict[tuple[str, int], ProcessPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_transcription_pool(model_name: str, processes: int) -> ProcessPoolExecutor:
+    """Return the shared worker pool for a model, starting it on first use.
+
+    Workers are spawned rather than forked so they never inherit the API's
+    threads and locks; each loads the model once in its initializer and gets
+    an equal share of the CPU cores for PyTorch's intra-op threads.
+    """
+    key = (model_name, processes)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_worker_model,
+                initargs=(model_name, max(1, (os.cpu_count() or 1) // processes)),
+            )
+            _POOLS[key] = pool
+    return pool
+
+
+def shutdown_transcription_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
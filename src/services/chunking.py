@@ -0,0 +1,98 @@
+import re
+from dataclasses import dataclass
+
+from src.core.llm.tokens import count_tokens
+
+_SENTENCE_PATTERN = re.compile(r"[^.?!]+(?:[.?!]+|$)")
+_WORD_PATTERN = re.compile(r"\S+")
+
+
+@dataclass
+class TranscriptChunk:
+    index: int
+    text: str
+    start_char: int
+    end_char: int
+
+
+def chunk_transcript(
+    text: str, *, max_tokens: int, overlap_tokens: int, model: str | None = None
+) -> list[TranscriptChunk]:
+    """Split a transcript into sentence windows of at most ``max_tokens`` tokens.
+
+    Consecutive windows share trailing sentences worth up to ``overlap_tokens``
+    so a thought that straddles a boundary is embedded whole at least once.
+    Sentences longer than the window are split between words. Offsets refer to
+    the original text, and a transcript that fits in one window is one chunk, as
+    is one with no sentence text at all (e.g. only punctuation).
+    """
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens - 1))
+    units = [
+        unit
+        for sentence in _spans(_SENTENCE_PATTERN, text)
+        for unit in _fit_span(text, sentence, max_tokens, model)
+    ]
+    if not units:
+        start = len(text) - len(text.lstrip())
+        end = max(start, len(text.rstrip()))
+        return [TranscriptChunk(index=0, text=text[start:end], start_char=start, end_char=end)]
+    chunks: list[TranscriptChunk] = []
+    start = 0
+    while start < len(units):
+        end, window_tokens = start, 0
+        while end < len(units) and (end == start or window_tokens + units[end][2] <= max_tokens):
+            window_tokens += units[end][2]
+            end += 1
+        chunks.append(
+            TranscriptChunk(
+                index=len(chunks),
+                text=text[units[start][0] : units[end - 1][1]],
+                start_char=units[start][0],
+                end_char=units[end - 1][1],
+            )
+        )
+        if end == len(units):
+            break
+        # Step back over trailing sentences that fit in the overlap, but always advance.
+        next_start, carried = end, 0
+        while next_start - 1 > start and carried + units[next_start - 1][2] <= overlap_tokens:
+            next_start -= 1
+            carried += units[next_start][2]
+        start = next_start
+    return chunks
+
+
+def _spans(pattern: re.Pattern[str], text: str) -> list[tuple[int, int]]:
+    spans = []
+    for match in pattern.finditer(text):
+        # Trim surrounding whitespace so offsets point at the words themselves.
+        start, end = match.span()
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
+    return spans
+
+
+def _fit_span(
+    text: str, span: tuple[int, int], max_tokens: int, model: str | None
+) -> list[tuple[int, int, int]]:
+    start, end = span
+    tokens = count_tokens(text[start:end], model)
+    if tokens <= max_tokens:
+        return [(start, end, tokens)]
+    pieces: list[tuple[int, int, int]] = []
+    piece_start, piece_end, piece_tokens = start, start, 0
+    for match in _WORD_PATTERN.finditer(text, start, end):
+        word_tokens = count_tokens(f" {match.group()}", model)
+        if piece_end > piece_start and piece_tokens + word_tokens > max_tokens:
+            pieces.append((piece_start, piece_end, piece_tokens))
+            piece_start, piece_tokens = match.start(), 0
+        piece_end = match.end()
+        piece_tokens += word_tokens
+    if piece_end > piece_start:
+        pieces.append((piece_start, piece_end, piece_tokens))
+    return pieces
@@ -0,0 +1,237 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.core.settings import get_settings
+from src.db.engine import get_connection
+from src.db.vectors import pack_embedding, unpack_embedding
+
+# Trimming walks the last_used_at index, so it runs once per this many inserts.
+_TRIM_EVERY = 64
+# Hits are read with a plain SELECT; their last_used_at is written in batches of this
+# size, or with the next insert, so lookups never wait on the write lock.
+_TOUCH_EVERY = 64
+# Fingerprints per IN (...) lookup, well under SQLite's bound-parameter limit.
+_LOAD_BATCH = 500
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+
+
+def text_fingerprint(text: str) -> str:
+    """Hash text with whitespace collapsed so trivially reformatted input still hits."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: bounded in-process LRU over a SQLite table.
+
+    Entries are keyed by (provider, model, sha256(text)). The first lookup for a
+    provider under a new model purges that provider's rows for other models, so
+    changing ``ECHO_NOTES_EMBEDDING_MODEL`` invalidates the cache automatically.
+    SQLite hits refresh ``last_used_at`` in batches, and the table is trimmed to
+    the ``max_rows`` most recently used rows; ``max_rows`` of 0 disables the table.
+    """
+
+    def __init__(self, max_entries: int, max_rows: int) -> None:
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._puts_since_trim = 0
+        self._touched: dict[tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str, str], list[float]] = OrderedDict()
+        self._active_models: dict[str, str] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, *, provider: str, model: str, text: str) -> list[float] | None:
+        return self.get_many(provider=provider, model=model, texts=[text])[0]
+
+    def get_many(self, *, provider: str, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Look up several texts at once; SQLite is read in one query for all memory misses."""
+        self._ensure_model(provider, model)
+        keys = [(provider, model, text_fingerprint(text)) for text in texts]
+        vectors: list[list[float] | None] = [None] * len(keys)
+        with self._lock:
+            for position, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    vectors[position] = vector
+        missing = [position for position, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return vectors
+
+        loaded = self._load_many(provider, model, {keys[position][2] for position in missing})
+        now = time.time()
+        with self._lock:
+            for position in missing:
+                key = keys[position]
+                vector = loaded.get(key[2])
+                if vector is None:
+                    self._misses += 1
+                    continue
+                self._hits += 1
+                self._remember(key, vector)
+                self._touched[key] = now
+                vectors[position] = vector
+            touched = self._take_touched() if len(self._touched) >= _TOUCH_EVERY else {}
+        if touched:
+            try:
+                connection = get_connection()
+                with connection:
+                    self._write_touched(connection, touched)
+            except sqlite3.Error:
+                pass
+        return vectors
+
+    def put(self, *, provider: str, model: str, text: str, vector: list[float]) -> None:
+        self.put_many(provider=provider, model=model, texts=[text], vectors=[vector])
+
+    def put_many(
+        self, *, provider: str, model: str, texts: list[str], vectors: list[list[float]]
+    ) -> None:
+        """Store several vectors from one provider batch in a single transaction."""
+        keys = [(provider, model, text_fingerprint(text)) for text in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors, strict=True):
+                self._remember(key, vector)
+            if self.max_rows <= 0:
+                return
+            self._puts_since_trim += len(keys)
+            trim = self._puts_since_trim >= _TRIM_EVERY
+            if trim:
+                self._puts_since_trim = 0
+            touched = self._take_touched()
+        now = time.time()
+        try:
+            connection = get_connection()
+            with connection:
+                # Recorded before trimming so recently read rows are kept.
+                self._write_touched(connection, touched)
+                connection.executemany(
+                    """
+                    INSERT OR REPLACE INTO embedding_cache (
+                      provider, model, text_sha256, embedding_blob, embedding_dim, last_used_at
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (*key, pack_embedding(vector), len(vector), now)
+                        for key, vector in zip(keys, vectors, strict=True)
+                    ],
+                )
+                if trim:
+                    connection.execute(
+                        """
+                        DELETE FROM embedding_cache
+                        WHERE rowid IN (
+                          SELECT rowid FROM embedding_cache
+                          ORDER BY last_used_at DESC
+                          LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.max_rows,),
+                    )
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, entries=len(self._entries))
+
+    def _remember(self, key: tuple[str, str, str], vector: list[float]) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _take_touched(self) -> dict[tuple[str, str, str], float]:
+        touched, self._touched = self._touched, {}
+        return touched
+
+    @staticmethod
+    def _write_touched(
+        connection: sqlite3.Connection, touched: dict[tuple[str, str, str], float]
+    ) -> None:
+        connection.executemany(
+            """
+            UPDATE embedding_cache SET last_used_at = ?
+            WHERE provider = ? AND model = ? AND text_sha256 = ?
+            """,
+            [(used_at, *key) for key, used_at in touched.items()],
+        )
+
+    def _load_many(
+        self, provider: str, model: str, fingerprints: set[str]
+    ) -> dict[str, list[float]]:
+        if self.max_rows <= 0:
+            return {}
+        ordered = sorted(fingerprints)
+        loaded: dict[str, list[float]] = {}
+        try:
+            connection = get_connection()
+            for start in range(0, len(ordered), _LOAD_BATCH):
+                batch = ordered[start : start + _LOAD_BATCH]
+                # Only "?" placeholders are interpolated into the query.
+                placeholders = ", ".join("?" for _ in batch)
+                rows = connection.execute(
+                    f"""
+                    SELECT text_sha256, embedding_blob FROM embedding_cache
+                    WHERE provider = ? AND model = ? AND text_sha256 IN ({placeholders})
+                    """,  # nosec B608
+                    (provider, model, *batch),
+                ).fetchall()
+                for row in rows:
+                    loaded[row["text_sha256"]] = list(unpack_embedding(row["embedding_blob"]))
+        except sqlite3.Error:
+            pass
+        return loaded
+
+    def _ensure_model(self, provider: str, model: str) -> None:
+        with self._lock:
+            if self._active_models.get(provider) == model:
+                return
+            self._active_models[provider] = model
+            for key in [key for key in self._entries if key[0] == provider and key[1] != model]:
+                del self._entries[key]
+        try:
+            connection = get_connection()
+            with connection:
+                connection.execute(
+                    "DELETE FROM embedding_cache WHERE provider = ? AND model != ?",
+                    (provider, model),
+                )
+        except sqlite3.Error:
+            pass
+
+
+_CACHES: dict[Path, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    settings = get_settings()
+    with _CACHES_LOCK:
+        cache = _CACHES.get(settings.database_path)
+        if cache is None:
+            cache = EmbeddingCache(
+                max_entries=settings.embedding_cache_size,
+                max_rows=settings.embedding_cache_db_size,
+            )
+            _CACHES[settings.database_path] = cache
+    return cache
+
+
+def clear_embedding_caches() -> None:
+    with _CACHES_LOCK:
+        _CACHES.clear()
@@ -1,12 +1,34 @@
+import asyncio
 import hashlib
+import heapq
 import math
 import re
+import threading
+from collections.abc import Sequence
+from concurrent.futures import Future
 from dataclasses import dataclass
 from typing import Protocol
 
-from src.core.request_context import add_warning
+from src.core.llm.breaker import get_circuit_breaker
+from src.core.llm.tokens import count_tokens
+from src.core.llm.clients import (
+    acall_with_deadline,
+    call_with_deadline,
+    get_async_openai_client,
+    get_openai_client,
+)
+from src.core.request_context import (
+    add_warning,
+    deadline_exhausted,
+    record_cache_hit,
+    record_shared,
+    remaining_budget,
+)
+from src.core.singleflight import SingleFlight
 from src.core.settings import get_settings
 from src.core.llm.tracker import track_llm_call
+from src.db.vectors import np
+from src.services.embedding_cache import get_embedding_cache, text_fingerprint
 
 
 @dataclass
@@ -19,11 +41,30 @@ class EmbeddingResult:
     usd: float
 
 
+_EMBEDDING_FLIGHTS: SingleFlight[EmbeddingResult] = SingleFlight()
+_FALLBACK_MODEL = "hash-emb-v1"
+
+
 class EmbeddingProvider(Protocol):
     name: str
 
-    def embed(self, *, text: str, model: str) -> EmbeddingResult:
-        """Generate embedding vector for text."""
+    def embed(self, *, text: str, model: str, timeout: float | None = None) -> EmbeddingResult:
+        """Generate embedding vector for text within ``timeout`` seconds, if given."""
+
+    def embed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        """Generate embedding vectors for several texts, in input order."""
+
+    async def aembed(
+        self, *, text: str, model: str, timeout: float | None = None
+    ) -> EmbeddingResult:
+        """Async variant of ``embed`` that does not block the event loop."""
+
+    async def aembed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        """Async variant of ``embed_batch`` that does not block the event loop."""
 
 
 class LocalHashEmbeddingProvider:
@@ -32,7 +73,7 @@ class LocalHashEmbeddingProvider:
     def __init__(self, dimension: int = 64) -> None:
         self.dimension = dimension
 
-    def embed(self, *, text: str, model: str) -> EmbeddingResult:
+    def embed(self, *, text: str, model: str, timeout: float | None = None) -> EmbeddingResult:
         vector = [0.0] * self.dimension
         tokens = re.findall(r"[a-zA-Z0-9']+", text.lower())
         if not tokens:
@@ -53,7 +94,7 @@ class LocalHashEmbeddingProvider:
 
         norm = math.sqrt(sum(component * component for component in vector))
         normalized = [component / norm for component in vector] if norm else vector
-        prompt_tokens = max(1, int(len(text) / 4))
+        prompt_tokens = max(1, count_tokens(text, model))
         return EmbeddingResult(
             vector=normalized,
             provider=self.name,
@@ -63,6 +104,21 @@ class LocalHashEmbeddingProvider:
             usd=round(prompt_tokens * 0.00000002, 8),
         )
 
+    def embed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        return [self.embed(text=text, model=model) for text in texts]
+
+    async def aembed(
+        self, *, text: str, model: str, timeout: float | None = None
+    ) -> EmbeddingResult:
+        return self.embed(text=text, model=model)
+
+    async def aembed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        return self.embed_batch(texts=texts, model=model)
+
 
 class OpenAIEmbeddingProvider:
     name = "openai-embedding"
@@ -72,45 +128,393 @@ class OpenAIEmbeddingProvider:
         self.base_url = base_url
         self.cost_per_1k = cost_per_1k
 
-    def embed(self, *, text: str, model: str) -> EmbeddingResult:
-        try:
-            from openai import OpenAI
-        except ModuleNotFoundError as exc:
-            raise RuntimeError("openai package is not installed") from exc
+    def embed(self, *, text: str, model: str, timeout: float | None = None) -> EmbeddingResult:
+        return self.embed_batch(texts=[text], model=model, timeout=timeout)[0]
+
+    def embed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        result = call_with_deadline(
+            get_openai_client(api_key=self.api_key, base_url=self.base_url),
+            timeout,
+            lambda client: client.embeddings.create(model=model, input=texts),
+        )
+        return self._build_results(result, texts=texts, model=model)
+
+    async def aembed(
+        self, *, text: str, model: str, timeout: float | None = None
+    ) -> EmbeddingResult:
+        return (await self.aembed_batch(texts=[text], model=model, timeout=timeout))[0]
 
-        client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-        result = client.embeddings.create(model=model, input=text)
-        vector = [float(value) for value in result.data[0].embedding]
+    async def aembed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        result = await acall_with_deadline(
+            get_async_openai_client(api_key=self.api_key, base_url=self.base_url),
+            timeout,
+            lambda client: client.embeddings.create(model=model, input=texts),
+        )
+        return self._build_results(result, texts=texts, model=model)
+
+    def _build_results(self, result, *, texts: list[str], model: str) -> list[EmbeddingResult]:
+        vectors = [
+            [float(value) for value in item.embedding]
+            for item in sorted(result.data, key=lambda item: item.index)
+        ]
         usage = result.usage
-        prompt_tokens = int(getattr(usage, "prompt_tokens", 0) or max(1, int(len(text) / 4)))
-        usd = round((prompt_tokens * self.cost_per_1k) / 1000, 8)
-        return EmbeddingResult(
-            vector=vector,
-            provider=self.name,
-            model=model,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=0,
-            usd=usd,
+        total_chars = sum(max(1, len(text)) for text in texts)
+        total_tokens = int(getattr(usage, "prompt_tokens", 0) or max(1, int(total_chars / 4)))
+        results = []
+        for text, vector in zip(texts, vectors, strict=True):
+            # The API reports usage per request; attribute it by input length.
+            prompt_tokens = max(1, round(total_tokens * max(1, len(text)) / total_chars))
+            results.append(
+                EmbeddingResult(
+                    vector=vector,
+                    provider=self.name,
+                    model=model,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=0,
+                    usd=round((prompt_tokens * self.cost_per_1k) / 1000, 8),
+                )
+            )
+        return results
+
+
+class CoalescingEmbeddingProvider:
+    """Collects concurrent ``embed`` calls into one ``embed_batch`` request.
+
+    The first caller in a batch arms a short timer; the batch is sent when the
+    window elapses or ``max_batch`` inputs are queued, whichever comes first.
+    Each caller gets its own ``EmbeddingResult`` back, so cost is still recorded
+    against the request that asked for it.
+    """
+
+    def __init__(
+        self, inner: EmbeddingProvider, *, model: str, window_seconds: float, max_batch: int
+    ) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.model = model
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, Future[EmbeddingResult]]] = []
+        self._timer: threading.Timer | None = None
+
+    def embed(self, *, text: str, model: str, timeout: float | None = None) -> EmbeddingResult:
+        if model != self.model:
+            return self.inner.embed(text=text, model=model, timeout=timeout)
+        return self.submit(text).result(timeout=timeout)
+
+    def embed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        return self.inner.embed_batch(texts=texts, model=model, timeout=timeout)
+
+    async def aembed(
+        self, *, text: str, model: str, timeout: float | None = None
+    ) -> EmbeddingResult:
+        if model != self.model:
+            return await self.inner.aembed(text=text, model=model, timeout=timeout)
+        # Only this caller stops waiting on timeout; the shared batch keeps going.
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(self.submit(text))), timeout
         )
 
+    async def aembed_batch(
+        self, *, texts: list[str], model: str, timeout: float | None = None
+    ) -> list[EmbeddingResult]:
+        return await self.inner.aembed_batch(texts=texts, model=model, timeout=timeout)
+
+    def submit(self, text: str) -> Future[EmbeddingResult]:
+        """Queue text for the next batch; the batch is sent from a worker thread."""
+        future: Future[EmbeddingResult] = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take_pending_locked()
+                threading.Thread(target=self._send, args=(batch,), daemon=True).start()
+            elif len(self._pending) == 1:
+                self._timer = threading.Timer(self.window_seconds, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch = self._take_pending_locked()
+        if batch:
+            self._send(batch)
+
+    def _take_pending_locked(self) -> list[tuple[str, Future[EmbeddingResult]]]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _send(self, batch: list[tuple[str, Future[EmbeddingResult]]]) -> None:
+        try:
+            results = self.inner.embed_batch(texts=[text for text, _ in batch], model=self.model)
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results, strict=True):
+            future.set_result(result)
+
+
+_COALESCERS: dict[tuple, CoalescingEmbeddingProvider] = {}
+_COALESCERS_LOCK = threading.Lock()
+
+
+def _coalesced(provider: OpenAIEmbeddingProvider, model: str) -> EmbeddingProvider:
+    settings = get_settings()
+    if settings.embedding_batch_window_ms <= 0:
+        return provider
+    key = (
+        provider.name,
+        model,
+        provider.api_key,
+        provider.base_url,
+        settings.embedding_batch_window_ms,
+        settings.embedding_batch_max_inputs,
+    )
+    with _COALESCERS_LOCK:
+        coalescer = _COALESCERS.get(key)
+        if coalescer is None:
+            coalescer = CoalescingEmbeddingProvider(
+                provider,
+                model=model,
+                window_seconds=settings.embedding_batch_window_ms / 1000,
+                max_batch=settings.embedding_batch_max_inputs,
+            )
+            _COALESCERS[key] = coalescer
+    return coalescer
+
 
 def generate_embedding(text: str) -> list[float]:
+    return embed_text(text).vector
+
+
+async def agenerate_embedding(text: str) -> list[float]:
+    return (await aembed_text(text)).vector
+
+
+def embed_text(text: str) -> EmbeddingResult:
+    provider, model = _resolve_embedding_provider()
+    cached = _cached_result(provider, model, text)
+    if cached is not None:
+        return cached
+
+    result, shared = _EMBEDDING_FLIGHTS.do(
+        (provider.name, model, text_fingerprint(text)),
+        lambda: _generate_embedding(provider, model, text),
+    )
+    return _shared_embedding(result) if shared else result
+
+
+async def aembed_text(text: str) -> EmbeddingResult:
     provider, model = _resolve_embedding_provider()
+    cached = await asyncio.to_thread(_cached_result, provider, model, text)
+    if cached is not None:
+        return cached
+
+    result, shared = await _EMBEDDING_FLIGHTS.ado(
+        (provider.name, model, text_fingerprint(text)),
+        lambda: _agenerate_embedding(provider, model, text),
+    )
+    return _shared_embedding(result) if shared else result
+
+
+def embed_texts(texts: list[str]) -> list[EmbeddingResult]:
+    """Embed several texts, in input order, with one batched provider call.
+
+    Cached texts are served from the embedding cache and only the misses are
+    sent. If the misses fall back to local embeddings, the cached texts are
+    re-embedded locally too, so every vector shares one model and dimension.
+    A single text goes through ``embed_text`` so it still coalesces and shares
+    in-flight calls with other requests.
+    """
+    if len(texts) == 1:
+        return [embed_text(texts[0])]
+    provider, model = _resolve_embedding_provider()
+    results = _cached_results(provider, model, texts)
+    missing = [position for position, result in enumerate(results) if result is None]
+    if missing:
+        generated = _generate_embeddings(provider, model, [texts[p] for p in missing])
+        for position, result in zip(missing, generated, strict=True):
+            results[position] = result
+        if _fell_back(provider, generated):
+            return _align_to_fallback(texts, results)
+    return results
+
+
+async def aembed_texts(texts: list[str]) -> list[EmbeddingResult]:
+    if len(texts) == 1:
+        return [await aembed_text(texts[0])]
+    provider, model = _resolve_embedding_provider()
+    results = await asyncio.to_thread(_cached_results, provider, model, texts)
+    missing = [position for position, result in enumerate(results) if result is None]
+    if missing:
+        generated = await _agenerate_embeddings(provider, model, [texts[p] for p in missing])
+        for position, result in zip(missing, generated, strict=True):
+            results[position] = result
+        if _fell_back(provider, generated):
+            return await asyncio.to_thread(_align_to_fallback, texts, results)
+    return results
+
+
+def _fell_back(provider: EmbeddingProvider, generated: list[EmbeddingResult]) -> bool:
+    return any(result.provider != provider.name for result in generated)
+
+
+def _align_to_fallback(texts: list[str], results: list[EmbeddingResult]) -> list[EmbeddingResult]:
+    """Re-embed provider results locally so they match fallback vectors from the same batch."""
+    fallback = LocalHashEmbeddingProvider()
+    stale = [
+        position for position, result in enumerate(results) if result.provider != fallback.name
+    ]
+    redone = fallback.embed_batch(texts=[texts[p] for p in stale], model=_FALLBACK_MODEL)
+    _record_embeddings([texts[p] for p in stale], redone)
+    aligned = list(results)
+    for position, result in zip(stale, redone, strict=True):
+        aligned[position] = result
+    return aligned
+
+
+def mean_vector(vectors: list[list[float]]) -> list[float]:
+    """Unit-length mean of equal-length vectors, used as a note's overall embedding."""
+    if len(vectors) == 1:
+        return list(vectors[0])
+    summed = [sum(components) for components in zip(*vectors, strict=True)]
+    norm = math.sqrt(sum(component * component for component in summed))
+    return [component / norm for component in summed] if norm else summed
+
+
+def _generate_embeddings(
+    provider: EmbeddingProvider, model: str, texts: list[str]
+) -> list[EmbeddingResult]:
     try:
-        result = provider.embed(text=text, model=model)
+        with get_circuit_breaker(provider.name).track():
+            results = provider.embed_batch(texts=texts, model=model, timeout=remaining_budget())
+    except Exception:
+        results = _fallback_embeddings(texts)
+    _record_embeddings(texts, results)
+    return results
+
+
+async def _agenerate_embeddings(
+    provider: EmbeddingProvider, model: str, texts: list[str]
+) -> list[EmbeddingResult]:
+    try:
+        with get_circuit_breaker(provider.name).track():
+            results = await provider.aembed_batch(
+                texts=texts, model=model, timeout=remaining_budget()
+            )
     except Exception:
-        add_warning("External embedding call failed; local embedding fallback was used.")
-        fallback = LocalHashEmbeddingProvider()
-        result = fallback.embed(text=text, model="hash-emb-v1")
+        results = _fallback_embeddings(texts)
+    await asyncio.to_thread(_record_embeddings, texts, results)
+    return results
 
-    track_llm_call(
+
+def _generate_embedding(provider: EmbeddingProvider, model: str, text: str) -> EmbeddingResult:
+    try:
+        with get_circuit_breaker(provider.name).track():
+            result = provider.embed(text=text, model=model, timeout=remaining_budget())
+    except Exception:
+        result = _fallback_embedding(text)
+    _record_embedding(text, result)
+    return result
+
+
+async def _agenerate_embedding(
+    provider: EmbeddingProvider, model: str, text: str
+) -> EmbeddingResult:
+    try:
+        with get_circuit_breaker(provider.name).track():
+            result = await provider.aembed(text=text, model=model, timeout=remaining_budget())
+    except Exception:
+        result = _fallback_embedding(text)
+    await asyncio.to_thread(_record_embedding, text, result)
+    return result
+
+
+def _shared_embedding(result: EmbeddingResult) -> EmbeddingResult:
+    """Copy the leader's vector for a follower; cost stays with the leader."""
+    record_shared("embedding")
+    return EmbeddingResult(
+        vector=list(result.vector),
         provider=result.provider,
         model=result.model,
-        prompt_tokens=result.prompt_tokens,
-        completion_tokens=result.completion_tokens,
-        usd=result.usd,
+        prompt_tokens=0,
+        completion_tokens=0,
+        usd=0.0,
     )
-    return result.vector
+
+
+def _cached_result(provider: EmbeddingProvider, model: str, text: str) -> EmbeddingResult | None:
+    return _cached_results(provider, model, [text])[0]
+
+
+def _cached_results(
+    provider: EmbeddingProvider, model: str, texts: list[str]
+) -> list[EmbeddingResult | None]:
+    vectors = get_embedding_cache().get_many(provider=provider.name, model=model, texts=texts)
+    results: list[EmbeddingResult | None] = []
+    for vector in vectors:
+        if vector is None:
+            results.append(None)
+            continue
+        record_cache_hit("embedding")
+        results.append(
+            EmbeddingResult(
+                vector=vector,
+                provider=provider.name,
+                model=model,
+                prompt_tokens=0,
+                completion_tokens=0,
+                usd=0.0,
+            )
+        )
+    return results
+
+
+def _fallback_embedding(text: str) -> EmbeddingResult:
+    add_warning("External embedding call failed; local embedding fallback was used.")
+    fallback = LocalHashEmbeddingProvider()
+    return fallback.embed(text=text, model=_FALLBACK_MODEL)
+
+
+def _fallback_embeddings(texts: list[str]) -> list[EmbeddingResult]:
+    add_warning("External embedding call failed; local embedding fallback was used.")
+    return LocalHashEmbeddingProvider().embed_batch(texts=texts, model=_FALLBACK_MODEL)
+
+
+def _record_embedding(text: str, result: EmbeddingResult) -> None:
+    _record_embeddings([text], [result])
+
+
+def _record_embeddings(texts: list[str], results: list[EmbeddingResult]) -> None:
+    """Write one cost row and one cache transaction per provider batch."""
+    batches: dict[tuple[str, str], list[tuple[str, EmbeddingResult]]] = {}
+    for text, result in zip(texts, results, strict=True):
+        batches.setdefault((result.provider, result.model), []).append((text, result))
+    for (provider, model), batch in batches.items():
+        track_llm_call(
+            provider=provider,
+            model=model,
+            prompt_tokens=sum(result.prompt_tokens for _, result in batch),
+            completion_tokens=sum(result.completion_tokens for _, result in batch),
+            usd=round(sum(result.usd for _, result in batch), 8),
+        )
+        get_embedding_cache().put_many(
+            provider=provider,
+            model=model,
+            texts=[text for text, _ in batch],
+            vectors=[result.vector for _, result in batch],
+        )
 
 
 def cosine_similarity(vector_a: list[float], vector_b: list[float]) -> float:
@@ -125,6 +529,73 @@ def cosine_similarity(vector_a: list[float], vector_b: list[float]) -> float:
     return numerator / (norm_a * norm_b)
 
 
+def cosine_similarity_many(
+    query: Sequence[float],
+    matrix: Sequence[Sequence[float]],
+    *,
+    norms: Sequence[float] | float | None = None,
+) -> Sequence[float]:
+    """Cosine similarity of ``query`` against every row of ``matrix``.
+
+    Pass cached row ``norms`` (or ``1.0`` for unit-length rows) to skip re-measuring
+    stored vectors on every call. Uses NumPy when installed; rows whose length differs
+    from the query score 0.0, as in ``cosine_similarity``.
+    """
+    if np is not None:
+        rows = np.asarray(matrix, dtype=np.float32)
+        query_row = np.asarray(query, dtype=np.float32)
+        if rows.ndim != 2 or rows.shape[1] != len(query_row):
+            return np.zeros(len(matrix), dtype=np.float32)
+        row_norms = np.linalg.norm(rows, axis=1) if norms is None else norms
+        denominators = np.asarray(row_norms, dtype=np.float32) * np.linalg.norm(query_row)
+        dots = rows @ query_row
+        return np.divide(dots, denominators, out=np.zeros_like(dots), where=denominators != 0)
+
+    query_norm = math.sqrt(sum(value * value for value in query))
+    scores: list[float] = []
+    for position, row in enumerate(matrix):
+        if isinstance(norms, int | float):
+            row_norm = float(norms)
+        elif norms is not None:
+            row_norm = norms[position]
+        else:
+            row_norm = math.sqrt(sum(value * value for value in row))
+        if len(row) != len(query) or row_norm == 0.0 or query_norm == 0.0:
+            scores.append(0.0)
+            continue
+        dot = sum(a * b for a, b in zip(query, row, strict=False))
+        scores.append(dot / (row_norm * query_norm))
+    return scores
+
+
+def top_k_similar(
+    query: Sequence[float],
+    matrix: Sequence[Sequence[float]],
+    k: int,
+    *,
+    ids: Sequence[int] | None = None,
+    norms: Sequence[float] | float | None = None,
+) -> list[tuple[int, float]]:
+    """Return up to ``k`` (id, similarity) pairs, best first.
+
+    ``ids`` labels the rows of ``matrix``; row positions are used when omitted.
+    """
+    if k <= 0 or not len(matrix):
+        return []
+    scores = cosine_similarity_many(query, matrix, norms=norms)
+    labels = ids if ids is not None else range(len(scores))
+
+    if np is not None:
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+    else:
+        ordered = heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+    return [(int(labels[position]), float(scores[position])) for position in ordered]
+
+
 def _resolve_embedding_provider() -> tuple[EmbeddingProvider, str]:
     settings = get_settings()
     requested = settings.embedding_provider.lower()
@@ -140,14 +611,19 @@ def _resolve_embedding_provider() -> tuple[EmbeddingProvider, str]:
                         "Configured OpenAI embedding provider is unavailable; local fallback was used."
                     )
             else:
-                return (
-                    OpenAIEmbeddingProvider(
-                        api_key=settings.openai_api_key,
-                        base_url=settings.openai_base_url,
-                        cost_per_1k=settings.embedding_cost_per_1k,
-                    ),
-                    settings.embedding_model,
+                provider = OpenAIEmbeddingProvider(
+                    api_key=settings.openai_api_key,
+                    base_url=settings.openai_base_url,
+                    cost_per_1k=settings.embedding_cost_per_1k,
                 )
+                if deadline_exhausted():
+                    add_warning("Request deadline is nearly exhausted; local embedding was used.")
+                elif get_circuit_breaker(provider.name).allow():
+                    return _coalesced(provider, settings.embedding_model), settings.embedding_model
+                else:
+                    add_warning(
+                        "OpenAI embedding provider circuit is open; local fallback was used."
+                    )
         elif requested == "openai":
             add_warning("Configured OpenAI embedding provider is missing API key.")
 
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from src.core.settings import get_settings
+from src.db.engine import get_connection
+
+
+class IdempotencyKeyReusedError(Exception):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyKeyInProgressError(Exception):
+    """The first request for the key has not finished within this request's budget."""
+
+
+@dataclass
+class IdempotencyClaim:
+    owned: bool
+    note_id: int | None = None
+
+
+# Purging walks the created_at index, so it runs once per this many new claims.
+_PURGE_EVERY = 64
+_claims_since_purge = 0
+_purge_lock = threading.Lock()
+
+
+def request_fingerprint(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def claim_idempotency_key(key: str, request_sha256: str) -> IdempotencyClaim:
+    """Take ownership of a key, or report the note stored under it.
+
+    Completed keys expire after ``idempotency_ttl_seconds``. A key whose first
+    request never finished (its process died) can be taken over once it is older
+    than ``idempotency_lock_seconds``.
+    """
+    settings = get_settings()
+    connection = get_connection()
+    with connection:
+        connection.execute(
+            """
+            DELETE FROM idempotency_keys
+            WHERE idempotency_key = ?
+              AND (created_at < datetime('now', ?)
+                   OR (note_id IS NULL AND created_at < datetime('now', ?)))
+            """,
+            (
+                key,
+                f"-{settings.idempotency_ttl_seconds} seconds",
+                f"-{settings.idempotency_lock_seconds} seconds",
+            ),
+        )
+        inserted = connection.execute(
+            """
+            INSERT OR IGNORE INTO idempotency_keys (idempotency_key, request_sha256)
+            VALUES (?, ?)
+            """,
+            (key, request_sha256),
+        ).rowcount
+        if not inserted:
+            row = connection.execute(
+                "SELECT request_sha256, note_id FROM idempotency_keys WHERE idempotency_key = ?",
+                (key,),
+            ).fetchone()
+
+    if inserted:
+        _maybe_purge_expired_keys()
+        return IdempotencyClaim(owned=True)
+    return _existing_claim(row, request_sha256)
+
+
+def poll_idempotency_key(key: str, request_sha256: str) -> IdempotencyClaim:
+    """Re-check a key held by another request without taking a write lock.
+
+    Only when the key was released or has expired does this fall back to
+    ``claim_idempotency_key`` to take it over.
+    """
+    settings = get_settings()
+    row = (
+        get_connection()
+        .execute(
+            """
+            SELECT request_sha256, note_id FROM idempotency_keys
+            WHERE idempotency_key = ?
+              AND NOT (created_at < datetime('now', ?)
+                       OR (note_id IS NULL AND created_at < datetime('now', ?)))
+            """,
+            (
+                key,
+                f"-{settings.idempotency_ttl_seconds} seconds",
+                f"-{settings.idempotency_lock_seconds} seconds",
+            ),
+        )
+        .fetchone()
+    )
+    if row is None:
+        return claim_idempotency_key(key, request_sha256)
+    return _existing_claim(row, request_sha256)
+
+
+def purge_expired_idempotency_keys() -> int:
+    """Delete completed keys past their TTL and abandoned claims past the lock age."""
+    settings = get_settings()
+    connection = get_connection()
+    with connection:
+        return connection.execute(
+            """
+            DELETE FROM idempotency_keys
+            WHERE created_at < datetime('now', ?)
+               OR (note_id IS NULL AND created_at < datetime('now', ?))
+            """,
+            (
+                f"-{settings.idempotency_ttl_seconds} seconds",
+                f"-{settings.idempotency_lock_seconds} seconds",
+            ),
+        ).rowcount
+
+
+def _existing_claim(row, request_sha256: str) -> IdempotencyClaim:
+    if row["request_sha256"] != request_sha256:
+        raise IdempotencyKeyReusedError(
+            "Idempotency-Key was already used with a different request body."
+        )
+    note_id = row["note_id"]
+    return IdempotencyClaim(owned=False, note_id=int(note_id) if note_id is not None else None)
+
+
+def _maybe_purge_expired_keys() -> None:
+    global _claims_since_purge
+    with _purge_lock:
+        _claims_since_purge += 1
+        if _claims_since_purge < _PURGE_EVERY:
+            return
+        _claims_since_purge = 0
+    purge_expired_idempotency_keys()
+
+
+def complete_idempotency_key(key: str, note_id: int) -> None:
+    connection = get_connection()
+    with connection:
+        connection.execute(
+            "UPDATE idempotency_keys SET note_id = ? WHERE idempotency_key = ?",
+            (note_id, key),
+        )
+
+
+def release_idempotency_key(key: str) -> None:
+    """Drop an unfinished claim so a retry can run the request again."""
+    connection = get_connection()
+    with connection:
+        connection.execute(
+            "DELETE FROM idempotency_keys WHERE idempotency_key = ? AND note_id IS NULL",
+            (key,),
+        )
@@ -1,16 +1,45 @@
+import asyncio
 import json
+import statistics
 from dataclasses import asdict
 from datetime import UTC, datetime
+from functools import lru_cache
 from typing import TypedDict
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 
+from src.core.request_context import add_warning, record_cache_hit, remaining_budget
+from src.core.settings import get_settings
 from src.db.engine import get_connection
-from src.schemas.notes import CreateNoteRequest, Note, RelatedNoteLink
+from src.db.vectors import pack_embedding
+from src.schemas.notes import CreateNoteRequest, Note, NoteSearchHit, RelatedNoteLink
 from src.schemas.reflection import Reflection
 from src.schemas.transcript import Transcript, TranscriptMetadata
-from src.services.embeddings import cosine_similarity, generate_embedding
-from src.services.reflection import reflect_transcript
+from src.services.chunking import TranscriptChunk, chunk_transcript
+from src.services.embeddings import (
+    EmbeddingResult,
+    aembed_texts,
+    agenerate_embedding,
+    embed_texts,
+    generate_embedding,
+    mean_vector,
+)
+from src.services.idempotency import (
+    IdempotencyKeyInProgressError,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    poll_idempotency_key,
+    release_idempotency_key,
+    request_fingerprint,
+)
+from src.services.reflection import ReflectionResult, areflect_transcript, reflect_transcript
+from src.services.vector_index import get_chunk_index, get_vector_index
+
+RELATED_NOTE_LIMIT = 3
+# Chunk neighbours fetched per requested note, so notes with several close chunks still fill k.
+CHUNK_CANDIDATES_PER_NOTE = 4
+IDEMPOTENCY_POLL_SECONDS = 0.05
 
 
 class NotePipelineState(TypedDict, total=False):
@@ -20,11 +49,58 @@ class NotePipelineState(TypedDict, total=False):
     reflection: Reflection
     reflection_internal_metadata: dict
     embedding: list[float]
+    embedding_model: str
+    chunks: list[TranscriptChunk]
+    chunk_embeddings: list[list[float]]
+    chunk_embedding_models: list[str]
     note_id: int
 
 
 def create_note(payload: CreateNoteRequest) -> Note:
-    state: NotePipelineState = {
+    result = _note_graph().invoke(_initial_state(payload))
+    return get_note(result["note_id"])
+
+
+async def acreate_note(payload: CreateNoteRequest) -> Note:
+    result = await _note_graph().ainvoke(_initial_state(payload))
+    return await aget_note(result["note_id"])
+
+
+async def acreate_note_idempotent(
+    payload: CreateNoteRequest, idempotency_key: str
+) -> tuple[Note, bool]:
+    """Create a note at most once per key, returning it and whether it was replayed.
+
+    A repeated key returns the stored note without running the pipeline. A
+    duplicate that arrives while the first request is still running polls until
+    that request stores its note, or raises once its own deadline is spent.
+    """
+    request_sha256 = request_fingerprint(payload.model_dump_json())
+    claim = await asyncio.to_thread(claim_idempotency_key, idempotency_key, request_sha256)
+    while not claim.owned:
+        if claim.note_id is not None:
+            record_cache_hit("idempotency")
+            return await aget_note(claim.note_id), True
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= IDEMPOTENCY_POLL_SECONDS:
+            raise IdempotencyKeyInProgressError(
+                "A request with this Idempotency-Key is still in progress."
+            )
+        await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+        claim = await asyncio.to_thread(poll_idempotency_key, idempotency_key, request_sha256)
+
+    try:
+        note = await acreate_note(payload)
+    except BaseException:
+        # Shielded so a request cancelled mid-pipeline still frees the key for a retry.
+        await asyncio.shield(asyncio.to_thread(release_idempotency_key, idempotency_key))
+        raise
+    await asyncio.to_thread(complete_idempotency_key, idempotency_key, note.id)
+    return note, False
+
+
+def _initial_state(payload: CreateNoteRequest) -> NotePipelineState:
+    return {
         "transcript": payload.transcript.strip(),
         "audio_reference": payload.audio_reference,
         "transcript_metadata": payload.transcript_metadata
@@ -35,54 +111,133 @@ def create_note(payload: CreateNoteRequest) -> Note:
             source="manual",
         ),
     }
-    graph = _build_note_graph()
-    result = graph.invoke(state)
-    return get_note(result["note_id"])
 
 
 def list_notes(limit: int = 50) -> list[Note]:
     connection = get_connection()
-    try:
-        rows = connection.execute(
-            """
-            SELECT id
-            FROM notes
-            ORDER BY created_at DESC, id DESC
-            LIMIT ?
-            """,
-            (limit,),
-        ).fetchall()
-    finally:
-        connection.close()
+    rows = connection.execute(
+        """
+        SELECT id
+        FROM notes
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
     return [get_note(int(row["id"])) for row in rows]
 
 
+async def alist_notes(limit: int = 50) -> list[Note]:
+    return await asyncio.to_thread(list_notes, limit)
+
+
+def search_notes(query: str, k: int = 10) -> list[NoteSearchHit]:
+    query_embedding = generate_embedding(_search_query(query))
+    return _search_hits(query_embedding, k)
+
+
+async def asearch_notes(query: str, k: int = 10) -> list[NoteSearchHit]:
+    query_embedding = await agenerate_embedding(_search_query(query))
+    return await asyncio.to_thread(_search_hits, query_embedding, k)
+
+
+def _search_query(query: str) -> str:
+    cleaned = query.strip()
+    if not cleaned:
+        raise ValueError("Search query is required.")
+    return cleaned
+
+
+def _search_hits(query_embedding: list[float], k: int) -> list[NoteSearchHit]:
+    min_score = get_settings().search_min_score
+    hits: list[NoteSearchHit] = []
+    for note_id, score in _rank_notes([query_embedding], k):
+        # Unrelated (or dimension-mismatched) notes score 0.0 and are not results.
+        if score <= min_score:
+            continue
+        try:
+            note = get_note(note_id)
+        except KeyError:
+            continue
+        hits.append(NoteSearchHit(note=note, score=score))
+    return hits
+
+
+def _rank_notes(query_vectors: list[list[float]], k: int) -> list[tuple[int, float]]:
+    """Rank stored notes against one or more query vectors, best first.
+
+    Each query vector retrieves its nearest chunks, and a note scores the max or
+    mean similarity of its retrieved chunks (``ECHO_NOTES_CHUNK_AGGREGATION``).
+    ``note`` compares the mean query vector against whole-note vectors instead.
+    """
+    aggregation = get_settings().chunk_aggregation.lower()
+    if aggregation == "note":
+        return get_vector_index().search(mean_vector(query_vectors), k=k)
+    if aggregation not in {"max", "mean"}:
+        add_warning(f"Unknown chunk aggregation '{aggregation}'; max was used.")
+        aggregation = "max"
+
+    index = get_chunk_index()
+    chunk_hits = [
+        hit
+        for vector in query_vectors
+        for hit in index.search(vector, k=k * CHUNK_CANDIDATES_PER_NOTE)
+    ]
+    if not chunk_hits:
+        return []
+    note_ids = _chunk_note_ids({chunk_id for chunk_id, _ in chunk_hits})
+    scores: dict[int, list[float]] = {}
+    for chunk_id, score in chunk_hits:
+        if chunk_id in note_ids:
+            scores.setdefault(note_ids[chunk_id], []).append(score)
+    aggregate = max if aggregation == "max" else statistics.fmean
+    ranked = sorted(
+        ((note_id, float(aggregate(values))) for note_id, values in scores.items()),
+        key=lambda item: (-item[1], item[0]),
+    )
+    return ranked[:k]
+
+
+def _chunk_note_ids(chunk_ids: set[int]) -> dict[int, int]:
+    placeholders = ", ".join("?" for _ in chunk_ids)
+    rows = (
+        get_connection()
+        .execute(
+            f"SELECT id, note_id FROM note_chunks WHERE id IN ({placeholders})",
+            tuple(chunk_ids),
+        )
+        .fetchall()
+    )
+    return {int(row["id"]): int(row["note_id"]) for row in rows}
+
+
+async def aget_note(note_id: int) -> Note:
+    return await asyncio.to_thread(get_note, note_id)
+
+
 def get_note(note_id: int) -> Note:
     connection = get_connection()
-    try:
-        row = connection.execute(
-            """
-            SELECT id, audio_reference, transcript_text, transcript_metadata_json, reflection_json,
-                   created_at, updated_at
-            FROM notes
-            WHERE id = ?
-            """,
-            (note_id,),
-        ).fetchone()
-        if row is None:
-            raise KeyError(f"Note {note_id} not found")
+    row = connection.execute(
+        """
+        SELECT id, audio_reference, transcript_text, transcript_metadata_json, reflection_json,
+               created_at, updated_at
+        FROM notes
+        WHERE id = ?
+        """,
+        (note_id,),
+    ).fetchone()
+    if row is None:
+        raise KeyError(f"Note {note_id} not found")
 
-        links = connection.execute(
-            """
-            SELECT note_id, related_note_id, similarity
-            FROM related_note_links
-            WHERE note_id = ?
-            ORDER BY similarity DESC
-            """,
-            (note_id,),
-        ).fetchall()
-    finally:
-        connection.close()
+    links = connection.execute(
+        """
+        SELECT note_id, related_note_id, similarity
+        FROM related_note_links
+        WHERE note_id = ?
+        ORDER BY similarity DESC
+        """,
+        (note_id,),
+    ).fetchall()
 
     transcript_metadata = TranscriptMetadata.model_validate(
         json.loads(row["transcript_metadata_json"])
@@ -108,16 +263,18 @@ def get_note(note_id: int) -> Note:
     )
 
 
-def _build_note_graph():
+@lru_cache(maxsize=1)
+def _note_graph():
+    """Compile the note pipeline once; reflect and embed run as parallel branches."""
     graph_builder = StateGraph(NotePipelineState)
     graph_builder.add_node("validate_transcript", _validate_transcript)
-    graph_builder.add_node("reflect", _reflect)
-    graph_builder.add_node("embed", _embed)
-    graph_builder.add_node("persist", _persist)
+    graph_builder.add_node("reflect", RunnableLambda(_reflect, afunc=_areflect))
+    graph_builder.add_node("embed", RunnableLambda(_embed, afunc=_aembed))
+    graph_builder.add_node("persist", RunnableLambda(_persist, afunc=_apersist))
     graph_builder.set_entry_point("validate_transcript")
     graph_builder.add_edge("validate_transcript", "reflect")
-    graph_builder.add_edge("reflect", "embed")
-    graph_builder.add_edge("embed", "persist")
+    graph_builder.add_edge("validate_transcript", "embed")
+    graph_builder.add_edge(["reflect", "embed"], "persist")
     graph_builder.add_edge("persist", END)
     return graph_builder.compile()
 
@@ -130,30 +287,67 @@ def _validate_transcript(state: NotePipelineState) -> NotePipelineState:
     return state
 
 
+# reflect and embed run in the same graph step, so each returns only the keys it
+# owns; writing the whole state from both branches would conflict.
 def _reflect(state: NotePipelineState) -> NotePipelineState:
-    reflection_result = reflect_transcript(state["transcript"])
-    state["reflection"] = reflection_result.reflection
-    state["reflection_internal_metadata"] = asdict(reflection_result.internal_metadata)
-    return state
+    return _reflection_update(reflect_transcript(state["transcript"]))
+
+
+async def _areflect(state: NotePipelineState) -> NotePipelineState:
+    return _reflection_update(await areflect_transcript(state["transcript"]))
+
+
+def _reflection_update(reflection_result: ReflectionResult) -> NotePipelineState:
+    return {
+        "reflection": reflection_result.reflection,
+        "reflection_internal_metadata": asdict(reflection_result.internal_metadata),
+    }
 
 
 def _embed(state: NotePipelineState) -> NotePipelineState:
-    state["embedding"] = generate_embedding(state["transcript"])
-    return state
+    chunks = _chunk(state["transcript"])
+    return _embedding_update(chunks, embed_texts([chunk.text for chunk in chunks]))
+
+
+async def _aembed(state: NotePipelineState) -> NotePipelineState:
+    chunks = await asyncio.to_thread(_chunk, state["transcript"])
+    return _embedding_update(chunks, await aembed_texts([chunk.text for chunk in chunks]))
+
+
+def _chunk(transcript: str) -> list[TranscriptChunk]:
+    settings = get_settings()
+    return chunk_transcript(
+        transcript,
+        max_tokens=settings.chunk_max_tokens,
+        overlap_tokens=settings.chunk_overlap_tokens,
+        model=settings.embedding_model,
+    )
+
+
+def _embedding_update(
+    chunks: list[TranscriptChunk], embedding_results: list[EmbeddingResult]
+) -> NotePipelineState:
+    chunk_embeddings = [result.vector for result in embedding_results]
+    return {
+        "embedding": mean_vector(chunk_embeddings),
+        "embedding_model": embedding_results[0].model,
+        "chunks": chunks,
+        "chunk_embeddings": chunk_embeddings,
+        "chunk_embedding_models": [result.model for result in embedding_results],
+    }
+
+
+async def _apersist(state: NotePipelineState) -> NotePipelineState:
+    return await asyncio.to_thread(_persist, state)
 
 
 def _persist(state: NotePipelineState) -> NotePipelineState:
     connection = get_connection()
+    index = get_vector_index()
+    chunk_index = get_chunk_index()
     now = datetime.now(tz=UTC).isoformat()
-    try:
-        existing_rows = connection.execute(
-            """
-            SELECT id, embedding_json
-            FROM notes
-            ORDER BY created_at DESC, id DESC
-            LIMIT 50
-            """
-        ).fetchall()
+    with connection:
+        related_links = _rank_notes(state["chunk_embeddings"], RELATED_NOTE_LIMIT)
 
         cursor = connection.execute(
             """
@@ -164,9 +358,12 @@ def _persist(state: NotePipelineState) -> NotePipelineState:
               reflection_json,
               reflection_internal_json,
               embedding_json,
+              embedding_blob,
+              embedding_dim,
+              embedding_model,
               created_at,
               updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, '', ?, ?, ?, ?, ?)
             """,
             (
                 state.get("audio_reference"),
@@ -174,21 +371,49 @@ def _persist(state: NotePipelineState) -> NotePipelineState:
                 json.dumps(state["transcript_metadata"].model_dump()),
                 json.dumps(state["reflection"].model_dump()),
                 json.dumps(state["reflection_internal_metadata"]),
-                json.dumps(state["embedding"]),
+                pack_embedding(state["embedding"]),
+                len(state["embedding"]),
+                state["embedding_model"],
                 now,
                 now,
             ),
         )
         note_id = int(cursor.lastrowid)
 
-        related_links: list[tuple[int, float]] = []
-        for row in existing_rows:
-            existing_embedding = json.loads(row["embedding_json"])
-            similarity = cosine_similarity(state["embedding"], existing_embedding)
-            related_links.append((int(row["id"]), similarity))
+        chunk_ids = []
+        for chunk, vector, model in zip(
+            state["chunks"],
+            state["chunk_embeddings"],
+            state["chunk_embedding_models"],
+            strict=True,
+        ):
+            chunk_cursor = connection.execute(
+                """
+                INSERT INTO note_chunks (
+                  note_id,
+                  chunk_index,
+                  text,
+                  start_char,
+                  end_char,
+                  embedding_blob,
+                  embedding_dim,
+                  embedding_model
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    note_id,
+                    chunk.index,
+                    chunk.text,
+                    chunk.start_char,
+                    chunk.end_char,
+                    pack_embedding(vector),
+                    len(vector),
+                    model,
+                ),
+            )
+            chunk_ids.append(int(chunk_cursor.lastrowid))
 
-        related_links.sort(key=lambda item: item[1], reverse=True)
-        for related_note_id, similarity in related_links[:3]:
+        for related_note_id, similarity in related_links:
             connection.execute(
                 """
                 INSERT OR REPLACE INTO related_note_links (note_id, related_note_id, similarity)
@@ -197,9 +422,8 @@ def _persist(state: NotePipelineState) -> NotePipelineState:
                 (note_id, related_note_id, similarity),
             )
 
-        connection.commit()
-    finally:
-        connection.close()
-
+    index.add(note_id, state["embedding"])
+    for chunk_id, vector in zip(chunk_ids, state["chunk_embeddings"], strict=True):
+        chunk_index.add(chunk_id, vector)
     state["note_id"] = note_id
     return state
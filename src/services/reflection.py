@@ -1,17 +1,41 @@
+import asyncio
+import contextvars
+import hashlib
 import json
 import sqlite3
-from dataclasses import dataclass
-from typing import Literal
+from collections import Counter
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import zip_longest
+from typing import Any, Literal
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import ValidationError
 
+from src.core.llm.breaker import get_circuit_breaker
 from src.core.llm.providers import LocalHeuristicLLMProvider, resolve_llm_provider
 from src.core.llm.router import ModelRouter
+from src.core.llm.tokens import count_tokens, split_by_tokens
 from src.core.llm.tracker import track_llm_call
-from src.core.request_context import add_warning
+from src.core.llm.types import LLMProvider, LLMResponse
+from src.core.request_context import (
+    add_warning,
+    deadline_exhausted,
+    record_cache_hit,
+    record_shared,
+    remaining_budget,
+)
+from src.core.settings import get_settings
+from src.core.singleflight import SingleFlight
 from src.db.engine import insert_reflection_event_row
 from src.schemas.reflection import Reflection
+from src.services.reflection_cache import (
+    CachedReflection,
+    ReflectionCacheKey,
+    get_reflection_cache,
+    reflection_cache_key,
+)
 
 REFLECTION_PROMPT = ChatPromptTemplate.from_messages(
     [
@@ -33,6 +57,10 @@ REFLECTION_PROMPT = ChatPromptTemplate.from_messages(
         ),
     ]
 )
+# Part of the reflection cache key, so prompt edits invalidate cached reflections.
+REFLECTION_PROMPT_FINGERPRINT = hashlib.sha256(
+    REFLECTION_PROMPT.format(transcript="{transcript}").encode("utf-8")
+).hexdigest()
 
 
 @dataclass
@@ -47,7 +75,217 @@ class ReflectionResult:
     internal_metadata: ReflectionInternalMetadata
 
 
+@dataclass
+class ReflectionStreamEvent:
+    """One server-sent event: a ``token`` delta, a parsed ``field`` or the ``reflection``."""
+
+    event: Literal["token", "field", "reflection"]
+    data: dict[str, Any]
+
+
+@dataclass
+class _PreparedReflection:
+    transcript: str
+    model: str
+    provider: LLMProvider
+    rendered_prompt: str
+    # Set when the transcript exceeds the chunk budget and is map-reduced.
+    chunks: list[str] = field(default_factory=list)
+
+    @property
+    def cache_key(self) -> ReflectionCacheKey:
+        return reflection_cache_key(
+            transcript=self.transcript,
+            provider=self.provider.name,
+            model=self.model,
+            prompt_fingerprint=REFLECTION_PROMPT_FINGERPRINT,
+        )
+
+
+_REFLECTION_FLIGHTS: SingleFlight[ReflectionResult] = SingleFlight()
+_MERGED_THEME_LIMIT = 5
+_MERGED_ITEM_LIMIT = 3
+
+
 def reflect_transcript(transcript: str) -> ReflectionResult:
+    prepared = _prepare_reflection(transcript)
+    if isinstance(prepared, ReflectionResult):
+        return prepared
+    cached = _cached_reflection(prepared)
+    if cached is not None:
+        return cached
+
+    result, shared = _REFLECTION_FLIGHTS.do(
+        prepared.cache_key, lambda: _generate_reflection(prepared)
+    )
+    return _shared_reflection(result) if shared else result
+
+
+async def areflect_transcript(transcript: str) -> ReflectionResult:
+    # Token counting can be slow, and tiktoken downloads its encoding on first use.
+    prepared = await asyncio.to_thread(_prepare_reflection, transcript)
+    if isinstance(prepared, ReflectionResult):
+        return prepared
+    cached = await asyncio.to_thread(_cached_reflection, prepared)
+    if cached is not None:
+        return cached
+
+    result, shared = await _REFLECTION_FLIGHTS.ado(
+        prepared.cache_key, lambda: _agenerate_reflection(prepared)
+    )
+    return _shared_reflection(result) if shared else result
+
+
+def _generate_reflection(prepared: _PreparedReflection) -> ReflectionResult:
+    if prepared.chunks:
+        return _map_reduce_reflection(prepared)
+    cacheable = True
+    try:
+        with get_circuit_breaker(prepared.provider.name).track():
+            llm_response = prepared.provider.generate(
+                model=prepared.model,
+                prompt=prepared.rendered_prompt,
+                transcript=prepared.transcript,
+                timeout=remaining_budget(),
+            )
+    except Exception:
+        llm_response = _fallback_response(prepared)
+        cacheable = False
+    return _finish_reflection(prepared, llm_response, cacheable=cacheable)
+
+
+async def _agenerate_reflection(prepared: _PreparedReflection) -> ReflectionResult:
+    if prepared.chunks:
+        return await _amap_reduce_reflection(prepared)
+    cacheable = True
+    try:
+        with get_circuit_breaker(prepared.provider.name).track():
+            llm_response = await prepared.provider.agenerate(
+                model=prepared.model,
+                prompt=prepared.rendered_prompt,
+                transcript=prepared.transcript,
+                timeout=remaining_budget(),
+            )
+    except Exception:
+        llm_response = _fallback_response(prepared)
+        cacheable = False
+    return await asyncio.to_thread(_finish_reflection, prepared, llm_response, cacheable=cacheable)
+
+
+async def astream_reflection(transcript: str) -> AsyncIterator[ReflectionStreamEvent]:
+    """Stream a reflection as token deltas and top-level fields as they complete.
+
+    Field events are previews parsed from partial provider output. The final
+    ``reflection`` event carries the validated result, which also reflects any
+    fallback applied after a failed or malformed stream.
+    """
+    prepared = await asyncio.to_thread(_prepare_reflection, transcript)
+    if isinstance(prepared, ReflectionResult):
+        for event in _result_events(prepared):
+            yield event
+        return
+    cached = await asyncio.to_thread(_cached_reflection, prepared)
+    if cached is not None:
+        for event in _result_events(cached):
+            yield event
+        return
+    if prepared.chunks:
+        # Chunk replies are merged only at the end, so there are no tokens to relay.
+        for event in _result_events(await _agenerate_reflection(prepared)):
+            yield event
+        return
+
+    parser = _ReflectionFieldParser()
+    llm_response: LLMResponse | None = None
+    try:
+        with get_circuit_breaker(prepared.provider.name).track():
+            async for chunk in prepared.provider.astream(
+                model=prepared.model,
+                prompt=prepared.rendered_prompt,
+                transcript=prepared.transcript,
+                timeout=remaining_budget(),
+            ):
+                if isinstance(chunk, LLMResponse):
+                    llm_response = chunk
+                    continue
+                yield ReflectionStreamEvent(event="token", data={"text": chunk})
+                for name, value in parser.feed(chunk):
+                    yield ReflectionStreamEvent(event="field", data={"name": name, "value": value})
+    except Exception:
+        llm_response = None
+
+    cacheable = llm_response is not None
+    if llm_response is None:
+        llm_response = _fallback_response(prepared)
+    result = await asyncio.to_thread(
+        _finish_reflection, prepared, llm_response, cacheable=cacheable
+    )
+    yield ReflectionStreamEvent(event="reflection", data=result.reflection.model_dump())
+
+
+def _result_events(result: ReflectionResult) -> list[ReflectionStreamEvent]:
+    payload = result.reflection.model_dump()
+    events = [
+        ReflectionStreamEvent(event="field", data={"name": name, "value": value})
+        for name, value in payload.items()
+    ]
+    events.append(ReflectionStreamEvent(event="reflection", data=payload))
+    return events
+
+
+class _ReflectionFieldParser:
+    """Incrementally pull complete top-level ``Reflection`` fields out of streamed JSON.
+
+    A value is emitted only once the delimiter after it has arrived, so a number or
+    literal cut off mid-stream is never reported early.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position: int | None = None
+        self._emitted: set[str] = set()
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        self._buffer += text
+        if self._position is None:
+            start = self._buffer.find("{")
+            if start < 0:
+                return []
+            self._position = start + 1
+
+        fields: list[tuple[str, Any]] = []
+        while True:
+            parsed = self._next_field()
+            if parsed is None:
+                return fields
+            name, value, self._position = parsed
+            if name in Reflection.model_fields and name not in self._emitted:
+                self._emitted.add(name)
+                fields.append((name, value))
+
+    def _next_field(self) -> tuple[str, Any, int] | None:
+        position = self._skip(self._position, ",")
+        try:
+            name, position = self._decoder.raw_decode(self._buffer, position)
+            position = self._skip(position, ":")
+            value, position = self._decoder.raw_decode(self._buffer, position)
+        except json.JSONDecodeError:
+            return None
+        position = self._skip(position, "")
+        if position >= len(self._buffer) or not isinstance(name, str):
+            return None
+        return name, value, position
+
+    def _skip(self, position: int, separators: str) -> int:
+        while position < len(self._buffer) and (
+            self._buffer[position].isspace() or self._buffer[position] in separators
+        ):
+            position += 1
+        return position
+
+
+def _prepare_reflection(transcript: str) -> _PreparedReflection | ReflectionResult:
     cleaned = transcript.strip()
     if not cleaned:
         add_warning("Transcript is empty; reflection confidence was set to low.")
@@ -66,23 +304,176 @@ def reflect_transcript(transcript: str) -> ReflectionResult:
             ),
         )
 
-    router = ModelRouter()
-    model = router.route(tier="default")
     resolution = resolve_llm_provider()
-    provider = resolution.provider
     if resolution.warning:
         add_warning(resolution.warning)
+    provider = resolution.provider
+    if not isinstance(provider, LocalHeuristicLLMProvider) and deadline_exhausted():
+        add_warning("Request deadline is nearly exhausted; local reflection was used.")
+        provider = LocalHeuristicLLMProvider()
+    model = ModelRouter().decide(transcript=cleaned, provider=provider.name).model
+    chunk_tokens = get_settings().reflection_chunk_tokens
+    chunks: list[str] = []
+    if count_tokens(cleaned, model) > chunk_tokens:
+        chunks = split_by_tokens(cleaned, chunk_tokens, model)
+        add_warning(
+            f"Transcript exceeds {chunk_tokens} tokens; it was reflected in "
+            f"{len(chunks)} chunks and merged."
+        )
     prompt_value = REFLECTION_PROMPT.invoke({"transcript": cleaned})
-    rendered_prompt = prompt_value.to_string()
+    return _PreparedReflection(
+        transcript=cleaned,
+        model=model,
+        provider=provider,
+        rendered_prompt=prompt_value.to_string(),
+        chunks=chunks,
+    )
+
+
+def _cached_reflection(prepared: _PreparedReflection) -> ReflectionResult | None:
+    cached = get_reflection_cache().get(prepared.cache_key)
+    if cached is None:
+        return None
+    record_cache_hit("reflection")
+    internal_metadata = ReflectionInternalMetadata(**cached.internal_metadata)
+    if internal_metadata.ambiguity_detected:
+        add_warning("Reflection contains ambiguity; confidence is below high.")
+    return ReflectionResult(reflection=cached.reflection, internal_metadata=internal_metadata)
+
+
+def _shared_reflection(result: ReflectionResult) -> ReflectionResult:
+    """Hand a follower its own copy of the leader's reflection; the leader paid for it.
+
+    The leader's warnings, including the ambiguity warning, are replayed by ``SingleFlight``.
+    """
+    record_shared("reflection")
+    return ReflectionResult(
+        reflection=result.reflection.model_copy(deep=True),
+        internal_metadata=result.internal_metadata,
+    )
+
+
+def _fallback_response(prepared: _PreparedReflection) -> LLMResponse:
+    add_warning("External LLM call failed; local reflection fallback was used.")
+    fallback_provider = LocalHeuristicLLMProvider()
+    return fallback_provider.generate(
+        model=prepared.model, prompt=prepared.rendered_prompt, transcript=prepared.transcript
+    )
 
+
+def _map_reduce_reflection(prepared: _PreparedReflection) -> ReflectionResult:
+    workers = max(1, get_settings().reflection_max_parallel_chunks)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each worker gets a copy of the request context so cost lands on this request.
+        futures = [
+            executor.submit(contextvars.copy_context().run, _reflect_chunk, prepared, chunk)
+            for chunk in prepared.chunks
+        ]
+        outcomes = [future.result() for future in futures]
+    return _reduce_chunk_reflections(prepared, outcomes)
+
+
+async def _amap_reduce_reflection(prepared: _PreparedReflection) -> ReflectionResult:
+    semaphore = asyncio.Semaphore(max(1, get_settings().reflection_max_parallel_chunks))
+
+    async def reflect_chunk(chunk: str) -> tuple[Reflection | None, bool]:
+        async with semaphore:
+            return await _areflect_chunk(prepared, chunk)
+
+    outcomes = await asyncio.gather(*(reflect_chunk(chunk) for chunk in prepared.chunks))
+    return await asyncio.to_thread(_reduce_chunk_reflections, prepared, list(outcomes))
+
+
+def _reflect_chunk(prepared: _PreparedReflection, chunk: str) -> tuple[Reflection | None, bool]:
+    prompt = REFLECTION_PROMPT.invoke({"transcript": chunk}).to_string()
+    ok = True
     try:
-        llm_response = provider.generate(model=model, prompt=rendered_prompt, transcript=cleaned)
+        with get_circuit_breaker(prepared.provider.name).track():
+            llm_response = prepared.provider.generate(
+                model=prepared.model, prompt=prompt, transcript=chunk, timeout=remaining_budget()
+            )
     except Exception:
-        add_warning("External LLM call failed; local reflection fallback was used.")
-        fallback_provider = LocalHeuristicLLMProvider()
-        llm_response = fallback_provider.generate(
-            model=model, prompt=rendered_prompt, transcript=cleaned
-        )
+        llm_response = _chunk_fallback_response(prepared, prompt, chunk)
+        ok = False
+    return _track_and_parse(llm_response), ok
+
+
+async def _areflect_chunk(
+    prepared: _PreparedReflection, chunk: str
+) -> tuple[Reflection | None, bool]:
+    prompt = REFLECTION_PROMPT.invoke({"transcript": chunk}).to_string()
+    ok = True
+    try:
+        with get_circuit_breaker(prepared.provider.name).track():
+            llm_response = await prepared.provider.agenerate(
+                model=prepared.model, prompt=prompt, transcript=chunk, timeout=remaining_budget()
+            )
+    except Exception:
+        llm_response = _chunk_fallback_response(prepared, prompt, chunk)
+        ok = False
+    return await asyncio.to_thread(_track_and_parse, llm_response), ok
+
+
+def _chunk_fallback_response(prepared: _PreparedReflection, prompt: str, chunk: str) -> LLMResponse:
+    add_warning("External LLM call failed for a transcript chunk; local fallback was used.")
+    return LocalHeuristicLLMProvider().generate(
+        model=prepared.model, prompt=prompt, transcript=chunk
+    )
+
+
+def _reduce_chunk_reflections(
+    prepared: _PreparedReflection, outcomes: list[tuple[Reflection | None, bool]]
+) -> ReflectionResult:
+    parts = [reflection for reflection, _ in outcomes if reflection is not None]
+    if len(parts) < len(outcomes):
+        add_warning("Some transcript chunks returned malformed reflections and were skipped.")
+    merged = merge_reflections(parts) if parts else None
+    cacheable = all(ok for _, ok in outcomes) and len(parts) == len(outcomes)
+    return _complete_reflection(prepared, merged, cacheable=cacheable)
+
+
+def merge_reflections(parts: list[Reflection]) -> Reflection:
+    """Deterministically merge chunk reflections, in transcript order.
+
+    Themes are ranked by how many chunks mention them, questions and next thoughts
+    are interleaved so every chunk is represented, and the merged confidence is
+    the lowest of the parts.
+    """
+    theme_counts: Counter[str] = Counter()
+    theme_labels: dict[str, str] = {}
+    for part in parts:
+        for theme in part.themes:
+            key = theme.strip().lower()
+            theme_counts[key] += 1
+            theme_labels.setdefault(key, theme.strip())
+    first_seen = {key: position for position, key in enumerate(theme_labels)}
+    ranked_themes = sorted(theme_counts, key=lambda key: (-theme_counts[key], first_seen[key]))
+    confidence_rank = {"low": 0, "medium": 1, "high": 2}
+    return Reflection(
+        title=parts[0].title,
+        summary=" ".join(part.summary.strip() for part in parts if part.summary.strip()),
+        themes=[theme_labels[key] for key in ranked_themes[:_MERGED_THEME_LIMIT]],
+        questions=_interleave([part.questions for part in parts], _MERGED_ITEM_LIMIT),
+        next_thoughts=_interleave([part.next_thoughts for part in parts], _MERGED_ITEM_LIMIT),
+        confidence=min((part.confidence for part in parts), key=confidence_rank.__getitem__),
+    )
+
+
+def _interleave(groups: list[list[str]], limit: int) -> list[str]:
+    merged: list[str] = []
+    seen: set[str] = set()
+    for items in zip_longest(*groups):
+        for item in items:
+            if item is None or item.strip().lower() in seen:
+                continue
+            seen.add(item.strip().lower())
+            merged.append(item)
+            if len(merged) == limit:
+                return merged
+    return merged
+
+
+def _track_and_parse(llm_response: LLMResponse) -> Reflection | None:
     track_llm_call(
         provider=llm_response.provider,
         model=llm_response.model,
@@ -90,8 +481,27 @@ def reflect_transcript(transcript: str) -> ReflectionResult:
         completion_tokens=llm_response.usage.completion_tokens,
         usd=llm_response.usage.usd,
     )
+    return _parse_reflection_payload(llm_response.content)
+
 
-    reflection = _parse_reflection(llm_response.content)
+def _finish_reflection(
+    prepared: _PreparedReflection, llm_response: LLMResponse, *, cacheable: bool
+) -> ReflectionResult:
+    """Track, parse and persist a provider reply."""
+    parsed = _track_and_parse(llm_response)
+    return _complete_reflection(prepared, parsed, cacheable=cacheable)
+
+
+def _complete_reflection(
+    prepared: _PreparedReflection, parsed: Reflection | None, *, cacheable: bool
+) -> ReflectionResult:
+    """Derive metadata for a reflection, then persist and cache it.
+
+    Only reflections from the resolved provider that parse cleanly are keyed for
+    the reflection cache; fallbacks are logged without a key so they are never reused.
+    """
+    reflection = parsed if parsed is not None else _malformed_reflection()
+    cacheable = cacheable and parsed is not None
     ambiguity_detected = reflection.confidence != "high"
     interpretation_level: Literal["low", "medium"] = "medium" if ambiguity_detected else "low"
     internal_metadata = ReflectionInternalMetadata(
@@ -101,16 +511,26 @@ def reflect_transcript(transcript: str) -> ReflectionResult:
     if ambiguity_detected:
         add_warning("Reflection contains ambiguity; confidence is below high.")
 
+    cache_key = prepared.cache_key if cacheable else None
     _persist_reflection_event(
-        transcript=cleaned,
+        transcript=prepared.transcript,
         reflection=reflection,
         internal_metadata=internal_metadata,
+        cache_key=cache_key,
     )
+    if cache_key is not None:
+        get_reflection_cache().put(
+            cache_key,
+            CachedReflection(
+                reflection=reflection,
+                internal_metadata=asdict(internal_metadata),
+            ),
+        )
 
     return ReflectionResult(reflection=reflection, internal_metadata=internal_metadata)
 
 
-def _parse_reflection(content: str) -> Reflection:
+def _parse_reflection_payload(content: str) -> Reflection | None:
     try:
         payload = json.loads(content)
         return Reflection.model_validate(payload)
@@ -121,15 +541,19 @@ def _parse_reflection(content: str) -> Reflection:
                 return Reflection.model_validate(extracted_payload)
             except ValidationError:
                 pass
-        add_warning("Reflection provider response was malformed; fallback reflection was used.")
-        return Reflection(
-            title="Fallback reflection",
-            summary="The transcript was processed, but structured reflection parsing was incomplete.",
-            themes=["processing fallback"],
-            questions=["Which part of the transcript should be clarified first?"],
-            next_thoughts=["Possible area to expand: the most specific claim in the transcript."],
-            confidence="low",
-        )
+        return None
+
+
+def _malformed_reflection() -> Reflection:
+    add_warning("Reflection provider response was malformed; fallback reflection was used.")
+    return Reflection(
+        title="Fallback reflection",
+        summary="The transcript was processed, but structured reflection parsing was incomplete.",
+        themes=["processing fallback"],
+        questions=["Which part of the transcript should be clarified first?"],
+        next_thoughts=["Possible area to expand: the most specific claim in the transcript."],
+        confidence="low",
+    )
 
 
 def _persist_reflection_event(
@@ -137,7 +561,9 @@ def _persist_reflection_event(
     transcript: str,
     reflection: Reflection,
     internal_metadata: ReflectionInternalMetadata,
+    cache_key: ReflectionCacheKey | None = None,
 ) -> None:
+    transcript_sha256, provider, model, prompt_fingerprint = cache_key or (None,) * 4
     try:
         insert_reflection_event_row(
             transcript_text=transcript,
@@ -148,6 +574,10 @@ def _persist_reflection_event(
                     "ambiguity_detected": internal_metadata.ambiguity_detected,
                 }
             ),
+            transcript_sha256=transcript_sha256,
+            provider=provider,
+            model=model,
+            prompt_fingerprint=prompt_fingerprint,
         )
     except sqlite3.Error:
         add_warning("Reflection metadata persistence failed for this request.")
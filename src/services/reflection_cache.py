@@ -0,0 +1,142 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from src.core.settings import get_settings
+from src.db.engine import get_connection
+from src.schemas.reflection import Reflection
+from src.services.embedding_cache import CacheStats, text_fingerprint
+
+ReflectionCacheKey = tuple[str, str, str, str]
+
+
+@dataclass
+class CachedReflection:
+    reflection: Reflection
+    internal_metadata: dict[str, object]
+
+
+def reflection_cache_key(
+    *, transcript: str, provider: str, model: str, prompt_fingerprint: str
+) -> ReflectionCacheKey:
+    return (text_fingerprint(transcript), provider, model, prompt_fingerprint)
+
+
+class ReflectionCache:
+    """Bounded in-process LRU with TTL over keyed ``reflection_events`` rows.
+
+    Entries are keyed by (sha256(transcript), provider, model, prompt fingerprint),
+    so editing ``REFLECTION_PROMPT`` or switching models never serves stale output.
+    Misses fall through to the newest matching event younger than the TTL, which
+    lets a reflection produced by ``POST /echo`` be reused by ``POST /notes``.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[ReflectionCacheKey, tuple[float, CachedReflection]] = (
+            OrderedDict()
+        )
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: ReflectionCacheKey) -> CachedReflection | None:
+        if self.ttl_seconds <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return _copy(entry[1])
+                del self._entries[key]
+
+        loaded = self._load(key)
+        with self._lock:
+            if loaded is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._remember(key, *loaded)
+        return _copy(loaded[1])
+
+    def put(self, key: ReflectionCacheKey, cached: CachedReflection) -> None:
+        """Remember a fresh reflection; its keyed event row is the persistent copy."""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._remember(key, time.time(), _copy(cached))
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, entries=len(self._entries))
+
+    def _remember(
+        self, key: ReflectionCacheKey, stored_at: float, cached: CachedReflection
+    ) -> None:
+        self._entries[key] = (stored_at, cached)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: ReflectionCacheKey) -> tuple[float, CachedReflection] | None:
+        try:
+            connection = get_connection()
+            row = connection.execute(
+                """
+                SELECT reflection_json, reflection_internal_json, created_at
+                FROM reflection_events
+                WHERE transcript_sha256 = ? AND provider = ? AND model = ?
+                  AND prompt_fingerprint = ? AND created_at >= datetime('now', ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT 1
+                """,
+                (*key, f"-{self.ttl_seconds} seconds"),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        created_at = datetime.fromisoformat(row["created_at"]).replace(tzinfo=UTC)
+        cached = CachedReflection(
+            reflection=Reflection.model_validate_json(row["reflection_json"]),
+            internal_metadata=json.loads(row["reflection_internal_json"]),
+        )
+        return created_at.timestamp(), cached
+
+
+def _copy(cached: CachedReflection) -> CachedReflection:
+    return CachedReflection(
+        reflection=cached.reflection.model_copy(deep=True),
+        internal_metadata=dict(cached.internal_metadata),
+    )
+
+
+_CACHES: dict[Path, ReflectionCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_reflection_cache() -> ReflectionCache:
+    settings = get_settings()
+    with _CACHES_LOCK:
+        cache = _CACHES.get(settings.database_path)
+        if cache is None:
+            cache = ReflectionCache(
+                max_entries=settings.reflection_cache_size,
+                ttl_seconds=settings.reflection_cache_ttl_seconds,
+            )
+            _CACHES[settings.database_path] = cache
+    return cache
+
+
+def clear_reflection_caches() -> None:
+    with _CACHES_LOCK:
+        _CACHES.clear()
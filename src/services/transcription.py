@@ -1,21 +1,40 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
-from functools import lru_cache
 from pathlib import Path
-import tempfile
 from typing import Protocol
 
 from fastapi import UploadFile
 
-from src.core.request_context import add_warning
+from src.core.llm.breaker import get_circuit_breaker
+from src.core.llm.clients import call_with_deadline, get_openai_client
+from src.core.request_context import (
+    add_warning,
+    deadline_exhausted,
+    record_cache_hit,
+    remaining_budget,
+)
 from src.core.settings import get_settings
-from src.schemas.transcript import Transcript, TranscriptMetadata
+from src.schemas.transcript import Transcript, TranscriptMetadata, TranscriptSegment
+from src.services.audio_segments import SAMPLE_RATE, plan_windows, transcribe_windows
+from src.services.transcription_cache import get_transcription_cache
+from src.services.uploads import SpooledUpload, UploadTooLargeError, spool_upload
+from src.services.whisper_models import get_whisper_pool
 
 
 class TranscriptionProvider(Protocol):
     name: str
+    model: str
 
-    def transcribe(self, *, audio_path: Path, filename: str, content_type: str) -> Transcript:
-        """Transcribe an audio file into text."""
+    def transcribe(
+        self,
+        *,
+        audio_path: Path,
+        filename: str,
+        content_type: str,
+        timeout: float | None = None,
+    ) -> Transcript:
+        """Transcribe an audio file into text within ``timeout`` seconds, if given."""
 
 
 @dataclass
@@ -30,19 +49,52 @@ class LocalWhisperTranscriptionProvider:
     def __init__(self, *, model_name: str) -> None:
         self.model_name = model_name
 
-    def transcribe(self, *, audio_path: Path, filename: str, content_type: str) -> Transcript:
-        model = _load_whisper_model(self.model_name)
-        result = model.transcribe(str(audio_path))  # type: ignore[attr-defined]
-        transcript_text = (result.get("text") or "").strip()
-        language = result.get("language")
+    @property
+    def model(self) -> str:
+        return self.model_name
+
+    def transcribe(
+        self,
+        *,
+        audio_path: Path,
+        filename: str,
+        content_type: str,
+        timeout: float | None = None,
+    ) -> Transcript:
+        import whisper  # type: ignore
+
+        settings = get_settings()
+        samples = whisper.load_audio(str(audio_path))
+        windows = plan_windows(
+            samples,
+            target_seconds=settings.transcription_segment_seconds,
+            overlap_seconds=settings.transcription_segment_overlap_seconds,
+        )
+        pool = get_whisper_pool(self.model_name)
+        processes = 1
+        if len(windows) > 1:
+            # The worker pool outlives this call, so size it for the setting, not this file.
+            processes = pool.process_allowance(settings.transcription_processes)
+        if processes > 1:
+            segments, language = transcribe_windows(
+                samples, windows, model_name=self.model_name, processes=processes
+            )
+            transcript_text = " ".join(segment.text for segment in segments)
+        else:
+            with pool.acquire(timeout=timeout) as model:
+                result = model.transcribe(samples)
+            transcript_text = (result.get("text") or "").strip()
+            language = result.get("language")
+            segments = _segments(result.get("segments"))
         return Transcript(
             text=transcript_text,
             metadata=TranscriptMetadata(
                 model=f"whisper-{self.model_name}",
                 language=language,
-                duration_seconds=None,
+                duration_seconds=round(len(samples) / SAMPLE_RATE, 3),
                 source="whisper_local",
             ),
+            segments=segments,
         )
 
 
@@ -54,19 +106,26 @@ class OpenAIWhisperTranscriptionProvider:
         self.base_url = base_url
         self.model = model
 
-    def transcribe(self, *, audio_path: Path, filename: str, content_type: str) -> Transcript:
-        try:
-            from openai import OpenAI
-        except ModuleNotFoundError as exc:
-            raise RuntimeError("openai package is not installed") from exc
-
-        client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-        with audio_path.open("rb") as handle:
-            result = client.audio.transcriptions.create(
-                model=self.model,
-                file=handle,
-                response_format="verbose_json",
-            )
+    def transcribe(
+        self,
+        *,
+        audio_path: Path,
+        filename: str,
+        content_type: str,
+        timeout: float | None = None,
+    ) -> Transcript:
+        def create(client):
+            # Reopened per attempt so a retry uploads the whole file again.
+            with audio_path.open("rb") as handle:
+                return client.audio.transcriptions.create(
+                    model=self.model,
+                    file=handle,
+                    response_format="verbose_json",
+                )
+
+        result = call_with_deadline(
+            get_openai_client(api_key=self.api_key, base_url=self.base_url), timeout, create
+        )
 
         language = getattr(result, "language", None)
         duration = getattr(result, "duration", None)
@@ -79,17 +138,45 @@ class OpenAIWhisperTranscriptionProvider:
                 duration_seconds=float(duration) if duration is not None else None,
                 source="whisper_openai_api",
             ),
+            segments=_segments(getattr(result, "segments", None)),
         )
 
 
 def transcribe_upload(file: UploadFile) -> Transcript:
-    content = file.file.read()
-    content_type = file.content_type or ""
-    filename = file.filename or "upload.wav"
-    lowercase_name = filename.lower()
+    """Stream an upload to disk and transcribe it.
 
-    if content_type.startswith("text/") or lowercase_name.endswith(".txt"):
-        text = content.decode("utf-8", errors="ignore").strip()
+    Raises ``UploadTooLargeError`` when the upload exceeds ``upload_max_bytes``.
+    """
+    with spool_audio_upload(file) as upload:
+        return transcribe_spooled(
+            upload, filename=file.filename or "upload.wav", content_type=file.content_type or ""
+        )
+
+
+@contextmanager
+def spool_audio_upload(
+    file: UploadFile, *, directory: Path | None = None
+) -> Iterator[SpooledUpload]:
+    """Spool an upload to disk with the configured size limit and chunk size."""
+    settings = get_settings()
+    if file.size is not None and file.size > settings.upload_max_bytes:
+        raise UploadTooLargeError(f"Upload exceeds the {settings.upload_max_bytes} byte limit.")
+    lowercase_name = (file.filename or "upload.wav").lower()
+    with spool_upload(
+        file.file,
+        max_bytes=settings.upload_max_bytes,
+        chunk_bytes=settings.upload_chunk_bytes,
+        fallback_suffix=Path(lowercase_name).suffix if "." in lowercase_name else ".wav",
+        directory=directory,
+    ) as upload:
+        yield upload
+
+
+def transcribe_spooled(upload: SpooledUpload, *, filename: str, content_type: str) -> Transcript:
+    if upload.audio_format is None and (
+        content_type.startswith("text/") or filename.lower().endswith(".txt")
+    ):
+        text = upload.path.read_text(encoding="utf-8", errors="ignore").strip()
         return Transcript(
             text=text,
             metadata=TranscriptMetadata(
@@ -100,39 +187,75 @@ def transcribe_upload(file: UploadFile) -> Transcript:
             ),
         )
 
-    suffix = Path(lowercase_name).suffix if "." in lowercase_name else ".wav"
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=True) as temp_file:
-        temp_file.write(content)
-        temp_file.flush()
-        audio_path = Path(temp_file.name)
-        resolution = _resolve_transcription_provider()
-        if resolution.warning:
-            add_warning(resolution.warning)
-        if resolution.provider is None:
-            return _unavailable_transcript()
-
-        try:
-            return resolution.provider.transcribe(
+    audio_path = upload.path
+    resolution = _resolve_transcription_provider()
+    if resolution.warning:
+        add_warning(resolution.warning)
+    if resolution.provider is None:
+        return _unavailable_transcript()
+    cached = _cached_transcript(upload, resolution.provider)
+    if cached is not None:
+        return cached
+    if deadline_exhausted():
+        add_warning("Request deadline is nearly exhausted; transcription was skipped.")
+        return _unavailable_transcript()
+
+    try:
+        with _breaker(resolution.provider).track():
+            transcript = resolution.provider.transcribe(
                 audio_path=audio_path,
                 filename=filename,
                 content_type=content_type,
+                timeout=remaining_budget(),
             )
-        except Exception:
-            add_warning("Primary transcription provider failed; attempting local Whisper fallback.")
-            fallback = _resolve_local_provider()
-            if fallback is not None:
-                try:
-                    return fallback.transcribe(
+        return _store_transcript(upload, resolution.provider, transcript)
+    except Exception:
+        add_warning("Primary transcription provider failed; attempting local Whisper fallback.")
+        fallback = _resolve_local_provider()
+        if fallback is not None and _breaker(fallback).allow() and not deadline_exhausted():
+            try:
+                with _breaker(fallback).track():
+                    transcript = fallback.transcribe(
                         audio_path=audio_path,
                         filename=filename,
                         content_type=content_type,
                     )
-                except Exception:
-                    add_warning("Local Whisper fallback failed.")
+                return _store_transcript(upload, fallback, transcript)
+            except Exception:
+                add_warning("Local Whisper fallback failed.")
 
     return _unavailable_transcript()
 
 
+def _cached_transcript(upload: SpooledUpload, provider: TranscriptionProvider) -> Transcript | None:
+    cached = get_transcription_cache().get((upload.sha256, provider.name, provider.model))
+    if cached is not None:
+        record_cache_hit("transcription")
+    return cached
+
+
+def _store_transcript(
+    upload: SpooledUpload, provider: TranscriptionProvider, transcript: Transcript
+) -> Transcript:
+    # Empty transcripts are usually failed decodes; let the next upload try again.
+    if transcript.text:
+        get_transcription_cache().put((upload.sha256, provider.name, provider.model), transcript)
+    return transcript
+
+
+def _segments(raw_segments) -> list[TranscriptSegment]:
+    """Normalize Whisper segments, given as dicts or SDK objects, to the schema."""
+    segments = []
+    for raw in raw_segments or []:
+        fields = raw if isinstance(raw, dict) else vars(raw)
+        text = str(fields.get("text", "")).strip()
+        if text:
+            segments.append(
+                TranscriptSegment(start=float(fields["start"]), end=float(fields["end"]), text=text)
+            )
+    return segments
+
+
 def _unavailable_transcript() -> Transcript:
     add_warning("Transcription provider unavailable; transcription was not performed.")
     return Transcript(
@@ -152,18 +275,27 @@ def _resolve_transcription_provider() -> TranscriptionProviderResolution:
 
     if requested in {"local", "auto"}:
         local_provider = _resolve_local_provider()
-        if local_provider is not None:
+        if local_provider is not None and _breaker(local_provider).allow():
             return TranscriptionProviderResolution(provider=local_provider)
         if requested == "local":
             return TranscriptionProviderResolution(
                 provider=None,
-                warning="Configured local Whisper provider is unavailable.",
+                warning=(
+                    "Configured local Whisper provider is unavailable."
+                    if local_provider is None
+                    else "Local Whisper provider circuit is open."
+                ),
             )
 
     if requested in {"openai", "auto"}:
         openai_provider = _resolve_openai_provider()
         if openai_provider is not None:
-            return TranscriptionProviderResolution(provider=openai_provider)
+            if _breaker(openai_provider).allow():
+                return TranscriptionProviderResolution(provider=openai_provider)
+            return TranscriptionProviderResolution(
+                provider=None,
+                warning="OpenAI Whisper provider circuit is open.",
+            )
         if requested == "openai":
             return TranscriptionProviderResolution(
                 provider=None,
@@ -179,6 +311,10 @@ def _resolve_transcription_provider() -> TranscriptionProviderResolution:
     return TranscriptionProviderResolution(provider=None)
 
 
+def _breaker(provider: TranscriptionProvider):
+    return get_circuit_breaker(provider.name, track_latency=False)
+
+
 def _resolve_local_provider() -> LocalWhisperTranscriptionProvider | None:
     settings = get_settings()
     try:
@@ -201,10 +337,3 @@ def _resolve_openai_provider() -> OpenAIWhisperTranscriptionProvider | None:
         base_url=settings.openai_base_url,
         model=settings.whisper_openai_model,
     )
-
-
-@lru_cache(maxsize=2)
-def _load_whisper_model(model_name: str):
-    import whisper  # type: ignore
-
-    return whisper.load_model(model_name)
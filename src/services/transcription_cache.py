@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.core.settings import get_settings
+from src.db.engine import get_connection
+from src.schemas.transcript import Transcript
+from src.services.embedding_cache import CacheStats
+
+TranscriptionCacheKey = tuple[str, str, str]
+
+
+class TranscriptionCache:
+    """Content-addressed transcript cache stored in SQLite with an LRU row limit.
+
+    Entries are keyed by (sha256(audio bytes), provider, model), so the same
+    recording uploaded again, from any device, skips the provider. Hits refresh
+    ``last_used_at``; once more than ``max_entries`` rows exist, the least
+    recently used rows are evicted. Transcripts can be long, so nothing is
+    held in process memory. ``max_entries`` of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: TranscriptionCacheKey) -> Transcript | None:
+        if self.max_entries <= 0:
+            return None
+        try:
+            connection = get_connection()
+            with connection:
+                row = connection.execute(
+                    """
+                    UPDATE transcription_cache
+                    SET last_used_at = ?
+                    WHERE audio_sha256 = ? AND provider = ? AND model = ?
+                    RETURNING transcript_json
+                    """,
+                    (time.time(), *key),
+                ).fetchone()
+        except sqlite3.Error:
+            row = None
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return Transcript.model_validate_json(row["transcript_json"])
+
+    def put(self, key: TranscriptionCacheKey, transcript: Transcript) -> None:
+        if self.max_entries <= 0:
+            return
+        try:
+            connection = get_connection()
+            with connection:
+                connection.execute(
+                    """
+                    INSERT OR REPLACE INTO transcription_cache (
+                      audio_sha256, provider, model, transcript_json, last_used_at
+                    ) VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (*key, transcript.model_dump_json(), time.time()),
+                )
+                connection.execute(
+                    """
+                    DELETE FROM transcription_cache
+                    WHERE rowid IN (
+                      SELECT rowid FROM transcription_cache
+                      ORDER BY last_used_at DESC
+                      LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> CacheStats:
+        try:
+            entries = int(
+                get_connection().execute("SELECT COUNT(*) FROM transcription_cache").fetchone()[0]
+            )
+        except sqlite3.Error:
+            entries = 0
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, entries=entries)
+
+
+_CACHES: dict[Path, TranscriptionCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_transcription_cache() -> TranscriptionCache:
+    settings = get_settings()
+    with _CACHES_LOCK:
+        cache = _CACHES.get(settings.database_path)
+        if cache is None:
+            cache = TranscriptionCache(max_entries=settings.transcription_cache_size)
+            _CACHES[settings.database_path] = cache
+    return cache
+
+
+def clear_transcription_caches() -> None:
+    with _CACHES_LOCK:
+        _CACHES.clear()
@@ -0,0 +1,404 @@
+"""SQLite-backed background transcription jobs.
+
+Uploads are spooled next to the database (``<ECHO_NOTES_DB_PATH>.jobs/``) and
+recorded in ``transcription_jobs``; a bounded pool of worker threads claims
+queued jobs, transcribes them and stores the transcript or the error. Running
+jobs hold a lease (``heartbeat_at``) that their pool refreshes; jobs whose lease
+lapses, e.g. because a deploy restarted the process, are requeued by any live
+pool. Workers poll the table, so transcription capacity can run in its own process with
+``ECHO_NOTES_TRANSCRIPTION_WORKERS=0`` on the API and::
+
+    python -m src.services.transcription_jobs
+"""
+
+import contextvars
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import urllib.request
+import uuid
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlparse
+
+from fastapi import UploadFile
+
+from src.core.request_context import RequestMeta, get_request_meta, set_request_meta
+from src.core.settings import get_settings
+from src.db.engine import get_connection
+from src.schemas.transcript import Transcript, TranscriptionJob
+from src.services.transcription import spool_audio_upload, transcribe_spooled
+from src.services.uploads import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+
+def jobs_directory(database_path: Path) -> Path:
+    return database_path.with_name(f"{database_path.name}.jobs")
+
+
+def submit_transcription_job(file: UploadFile, *, callback_url: str | None) -> TranscriptionJob:
+    """Spool an upload and queue it for transcription.
+
+    Raises ``ValueError`` for a callback URL rejected by ``validate_callback_url``
+    and ``UploadTooLargeError`` when the upload exceeds ``upload_max_bytes``.
+    """
+    if callback_url is not None:
+        validate_callback_url(callback_url)
+    directory = jobs_directory(get_settings().database_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    with spool_audio_upload(file, directory=directory) as upload:
+        audio_path = directory / f"{job_id}{upload.path.suffix}"
+        os.replace(upload.path, audio_path)
+        try:
+            connection = get_connection()
+            with connection:
+                connection.execute(
+                    """
+                    INSERT INTO transcription_jobs (
+                      id, filename, content_type, audio_path, audio_format, audio_sha256,
+                      size_bytes, callback_url, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        job_id,
+                        file.filename or "upload.wav",
+                        file.content_type or "",
+                        str(audio_path),
+                        upload.audio_format,
+                        upload.sha256,
+                        upload.size,
+                        callback_url,
+                        _now(),
+                    ),
+                )
+        except BaseException:
+            # Without its row nothing would ever claim, or delete, the moved file.
+            audio_path.unlink(missing_ok=True)
+            raise
+    if _POOL is not None:
+        _POOL.notify()
+    return get_transcription_job(job_id)
+
+
+def validate_callback_url(url: str) -> None:
+    """Reject callback URLs that could reach the server's own network.
+
+    The URL must be http(s), and unless its host is listed in
+    ``transcription_callback_allowed_hosts`` every address it resolves to must be
+    globally routable, so loopback, link-local (cloud metadata) and private
+    ranges are refused. Raises ``ValueError`` otherwise.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in {"http", "https"} or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL.")
+    host = parsed.hostname.lower()
+    if host in _allowed_callback_hosts():
+        return
+    try:
+        infos = socket.getaddrinfo(host, parsed.port or 0, type=socket.SOCK_STREAM)
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"callback_url host '{host}' could not be resolved.") from exc
+    for info in infos:
+        address = ipaddress.ip_address(str(info[4][0]).split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise ValueError(f"callback_url host '{host}' resolves to a non-public address.")
+
+
+def _allowed_callback_hosts() -> set[str]:
+    hosts = get_settings().transcription_callback_allowed_hosts
+    return {host.strip().lower() for host in hosts.split(",") if host.strip()}
+
+
+def get_transcription_job(job_id: str) -> TranscriptionJob:
+    row = (
+        get_connection()
+        .execute("SELECT * FROM transcription_jobs WHERE id = ?", (job_id,))
+        .fetchone()
+    )
+    if row is None:
+        raise KeyError(f"Transcription job {job_id} not found")
+    transcript = row["transcript_json"]
+    return TranscriptionJob(
+        id=row["id"],
+        status=row["status"],
+        filename=row["filename"],
+        size_bytes=int(row["size_bytes"]),
+        audio_sha256=row["audio_sha256"],
+        callback_url=row["callback_url"],
+        transcript=Transcript.model_validate_json(transcript) if transcript else None,
+        warnings=json.loads(row["warnings_json"]),
+        error=row["error"],
+        created_at=row["created_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+    )
+
+
+def run_next_transcription_job() -> bool:
+    """Claim and run the oldest queued job, returning whether there was one."""
+    connection = get_connection()
+    with connection:
+        row = connection.execute(
+            """
+            UPDATE transcription_jobs
+            SET status = 'running', started_at = ?, heartbeat_at = ?
+            WHERE id = (
+              SELECT id FROM transcription_jobs
+              WHERE status = 'queued'
+              ORDER BY created_at, id
+              LIMIT 1
+            ) AND status = 'queued'
+            RETURNING *
+            """,
+            (_now(), _now()),
+        ).fetchone()
+    if row is None:
+        return False
+    with _RUNNING_LOCK:
+        _RUNNING_JOBS.add(row["id"])
+    try:
+        # Each job gets its own request meta so its warnings are stored with it.
+        contextvars.copy_context().run(_run_job, row)
+    finally:
+        with _RUNNING_LOCK:
+            _RUNNING_JOBS.discard(row["id"])
+    return True
+
+
+_RUNNING_JOBS: set[str] = set()
+_RUNNING_LOCK = threading.Lock()
+
+
+def heartbeat_running_jobs() -> None:
+    """Refresh the lease of every job running in this process."""
+    with _RUNNING_LOCK:
+        job_ids = list(_RUNNING_JOBS)
+    if not job_ids:
+        return
+    connection = get_connection()
+    with connection:
+        connection.executemany(
+            "UPDATE transcription_jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+            [(_now(), job_id) for job_id in job_ids],
+        )
+
+
+def _run_job(row) -> None:
+    set_request_meta(RequestMeta(request_id=f"job-{row['id']}"))
+    audio_path = Path(row["audio_path"])
+    upload = SpooledUpload(
+        path=audio_path,
+        size=int(row["size_bytes"]),
+        sha256=row["audio_sha256"],
+        audio_format=row["audio_format"],
+    )
+    transcript_json, error = None, None
+    try:
+        transcript = transcribe_spooled(
+            upload, filename=row["filename"], content_type=row["content_type"]
+        )
+        if transcript.metadata.source == "audio_unprocessed":
+            # No provider could transcribe the audio; the warnings say why.
+            error = "No transcription provider could process the audio."
+        else:
+            transcript_json = transcript.model_dump_json()
+    except Exception as exc:
+        logger.exception("Transcription job %s failed.", row["id"])
+        error = str(exc) or type(exc).__name__
+    finally:
+        audio_path.unlink(missing_ok=True)
+
+    connection = get_connection()
+    with connection:
+        connection.execute(
+            """
+            UPDATE transcription_jobs
+            SET status = ?, transcript_json = ?, warnings_json = ?, error = ?, finished_at = ?
+            WHERE id = ?
+            """,
+            (
+                "failed" if error is not None else "done",
+                transcript_json,
+                json.dumps(get_request_meta().warnings),
+                error,
+                _now(),
+                row["id"],
+            ),
+        )
+    if row["callback_url"]:
+        _deliver_callback(row["callback_url"], get_transcription_job(row["id"]))
+
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """Surface redirects as errors; following one could bypass the callback checks."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_CALLBACK_OPENER = urllib.request.build_opener(_NoRedirects)
+
+
+def _deliver_callback(url: str, job: TranscriptionJob) -> None:
+    request = urllib.request.Request(
+        url,
+        data=job.model_dump_json().encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        # Checked again at delivery: the host may resolve differently than at submission.
+        validate_callback_url(url)
+        with _CALLBACK_OPENER.open(  # nosec B310
+            request, timeout=get_settings().transcription_callback_timeout_seconds
+        ):
+            pass
+    except Exception:
+        logger.warning("Callback for transcription job %s to %s failed.", job.id, url)
+
+
+def requeue_stale_jobs() -> int:
+    """Requeue running jobs whose lease lapsed because their worker stopped."""
+    stale_seconds = get_settings().transcription_job_stale_seconds
+    cutoff = (datetime.now(tz=UTC) - timedelta(seconds=stale_seconds)).isoformat()
+    connection = get_connection()
+    with connection:
+        return connection.execute(
+            """
+            UPDATE transcription_jobs
+            SET status = 'queued', started_at = NULL, heartbeat_at = NULL
+            WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?
+            """,
+            (cutoff,),
+        ).rowcount
+
+
+class TranscriptionWorkerPool:
+    """Fixed number of threads that drain the job table.
+
+    Idle workers sleep for ``poll_seconds`` or until ``notify`` is called, so a
+    job submitted in this process starts at once and jobs submitted by other
+    processes are picked up on the next poll. A lease thread refreshes the
+    heartbeat of running jobs every third of ``stale_seconds`` and requeues
+    jobs whose heartbeat is older than that.
+    """
+
+    def __init__(self, *, workers: int, poll_seconds: float, stale_seconds: float) -> None:
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lease_stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lease_thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        for position in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"transcription-worker-{position}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        self._lease_thread = threading.Thread(
+            target=self._maintain_leases, name="transcription-leases", daemon=True
+        )
+        self._lease_thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Stop taking new jobs and wait for running ones to finish."""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+        # Running jobs keep their lease until the workers above have finished them.
+        self._lease_stopping.set()
+        if self._lease_thread is not None:
+            self._lease_thread.join()
+            self._lease_thread = None
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if run_next_transcription_job():
+                    continue
+            except Exception:
+                logger.exception("Transcription worker failed to claim a job.")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _maintain_leases(self) -> None:
+        while not self._lease_stopping.wait(max(0.1, self.stale_seconds / 3)):
+            try:
+                heartbeat_running_jobs()
+                if requeue_stale_jobs():
+                    self.notify()
+            except Exception:
+                logger.exception("Transcription lease maintenance failed.")
+
+
+_POOL: TranscriptionWorkerPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def start_transcription_workers() -> None:
+    global _POOL
+    settings = get_settings()
+    with _POOL_LOCK:
+        if _POOL is not None or settings.transcription_workers <= 0:
+            return
+        requeue_stale_jobs()
+        _POOL = TranscriptionWorkerPool(
+            workers=settings.transcription_workers,
+            poll_seconds=settings.transcription_job_poll_seconds,
+            stale_seconds=settings.transcription_job_stale_seconds,
+        )
+        _POOL.start()
+
+
+def stop_transcription_workers() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.stop()
+
+
+def _now() -> str:
+    return datetime.now(tz=UTC).isoformat()
+
+
+def _main() -> None:
+    from src.core.logging import configure_logging
+    from src.db.engine import init_db
+
+    configure_logging()
+    init_db()
+    requeue_stale_jobs()
+    settings = get_settings()
+    pool = TranscriptionWorkerPool(
+        workers=max(1, settings.transcription_workers),
+        poll_seconds=settings.transcription_job_poll_seconds,
+        stale_seconds=settings.transcription_job_stale_seconds,
+    )
+    pool.start()
+    logger.info("Running %s transcription workers; press Ctrl+C to stop.", pool.workers)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    _main()
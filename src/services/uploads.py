@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+# Longest signature below is 12 bytes; the first chunk is always at least this long.
+_SNIFF_BYTES = 12
+
+
+class UploadTooLargeError(Exception):
+    """The upload is larger than ``upload_max_bytes``."""
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    size: int
+    sha256: str
+    audio_format: str | None
+
+
+def sniff_audio_format(head: bytes) -> str | None:
+    """Detect a container format from the first bytes of a file."""
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+@contextmanager
+def spool_upload(
+    source: BinaryIO,
+    *,
+    max_bytes: int,
+    chunk_bytes: int,
+    fallback_suffix: str = "",
+    directory: Path | None = None,
+) -> Iterator[SpooledUpload]:
+    """Copy an upload to a named temporary file in fixed-size chunks.
+
+    The content is hashed and size-checked as it is copied, so only one chunk is
+    held in memory at a time. Starlette spools large uploads to an unnamed file,
+    which providers cannot open by path, hence the copy. The file suffix comes
+    from the sniffed format, else ``fallback_suffix``. The file is created in
+    ``directory`` (default: the system temp dir) and removed on exit unless the
+    caller has moved it away.
+    Raises ``UploadTooLargeError`` as soon as more than ``max_bytes`` are read.
+    """
+    chunk_bytes = max(_SNIFF_BYTES, chunk_bytes)
+    head = source.read(chunk_bytes)
+    audio_format = sniff_audio_format(head[:_SNIFF_BYTES])
+    suffix = f".{audio_format}" if audio_format else fallback_suffix
+    digest = hashlib.sha256()
+    size = 0
+    descriptor, name = tempfile.mkstemp(suffix=suffix, dir=directory)
+    path = Path(name)
+    try:
+        with os.fdopen(descriptor, "wb") as target:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit.")
+                digest.update(chunk)
+                target.write(chunk)
+                chunk = source.read(chunk_bytes)
+        yield SpooledUpload(
+            path=path, size=size, sha256=digest.hexdigest(), audio_format=audio_format
+        )
+    finally:
+        path.unlink(missing_ok=True)
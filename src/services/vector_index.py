@@ -0,0 +1,299 @@
+import logging
+import math
+import shutil
+import threading
+import time
+from array import array
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Protocol
+
+from src.core.settings import get_settings
+from src.db.engine import get_connection
+from src.db.vectors import np, row_embedding
+from src.services.embeddings import top_k_similar
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 1024
+NOTES_TABLE = "notes"
+CHUNKS_TABLE = "note_chunks"
+# Chunk rows always carry a blob; the empty JSON column keeps ``row_embedding`` uniform.
+_SYNC_QUERIES = {
+    NOTES_TABLE: """
+        SELECT id, embedding_blob, embedding_json
+        FROM notes
+        WHERE id > ?
+        ORDER BY id
+        """,
+    CHUNKS_TABLE: """
+        SELECT id, embedding_blob, '' AS embedding_json
+        FROM note_chunks
+        WHERE id > ?
+        ORDER BY id
+        """,
+}
+
+
+class VectorStore(Protocol):
+    dimension: int
+
+    @property
+    def size(self) -> int:
+        """Number of stored (not deleted) vectors."""
+
+    @property
+    def max_note_id(self) -> int:
+        """Largest note id ever appended, including deleted ones."""
+
+    def append(self, note_id: int, vector: Sequence[float]) -> None:
+        """Store a vector for a note id not yet present in the store."""
+
+    def remove(self, note_id: int) -> bool:
+        """Delete a note's vector, returning whether it was present."""
+
+    def top_k(self, query: Sequence[float], k: int) -> list[tuple[int, float]]:
+        """Return up to k (note_id, cosine similarity) pairs, best first."""
+
+
+class _NumpyVectorStore:
+    """Contiguous float32 matrix with cached row norms for one embedding dimension."""
+
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+        self.size = 0
+        self.max_note_id = 0
+        self.matrix = np.empty((_INITIAL_CAPACITY, dimension), dtype=np.float32)
+        self.norms = np.empty(_INITIAL_CAPACITY, dtype=np.float32)
+        self.ids = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+
+    def append(self, note_id: int, vector: Sequence[float]) -> None:
+        if self.size == len(self.ids):
+            capacity = len(self.ids) * 2
+            self.matrix = _grow(self.matrix, capacity, self.size)
+            self.norms = _grow(self.norms, capacity, self.size)
+            self.ids = _grow(self.ids, capacity, self.size)
+
+        row = np.asarray(vector, dtype=np.float32)
+        self.matrix[self.size] = row
+        self.norms[self.size] = np.linalg.norm(row)
+        self.ids[self.size] = note_id
+        self.size += 1
+        self.max_note_id = max(self.max_note_id, note_id)
+
+    def remove(self, note_id: int) -> bool:
+        positions = np.flatnonzero(self.ids[: self.size] == note_id)
+        if not len(positions):
+            return False
+        position, last = int(positions[0]), self.size - 1
+        self.matrix[position] = self.matrix[last]
+        self.norms[position] = self.norms[last]
+        self.ids[position] = self.ids[last]
+        self.size -= 1
+        return True
+
+    def top_k(self, query: Sequence[float], k: int) -> list[tuple[int, float]]:
+        return top_k_similar(
+            query,
+            self.matrix[: self.size],
+            k,
+            ids=self.ids[: self.size],
+            norms=self.norms[: self.size],
+        )
+
+
+class _PythonVectorStore:
+    """Pure-Python fallback used when NumPy is not installed."""
+
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+        self.max_note_id = 0
+        self.rows: list[array] = []
+        self.norms: list[float] = []
+        self.ids: list[int] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def append(self, note_id: int, vector: Sequence[float]) -> None:
+        self.rows.append(array("f", vector))
+        self.norms.append(math.sqrt(sum(value * value for value in vector)))
+        self.ids.append(note_id)
+        self.max_note_id = max(self.max_note_id, note_id)
+
+    def remove(self, note_id: int) -> bool:
+        if note_id not in self.ids:
+            return False
+        position = self.ids.index(note_id)
+        del self.rows[position], self.norms[position], self.ids[position]
+        return True
+
+    def top_k(self, query: Sequence[float], k: int) -> list[tuple[int, float]]:
+        return top_k_similar(query, self.rows, k, ids=self.ids, norms=self.norms)
+
+
+class VectorIndex:
+    """In-memory cosine index over every stored note embedding.
+
+    Vectors are grouped by dimension, so notes embedded by different providers
+    never compare against each other, matching ``cosine_similarity`` semantics.
+    Each dimension is held by a ``VectorStore``; the default is an exact scan and
+    ``src.services.ann_index`` provides a persistent approximate alternative.
+    With ``table="note_chunks"`` the index holds chunk vectors keyed by chunk id.
+    """
+
+    def __init__(
+        self,
+        *,
+        store_factory: Callable[[int], VectorStore] | None = None,
+        stores: dict[int, VectorStore] | None = None,
+        table: str = NOTES_TABLE,
+    ) -> None:
+        if table not in _SYNC_QUERIES:
+            raise ValueError(f"Unknown vector index table '{table}'.")
+        self.table = table
+        self._lock = threading.Lock()
+        self._store_factory = store_factory or _exact_store
+        self._stores: dict[int, VectorStore] = dict(stores or {})
+        # Stores loaded from disk already hold every id up to this watermark.
+        self._persisted_max_note_id = max(
+            (store.max_note_id for store in self._stores.values()), default=0
+        )
+        self._max_note_id = self._persisted_max_note_id
+        self._note_ids: set[int] = set()
+        self._synced_at: float | None = None
+
+    def __len__(self) -> int:
+        return sum(store.size for store in self._stores.values())
+
+    @property
+    def stores(self) -> list[VectorStore]:
+        return list(self._stores.values())
+
+    def add(self, note_id: int, vector: Sequence[float]) -> None:
+        if not len(vector):
+            return
+        with self._lock:
+            self._add_locked(note_id, vector)
+
+    def remove(self, note_id: int) -> bool:
+        with self._lock:
+            self._note_ids.add(note_id)
+            return any(store.remove(note_id) for store in self._stores.values())
+
+    def search(self, vector: Sequence[float], k: int) -> list[tuple[int, float]]:
+        # In-process writes call ``add`` directly; polling SQLite is only needed for
+        # rows written elsewhere, so searches check at most once per interval.
+        interval = get_settings().vector_index_sync_seconds
+        if self._synced_at is None or time.monotonic() - self._synced_at >= interval:
+            self.sync()
+        with self._lock:
+            store = self._stores.get(len(vector))
+            return store.top_k(vector, k) if store is not None else []
+
+    def sync(self) -> None:
+        """Pick up rows inserted by other processes since the last load."""
+        self._synced_at = time.monotonic()
+        connection = get_connection()
+        rows = connection.execute(_SYNC_QUERIES[self.table], (self._max_note_id,)).fetchall()
+        if not rows:
+            return
+        with self._lock:
+            for row in rows:
+                self._add_locked(int(row["id"]), row_embedding(row))
+
+    def _add_locked(self, note_id: int, vector: Sequence[float]) -> None:
+        if note_id <= self._persisted_max_note_id or note_id in self._note_ids:
+            return
+        dimension = len(vector)
+        store = self._stores.get(dimension)
+        if store is None:
+            store = self._store_factory(dimension)
+            self._stores[dimension] = store
+        store.append(note_id, vector)
+        self._note_ids.add(note_id)
+        self._max_note_id = max(self._max_note_id, note_id)
+
+
+def _grow(values, capacity: int, used: int):
+    grown = np.empty((capacity, *values.shape[1:]), dtype=values.dtype)
+    grown[:used] = values[:used]
+    return grown
+
+
+def _exact_store(dimension: int) -> VectorStore:
+    if np is not None:
+        return _NumpyVectorStore(dimension)
+    return _PythonVectorStore(dimension)
+
+
+_INDEXES: dict[tuple[Path, str], VectorIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    return _get_index(NOTES_TABLE)
+
+
+def get_chunk_index() -> VectorIndex:
+    return _get_index(CHUNKS_TABLE)
+
+
+def _get_index(table: str) -> VectorIndex:
+    settings = get_settings()
+    key = (settings.database_path, table)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _open_index(settings.database_path, table)
+            _INDEXES[key] = index
+    return index
+
+
+def load_vector_index() -> VectorIndex:
+    """Load the note and chunk indexes, rebuilding either if it disagrees with its table."""
+    for table in (CHUNKS_TABLE, NOTES_TABLE):
+        index = _get_index(table)
+        index.sync()
+        connection = get_connection()
+        row_count = int(connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+        if len(index) != row_count:
+            logger.warning(
+                "Vector index holds %s vectors for %s rows; rebuilding from the %s table.",
+                len(index),
+                row_count,
+                table,
+            )
+            index = _rebuild_index(get_settings().database_path, table)
+    return index
+
+
+def _open_index(db_path: Path, table: str = NOTES_TABLE) -> VectorIndex:
+    settings = get_settings()
+    backend = settings.vector_index_backend.lower()
+    if backend == "ivf":
+        if np is not None:
+            from src.services.ann_index import open_ivf_index
+
+            return open_ivf_index(db_path, nprobe=settings.vector_index_nprobe, table=table)
+        logger.warning("IVF vector index requires numpy; using exact vector index.")
+    elif backend != "exact":
+        logger.warning("Unknown vector index backend '%s'; using exact index.", backend)
+    return VectorIndex(table=table)
+
+
+def _rebuild_index(db_path: Path, table: str = NOTES_TABLE) -> VectorIndex:
+    from src.services.ann_index import ivf_directory
+
+    shutil.rmtree(ivf_directory(db_path, table), ignore_errors=True)
+    index = _open_index(db_path, table)
+    index.sync()
+    with _INDEXES_LOCK:
+        _INDEXES[(db_path, table)] = index
+    return index
+
+
+def clear_vector_indexes() -> None:
+    with _INDEXES_LOCK:
+        _INDEXES.clear()
@@ -0,0 +1,295 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from src.core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+WhisperState = Literal["unavailable", "idle", "loading", "ready", "failed"]
+
+
+@dataclass
+class WhisperPoolSnapshot:
+    model: str
+    state: WhisperState
+    ready: bool
+    replicas_target: int
+    replicas_loaded: int
+    replicas_in_use: int
+    model_memory_mb: float | None
+    memory_budget_mb: float | None
+    error: str | None
+
+
+class WhisperModelPool:
+    """Preloaded replicas of one Whisper model, lent to one transcription at a time.
+
+    ``warm_up`` loads up to ``replicas`` models, stopping early once another
+    replica would exceed ``memory_budget_bytes``; the first loaded model is
+    measured to size the rest. Callers that find no idle replica load one
+    lazily while the target and budget allow, otherwise they wait for a
+    replica to be returned. Whisper models are not safe to share between
+    concurrent transcriptions, so each replica serves one caller at a time.
+    Copies held by segment worker processes (see ``process_allowance``) count
+    against the same budget.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        replicas: int,
+        memory_budget_bytes: int | None,
+        loader: Callable[[str], Any] | None = None,
+        sizer: Callable[[Any], int | None] | None = None,
+    ) -> None:
+        self.model_name = model_name
+        self.replicas = max(1, replicas)
+        self.memory_budget_bytes = memory_budget_bytes
+        self._loader = loader or _load_model
+        self._sizer = sizer or _model_bytes
+        self._condition = threading.Condition()
+        self._idle: list[Any] = []
+        self._loaded = 0
+        self._loading = 0
+        self._in_use = 0
+        self._process_copies = 0
+        self._model_bytes: int | None = None
+        self._state: WhisperState = "idle"
+        self._error: str | None = None
+
+    def warm_up(self) -> None:
+        """Load replicas up to the target and memory budget; blocks while loading."""
+        with self._condition:
+            self._state = "loading"
+        try:
+            while self._reserve_replica():
+                self._load_replica(lend=False)
+        except Exception as exc:
+            logger.exception("Preloading Whisper model '%s' failed.", self.model_name)
+            with self._condition:
+                self._state = "failed"
+                self._error = str(exc) or type(exc).__name__
+                # Callers in ``acquire`` wait while loading; let them load lazily instead.
+                self._condition.notify_all()
+            return
+        with self._condition:
+            self._state = "ready"
+            self._condition.notify_all()
+
+    @contextmanager
+    def acquire(self, timeout: float | None = None) -> Iterator[Any]:
+        """Lend a replica for one transcription; raises ``TimeoutError`` after ``timeout``."""
+        model = None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while not self._idle:
+                if self._state != "loading" and self._can_grow_locked():
+                    self._loading += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No Whisper '{self.model_name}' replica became free.")
+                self._condition.wait(remaining)
+            else:
+                model = self._idle.pop()
+                self._in_use += 1
+        if model is None:
+            model = self._load_replica(lend=True)
+        try:
+            yield model
+        finally:
+            with self._condition:
+                self._in_use -= 1
+                self._idle.append(model)
+                self._condition.notify()
+
+    def process_allowance(self, requested: int) -> int:
+        """How many segment worker processes, each loading its own model, fit the budget.
+
+        Returns 1 (transcribe in-process) until a replica has been measured. The
+        first allowance above 1 is reserved: those workers keep their models, so
+        later calls get the same count and replicas grow only into what is left.
+        """
+        with self._condition:
+            if self._process_copies:
+                return self._process_copies
+            if not self.memory_budget_bytes:
+                allowed = requested
+            elif self._model_bytes is None:
+                return 1
+            else:
+                spare = self.memory_budget_bytes - self._loaded * self._model_bytes
+                allowed = max(1, min(requested, spare // self._model_bytes))
+            if allowed > 1:
+                self._process_copies = allowed
+            return allowed
+
+    def snapshot(self) -> WhisperPoolSnapshot:
+        with self._condition:
+            return WhisperPoolSnapshot(
+                model=self.model_name,
+                state=self._state,
+                ready=self._state == "ready" or bool(self._loaded),
+                replicas_target=self.replicas,
+                replicas_loaded=self._loaded,
+                replicas_in_use=self._in_use,
+                model_memory_mb=_megabytes(self._model_bytes),
+                memory_budget_mb=_megabytes(self.memory_budget_bytes),
+                error=self._error,
+            )
+
+    def _reserve_replica(self) -> bool:
+        with self._condition:
+            if not self._can_grow_locked():
+                return False
+            self._loading += 1
+            return True
+
+    def _can_grow_locked(self) -> bool:
+        total = self._loaded + self._loading
+        if total >= self.replicas:
+            return False
+        if total == 0:
+            # One replica is always allowed; without it nothing can be transcribed.
+            return True
+        if not self.memory_budget_bytes:
+            return True
+        if self._model_bytes is None:
+            # Wait for the first replica to be measured before adding more.
+            return False
+        copies = total + 1 + self._process_copies
+        return copies * self._model_bytes <= self.memory_budget_bytes
+
+    def _load_replica(self, *, lend: bool) -> Any:
+        try:
+            model = self._loader(self.model_name)
+            size = self._sizer(model)
+        except BaseException:
+            with self._condition:
+                self._loading -= 1
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._loading -= 1
+            self._loaded += 1
+            if self._model_bytes is None and size is not None:
+                self._model_bytes = size
+                if self.memory_budget_bytes and size > self.memory_budget_bytes:
+                    logger.warning(
+                        "Whisper model '%s' needs %.0f MB, above the %.0f MB budget.",
+                        self.model_name,
+                        size / 2**20,
+                        self.memory_budget_bytes / 2**20,
+                    )
+            if lend:
+                self._in_use += 1
+            else:
+                self._idle.append(model)
+            self._condition.notify_all()
+        return model
+
+
+def _load_model(model_name: str):
+    import whisper  # type: ignore
+
+    return whisper.load_model(model_name)
+
+
+def _model_bytes(model) -> int | None:
+    """Bytes held by a torch model's parameters and buffers, if it exposes them."""
+    try:
+        tensors = [*model.parameters(), *model.buffers()]
+    except AttributeError:
+        return None
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def _megabytes(size: int | None) -> float | None:
+    return round(size / 2**20, 1) if size is not None else None
+
+
+def memory_budget_bytes() -> int | None:
+    """Configured Whisper memory budget, defaulting to half of physical memory."""
+    budget_mb = get_settings().whisper_memory_budget_mb
+    if budget_mb > 0:
+        return budget_mb * 2**20
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def whisper_available() -> bool:
+    try:
+        import whisper  # noqa: F401
+    except ModuleNotFoundError:
+        return False
+    return True
+
+
+_POOLS: dict[str, WhisperModelPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_whisper_pool(model_name: str) -> WhisperModelPool:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(model_name)
+        if pool is None:
+            pool = WhisperModelPool(
+                model_name,
+                replicas=get_settings().whisper_replicas,
+                memory_budget_bytes=memory_budget_bytes(),
+            )
+            _POOLS[model_name] = pool
+    return pool
+
+
+def start_whisper_warmup() -> threading.Thread | None:
+    """Preload the configured local Whisper model in the background, if it will be used."""
+    settings = get_settings()
+    if (
+        settings.whisper_replicas <= 0
+        or settings.transcription_provider.lower() not in {"local", "auto"}
+        or not whisper_available()
+    ):
+        return None
+    pool = get_whisper_pool(settings.whisper_local_model)
+    thread = threading.Thread(target=pool.warm_up, name="whisper-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def whisper_status() -> WhisperPoolSnapshot:
+    settings = get_settings()
+    model_name = settings.whisper_local_model
+    with _POOLS_LOCK:
+        pool = _POOLS.get(model_name)
+    if pool is not None:
+        return pool.snapshot()
+    available = whisper_available() and settings.transcription_provider.lower() in {
+        "local",
+        "auto",
+    }
+    return WhisperPoolSnapshot(
+        model=model_name,
+        state="idle" if available else "unavailable",
+        ready=False,
+        replicas_target=max(0, settings.whisper_replicas),
+        replicas_loaded=0,
+        replicas_in_use=0,
+        model_memory_mb=None,
+        memory_budget_mb=_megabytes(memory_budget_bytes()),
+        error=None,
+    )
+
+
+def clear_whisper_pools() -> None:
+    with _POOLS_LOCK:
+        _POOLS.clear()
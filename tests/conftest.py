@@ -4,8 +4,13 @@ from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
 
+from src.core.llm.breaker import clear_circuit_breakers
 from src.core.settings import clear_settings_cache
-from src.db.engine import init_db
+from src.db.engine import close_connections, init_db
+from src.services.embedding_cache import clear_embedding_caches
+from src.services.reflection_cache import clear_reflection_caches
+from src.services.transcription_cache import clear_transcription_caches
+from src.services.vector_index import clear_vector_indexes
 
 
 @pytest.fixture(autouse=True)
@@ -21,6 +26,12 @@ def isolated_db(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Non
     clear_settings_cache()
     init_db()
     yield
+    clear_vector_indexes()
+    clear_embedding_caches()
+    clear_reflection_caches()
+    clear_transcription_caches()
+    clear_circuit_breakers()
+    close_connections()
     clear_settings_cache()
 
 
@@ -0,0 +1,31 @@
+import json
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_echo_stream_emits_tokens_fields_reflection_and_meta(client) -> None:
+    transcript = "I keep postponing the quarterly review because the metrics are unclear."
+    with client.stream("POST", "/echo/stream", json={"transcript": transcript}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(response.read().decode("utf-8"))
+
+    names = [name for name, _ in events]
+    assert names[0] == "token" and names[-2:] == ["reflection", "meta"]
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    reflection = events[-2][1]
+    assert json.loads(tokens) == reflection
+
+    fields = {data["name"]: data["value"] for name, data in events if name == "field"}
+    assert fields == reflection
+    assert names.index("field") < names.index("reflection")
+
+    meta = events[-1][1]
+    assert meta["request_id"] == response.headers["X-Request-Id"]
+    assert meta["cost"]["prompt_tokens"] > 0
@@ -20,3 +20,6 @@ def test_health(client) -> None:
     assert payload["data"]["status"] == "healthy"
     assert "request_id" in payload["meta"]
     assert response.headers.get("X-Request-Id") == payload["meta"]["request_id"]
+    whisper = payload["data"]["whisper"]
+    assert whisper["state"] in {"unavailable", "idle", "loading", "ready", "failed"}
+    assert whisper["model"]
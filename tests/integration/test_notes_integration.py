@@ -1,4 +1,21 @@
+import asyncio
 import importlib.util
+import threading
+
+import pytest
+
+from src.core.settings import clear_settings_cache
+from src.db.engine import get_connection
+from src.schemas.notes import CreateNoteRequest
+from src.services import notes
+from src.services.embeddings import LocalHashEmbeddingProvider, aembed_texts
+from src.services.idempotency import (
+    claim_idempotency_key,
+    poll_idempotency_key,
+    purge_expired_idempotency_keys,
+    request_fingerprint,
+)
+from src.services.reflection import areflect_transcript
 
 
 def test_record_reflect_save_fetch_flow(client) -> None:
@@ -62,3 +79,197 @@ def test_record_reflect_save_fetch_flow(client) -> None:
     ids = [note["id"] for note in notes]
     assert note1_id in ids
     assert note2_id in ids
+
+
+def test_search_notes_ranks_semantically_related_notes(client) -> None:
+    transcripts = [
+        "Database migration failed during deployment and caused API downtime.",
+        "I cooked pasta for dinner and listened to a jazz album.",
+        "We should plan the weekend hiking trip with the family.",
+    ]
+    note_ids = []
+    for transcript in transcripts:
+        response = client.post("/notes", json={"transcript": transcript})
+        assert response.status_code == 200
+        note_ids.append(response.json()["data"]["id"])
+
+    response = client.get(
+        "/notes/search", params={"q": "API downtime after a database migration", "k": 2}
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    results = payload["data"]["results"]
+    assert len(results) == 2
+    assert results[0]["note"]["id"] == note_ids[0]
+    assert results[0]["score"] >= results[1]["score"]
+    assert payload["meta"]["cost"]["prompt_tokens"] > 0
+
+    # Notes sharing nothing with the query score 0.0 and are not returned.
+    unrelated = client.get("/notes/search", params={"q": "quarterly xylophone invoices"})
+    assert unrelated.status_code == 200
+    assert unrelated.json()["data"]["results"] == []
+
+    assert client.get("/notes/search", params={"q": "   "}).status_code == 400
+
+
+def test_note_pipeline_reflects_and_embeds_in_parallel(monkeypatch) -> None:
+    both_started = asyncio.Barrier(2)
+
+    # Each stage only proceeds once the other has started too.
+    async def slow_reflect(transcript: str):
+        await asyncio.wait_for(both_started.wait(), timeout=5)
+        return await areflect_transcript(transcript)
+
+    async def slow_embed(texts: list[str]):
+        await asyncio.wait_for(both_started.wait(), timeout=5)
+        return await aembed_texts(texts)
+
+    monkeypatch.setattr(notes, "areflect_transcript", slow_reflect)
+    monkeypatch.setattr(notes, "aembed_texts", slow_embed)
+
+    note = asyncio.run(
+        notes.acreate_note(CreateNoteRequest(transcript="Parallel stages should overlap."))
+    )
+    assert note.reflection.summary
+    assert notes.get_note(note.id) is not None
+
+
+def test_idempotency_key_replays_the_stored_note(client) -> None:
+    body = {"transcript": "Retrying this upload from a flaky train connection."}
+    headers = {"Idempotency-Key": "note-retry-1"}
+
+    first = client.post("/notes", json=body, headers=headers)
+    second = client.post("/notes", json=body, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert first.json()["data"]["id"] == second.json()["data"]["id"]
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json()["meta"]["cache_hits"] == ["idempotency"]
+    assert second.json()["meta"]["cost"]["prompt_tokens"] == 0
+    assert len(client.get("/notes").json()["data"]["notes"]) == 1
+
+    reused = client.post("/notes", json={"transcript": "Something else."}, headers=headers)
+    assert reused.status_code == 422
+
+
+def test_concurrent_idempotent_duplicate_waits_for_the_first_request(monkeypatch) -> None:
+    reflections = []
+    duplicate_waiting = threading.Event()
+
+    claims: list[str] = []
+
+    def counted_claim(key: str, request_sha256: str):
+        claims.append(key)
+        return claim_idempotency_key(key, request_sha256)
+
+    def observed_poll(key: str, request_sha256: str):
+        duplicate_waiting.set()
+        return poll_idempotency_key(key, request_sha256)
+
+    async def slow_reflect(transcript: str):
+        reflections.append(transcript)
+        # Finish only after the duplicate has found the key still in progress.
+        assert await asyncio.to_thread(duplicate_waiting.wait, 5)
+        return await areflect_transcript(transcript)
+
+    monkeypatch.setattr(notes, "claim_idempotency_key", counted_claim)
+    monkeypatch.setattr(notes, "poll_idempotency_key", observed_poll)
+    monkeypatch.setattr(notes, "areflect_transcript", slow_reflect)
+    payload = CreateNoteRequest(transcript="Double-submitted from the web app.")
+
+    async def main():
+        return await asyncio.gather(
+            notes.acreate_note_idempotent(payload, "double-submit"),
+            notes.acreate_note_idempotent(payload, "double-submit"),
+        )
+
+    (first, first_replayed), (second, second_replayed) = asyncio.run(main())
+    assert first.id == second.id
+    assert sorted([first_replayed, second_replayed]) == [False, True]
+    assert len(reflections) == 1
+    # The duplicate waited with read-only polls instead of re-claiming the key.
+    assert claims == ["double-submit", "double-submit"]
+
+
+def test_abandoned_idempotency_claims_are_taken_over_and_expired_keys_purged() -> None:
+    note = asyncio.run(notes.acreate_note(CreateNoteRequest(transcript="Saved long ago.")))
+    connection = get_connection()
+    with connection:
+        connection.executemany(
+            """
+            INSERT INTO idempotency_keys (idempotency_key, request_sha256, note_id, created_at)
+            VALUES (?, 'body', ?, datetime('now', '-3 days'))
+            """,
+            [("abandoned", None), ("expired", note.id), ("other-expired", note.id)],
+        )
+
+    assert poll_idempotency_key("abandoned", "body").owned
+    assert purge_expired_idempotency_keys() == 2
+    keys = [row[0] for row in connection.execute("SELECT idempotency_key FROM idempotency_keys")]
+    assert keys == ["abandoned"]
+
+
+def test_cancelled_idempotent_request_releases_its_key(monkeypatch) -> None:
+    payload = CreateNoteRequest(transcript="Closed the tab while this was saving.")
+
+    async def main() -> None:
+        started = asyncio.Event()
+
+        async def stalled_create(payload: CreateNoteRequest):
+            started.set()
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(notes, "acreate_note", stalled_create)
+        task = asyncio.create_task(notes.acreate_note_idempotent(payload, "cancelled"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    claim = claim_idempotency_key("cancelled", request_fingerprint(payload.model_dump_json()))
+    assert claim.owned
+
+
+def test_long_note_is_embedded_in_chunks_and_found_by_any_passage(client, monkeypatch) -> None:
+    batches: list[int] = []
+    embed_batch = LocalHashEmbeddingProvider.embed_batch
+
+    def counting_embed_batch(self, *, texts, model, timeout=None):
+        batches.append(len(texts))
+        return embed_batch(self, texts=texts, model=model, timeout=timeout)
+
+    monkeypatch.setattr(LocalHashEmbeddingProvider, "embed_batch", counting_embed_batch)
+    monkeypatch.setenv("ECHO_NOTES_CHUNK_MAX_TOKENS", "24")
+    monkeypatch.setenv("ECHO_NOTES_CHUNK_OVERLAP_TOKENS", "8")
+    clear_settings_cache()
+
+    filler = " ".join(f"Grocery list item {index} is oat milk and bread." for index in range(8))
+    long_transcript = f"{filler} Finally the database migration caused API downtime."
+    long_id = client.post("/notes", json={"transcript": long_transcript}).json()["data"]["id"]
+    client.post("/notes", json={"transcript": "We should plan the weekend hiking trip."})
+
+    chunk_count = (
+        get_connection()
+        .execute("SELECT COUNT(*) FROM note_chunks WHERE note_id = ?", (long_id,))
+        .fetchone()[0]
+    )
+    assert chunk_count > 1
+    assert batches[0] == chunk_count
+
+    for aggregation in ("max", "mean"):
+        monkeypatch.setenv("ECHO_NOTES_CHUNK_AGGREGATION", aggregation)
+        clear_settings_cache()
+        response = client.get(
+            "/notes/search", params={"q": "API downtime after a database migration", "k": 2}
+        )
+        results = response.json()["data"]["results"]
+        # The hiking note shares no terms with the query, so it does not score above 0.
+        assert [result["note"]["id"] for result in results] == [long_id]
+
+
+def test_punctuation_only_note_is_saved(client) -> None:
+    response = client.post("/notes", json={"transcript": "?!"})
+    assert response.status_code == 200
+    note_id = response.json()["data"]["id"]
+    assert client.get(f"/notes/{note_id}").status_code == 200
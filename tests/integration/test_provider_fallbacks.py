@@ -1,5 +1,8 @@
 import importlib.util
 
+import pytest
+
+from src.core.llm.providers import LocalHeuristicLLMProvider, OpenAILLMProvider
 from src.core.settings import clear_settings_cache
 
 
@@ -52,3 +55,89 @@ def test_audio_openai_transcription_without_key_returns_warning(client, monkeypa
     else:
         assert payload["data"]["metadata"]["model"] == "whisper-unavailable"
         assert any("OpenAI Whisper provider is unavailable" in warning for warning in warnings)
+
+
+def test_open_llm_circuit_skips_provider_and_reports_status(client, monkeypatch) -> None:
+    monkeypatch.setenv("ECHO_NOTES_LLM_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("ECHO_NOTES_BREAKER_MIN_CALLS", "2")
+    clear_settings_cache()
+
+    calls = []
+
+    async def failing_agenerate(self, *, model: str, prompt: str, transcript: str, timeout=None):
+        calls.append(transcript)
+        raise ConnectionError("provider is down")
+
+    monkeypatch.setattr(OpenAILLMProvider, "agenerate", failing_agenerate)
+
+    for attempt in range(3):
+        response = client.post("/echo", json={"transcript": f"Attempt {attempt} at the plan."})
+        assert response.status_code == 200
+    assert len(calls) == 2
+    warnings = response.json()["meta"]["warnings"]
+    assert any("circuit is open" in warning for warning in warnings)
+
+    status = client.get("/health/providers").json()["data"]["providers"]
+    breaker = next(item for item in status if item["name"] == OpenAILLMProvider.name)
+    assert breaker["state"] == "open"
+    assert breaker["error_rate"] == 1.0
+    assert breaker["retry_after_seconds"] > 0
+
+
+def test_deadline_header_bounds_provider_calls(client, monkeypatch) -> None:
+    monkeypatch.setenv("ECHO_NOTES_LLM_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    clear_settings_cache()
+
+    timeouts = []
+
+    async def recording_agenerate(self, *, model: str, prompt: str, transcript: str, timeout=None):
+        timeouts.append(timeout)
+        return LocalHeuristicLLMProvider().generate(
+            model=model, prompt=prompt, transcript=transcript
+        )
+
+    monkeypatch.setattr(OpenAILLMProvider, "agenerate", recording_agenerate)
+
+    response = client.post(
+        "/echo",
+        json={"transcript": "The budget review needs a clearer owner."},
+        headers={"X-Deadline-Ms": "5000"},
+    )
+    assert response.status_code == 200
+    assert len(timeouts) == 1 and 4.0 < timeouts[0] <= 5.0
+
+    response = client.post(
+        "/echo",
+        json={"transcript": "The release checklist needs a clearer owner."},
+        headers={"X-Deadline-Ms": "1"},
+    )
+    assert response.status_code == 200
+    assert len(timeouts) == 1
+    warnings = response.json()["meta"]["warnings"]
+    assert any("deadline is nearly exhausted" in warning for warning in warnings)
+
+    # Unusable header values fall back to the configured 30s default.
+    for header in ("0", "-5", "nan", "inf"):
+        response = client.post(
+            "/echo",
+            json={"transcript": f"The {header} header should not lift the deadline."},
+            headers={"X-Deadline-Ms": header},
+        )
+        assert response.status_code == 200
+        assert timeouts[-1] is not None and 29.0 < timeouts[-1] <= 30.0
+    assert len(timeouts) == 5
+
+
+def test_oversized_audio_upload_is_rejected(client, monkeypatch) -> None:
+    if importlib.util.find_spec("multipart") is None:
+        pytest.skip("python-multipart is not installed")
+    monkeypatch.setenv("ECHO_NOTES_UPLOAD_MAX_BYTES", "16")
+    clear_settings_cache()
+
+    response = client.post(
+        "/audio/transcribe",
+        files={"file": ("voice.wav", b"fake-audio-data-over-the-limit", "audio/wav")},
+    )
+    assert response.status_code == 413
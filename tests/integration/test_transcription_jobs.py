@@ -0,0 +1,185 @@
+import importlib.util
+import io
+import json
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from src.core.settings import clear_settings_cache, get_settings
+from src.db.engine import get_connection
+from src.schemas.transcript import TranscriptionJob
+from src.services import transcription_jobs
+from src.services.transcription_jobs import (
+    _deliver_callback,
+    get_transcription_job,
+    heartbeat_running_jobs,
+    jobs_directory,
+    requeue_stale_jobs,
+    run_next_transcription_job,
+    submit_transcription_job,
+)
+
+pytestmark = pytest.mark.skipif(
+    importlib.util.find_spec("multipart") is None, reason="python-multipart is not installed"
+)
+
+
+def test_transcription_job_is_queued_processed_and_posted_to_callback(client, monkeypatch) -> None:
+    monkeypatch.setenv("ECHO_NOTES_TRANSCRIPTION_CALLBACK_ALLOWED_HOSTS", "127.0.0.1")
+    clear_settings_cache()
+    received: list[dict] = []
+    delivered = threading.Event()
+
+    class CallbackHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append(json.loads(body))
+            self.send_response(204)
+            self.end_headers()
+            delivered.set()
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), CallbackHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        response = client.post(
+            "/audio/jobs",
+            files={"file": ("memo.txt", b"Queue this memo for later.", "text/plain")},
+            data={"callback_url": f"http://127.0.0.1:{server.server_port}/done"},
+        )
+        assert response.status_code == 202
+        job_id = response.json()["data"]["id"]
+        assert response.json()["data"]["status"] in {"queued", "running", "done"}
+
+        # The callback is posted after the job row is finalized.
+        assert delivered.wait(5)
+        assert received[0]["id"] == job_id and received[0]["status"] == "done"
+        job = client.get(f"/audio/jobs/{job_id}").json()["data"]
+        assert job["status"] == "done"
+        assert job["transcript"]["text"] == "Queue this memo for later."
+        assert job["started_at"] and job["finished_at"]
+    finally:
+        server.shutdown()
+
+
+def test_transcription_job_rejects_bad_callbacks_and_unknown_ids(client) -> None:
+    response = client.post(
+        "/audio/jobs",
+        files={"file": ("memo.txt", b"hello", "text/plain")},
+        data={"callback_url": "file:///etc/passwd"},
+    )
+    assert response.status_code == 400
+    for private_url in (
+        "http://127.0.0.1:8000/done",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://10.0.0.5/hook",
+        "http://[::1]/hook",
+    ):
+        response = client.post(
+            "/audio/jobs",
+            files={"file": ("memo.txt", b"hello", "text/plain")},
+            data={"callback_url": private_url},
+        )
+        assert response.status_code == 400, private_url
+    assert client.get("/audio/jobs/missing").status_code == 404
+
+
+def _audio_upload() -> UploadFile:
+    return UploadFile(
+        io.BytesIO(b"RIFF\x24\x00\x00\x00WAVEfmt fake-audio-data"),
+        filename="voice.wav",
+        headers=Headers({"content-type": "audio/wav"}),
+    )
+
+
+def test_job_fails_when_no_provider_can_transcribe_it(monkeypatch) -> None:
+    monkeypatch.setenv("ECHO_NOTES_TRANSCRIPTION_PROVIDER", "openai")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    clear_settings_cache()
+
+    job = submit_transcription_job(_audio_upload(), callback_url=None)
+    assert run_next_transcription_job()
+
+    job = get_transcription_job(job.id)
+    assert job.status == "failed"
+    assert job.transcript is None and job.error
+    assert any("OpenAI Whisper provider is unavailable" in warning for warning in job.warnings)
+
+
+def test_spooled_audio_is_removed_when_the_job_cannot_be_recorded(monkeypatch) -> None:
+    class FailingConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info) -> None:
+            pass
+
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(transcription_jobs, "get_connection", FailingConnection)
+
+    with pytest.raises(sqlite3.OperationalError):
+        submit_transcription_job(_audio_upload(), callback_url=None)
+    assert list(jobs_directory(get_settings().database_path).iterdir()) == []
+
+
+def test_jobs_whose_lease_lapsed_are_requeued_and_live_ones_kept(monkeypatch) -> None:
+    connection = get_connection()
+    with connection:
+        for job_id in ("orphaned", "live"):
+            connection.execute(
+                """
+                INSERT INTO transcription_jobs (
+                  id, status, filename, content_type, audio_path, audio_sha256,
+                  size_bytes, started_at, heartbeat_at
+                ) VALUES (?, 'running', 'memo.wav', '', '/tmp/memo.wav', '', 0, ?, ?)
+                """,
+                (job_id, "2020-01-01T00:00:00+00:00", "2020-01-01T00:00:00+00:00"),
+            )
+    monkeypatch.setattr(transcription_jobs, "_RUNNING_JOBS", {"live"})
+
+    heartbeat_running_jobs()
+    assert requeue_stale_jobs() == 1
+    statuses = dict(connection.execute("SELECT id, status FROM transcription_jobs").fetchall())
+    assert statuses == {"orphaned": "queued", "live": "running"}
+
+
+def test_callback_redirects_are_not_followed(monkeypatch) -> None:
+    paths: list[str] = []
+
+    class RedirectingHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            paths.append(self.path)
+            self.send_response(303)
+            self.send_header("Location", "/elsewhere")
+            self.end_headers()
+
+        do_GET = do_POST
+
+        def log_message(self, *args) -> None:
+            pass
+
+    monkeypatch.setenv("ECHO_NOTES_TRANSCRIPTION_CALLBACK_ALLOWED_HOSTS", "127.0.0.1")
+    clear_settings_cache()
+    server = HTTPServer(("127.0.0.1", 0), RedirectingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        job = TranscriptionJob(
+            id="redirected",
+            status="done",
+            filename="memo.wav",
+            size_bytes=0,
+            audio_sha256="",
+            created_at="2024-01-01T00:00:00+00:00",
+        )
+        _deliver_callback(f"http://127.0.0.1:{server.server_port}/done", job)
+    finally:
+        server.shutdown()
+    assert paths == ["/done"]
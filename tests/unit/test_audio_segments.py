@@ -0,0 +1,72 @@
+import math
+from itertools import pairwise
+
+import pytest
+
+from src.schemas.transcript import TranscriptSegment
+from src.services.audio_segments import AudioWindow, plan_windows, stitch_segments
+
+np = pytest.importorskip("numpy")
+
+
+def _speech_with_pauses(sample_rate: int, pauses_at: list[float], total_seconds: float):
+    rng = np.random.default_rng(7)
+    samples = rng.uniform(-0.5, 0.5, int(total_seconds * sample_rate)).astype(np.float32)
+    for pause in pauses_at:
+        start = int((pause - 0.25) * sample_rate)
+        samples[start : start + int(0.5 * sample_rate)] = 0.0
+    return samples
+
+
+def test_windows_are_cut_at_pauses_and_overlap() -> None:
+    sample_rate = 1000
+    samples = _speech_with_pauses(sample_rate, pauses_at=[11.0, 19.0], total_seconds=30)
+
+    windows = plan_windows(
+        samples, target_seconds=10, overlap_seconds=1, search_seconds=3, sample_rate=sample_rate
+    )
+
+    assert len(windows) == 3
+    cuts = [window.keep_end for window in windows[:-1]]
+    assert cuts[0] == pytest.approx(11.0, abs=0.2)
+    assert cuts[1] == pytest.approx(19.0, abs=0.2)
+    assert windows[0].start == 0 and windows[-1].end == len(samples)
+    assert windows[-1].keep_end == math.inf
+    for previous, current in pairwise(windows):
+        assert current.start < previous.end
+        assert current.keep_start == previous.keep_end
+
+    short = plan_windows(samples[:12_000], target_seconds=10, overlap_seconds=1)
+    assert len(short) == 1
+
+
+def test_stitching_drops_segments_repeated_in_the_overlap() -> None:
+    first = AudioWindow(start=0, end=12_000, keep_start=0.0, keep_end=10.0)
+    second = AudioWindow(start=9_000, end=20_000, keep_start=10.0, keep_end=math.inf)
+    segments = stitch_segments(
+        [
+            (
+                first,
+                [
+                    TranscriptSegment(start=0.0, end=4.0, text="Hello there."),
+                    TranscriptSegment(start=8.5, end=11.0, text="Crossing the cut."),
+                    TranscriptSegment(start=10.5, end=11.8, text="Trailing context."),
+                ],
+            ),
+            (
+                second,
+                [
+                    TranscriptSegment(start=9.0, end=10.5, text="Leading context."),
+                    TranscriptSegment(start=10.5, end=11.8, text="Trailing context."),
+                    TranscriptSegment(start=12.0, end=15.0, text="The end."),
+                ],
+            ),
+        ]
+    )
+
+    assert [segment.text for segment in segments] == [
+        "Hello there.",
+        "Crossing the cut.",
+        "Trailing context.",
+        "The end.",
+    ]
@@ -0,0 +1,38 @@
+from itertools import pairwise
+
+from src.core.llm.tokens import count_tokens
+from src.services.chunking import chunk_transcript
+
+
+def test_chunks_are_overlapping_sentence_windows_with_source_offsets() -> None:
+    transcript = " ".join(
+        f"Sentence {index} talks about the quarterly planning review." for index in range(10)
+    )
+    chunks = chunk_transcript(transcript, max_tokens=40, overlap_tokens=16)
+
+    assert len(chunks) > 1
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        assert count_tokens(chunk.text) <= 40
+        assert transcript[chunk.start_char : chunk.end_char] == chunk.text
+        assert chunk.text.startswith("Sentence") and chunk.text.endswith(".")
+    for previous, current in pairwise(chunks):
+        assert previous.start_char < current.start_char < previous.end_char
+    assert chunks[0].start_char == 0 and chunks[-1].end_char == len(transcript)
+
+
+def test_short_transcript_is_one_chunk_and_long_sentences_split_between_words() -> None:
+    assert [
+        chunk.text
+        for chunk in chunk_transcript("Just one thought.", max_tokens=30, overlap_tokens=5)
+    ] == ["Just one thought."]
+
+    run_on = " ".join(["word"] * 100)
+    chunks = chunk_transcript(run_on, max_tokens=20, overlap_tokens=0)
+    assert len(chunks) > 1
+    assert " ".join(chunk.text for chunk in chunks) == run_on
+
+
+def test_transcript_without_sentence_text_is_one_chunk() -> None:
+    chunks = chunk_transcript(" ... ", max_tokens=20, overlap_tokens=4)
+    assert [(chunk.text, chunk.start_char, chunk.end_char) for chunk in chunks] == [("...", 1, 4)]
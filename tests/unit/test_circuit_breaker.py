@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from src.core.llm.breaker import CircuitBreaker
+from src.core.request_context import RequestMeta, set_request_meta
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock: FakeClock, **overrides) -> CircuitBreaker:
+    options = {
+        "window_size": 10,
+        "min_calls": 4,
+        "error_rate_threshold": 0.5,
+        "p95_latency_ms": 1000.0,
+        "cooldown_seconds": 30.0,
+    }
+    options.update(overrides)
+    return CircuitBreaker("test", clock=clock, **options)
+
+
+def test_breaker_opens_on_errors_and_recovers_through_half_open_probe() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for ok in (True, False, True, False):
+        breaker.record_success(0.01) if ok else breaker.record_failure(0.01)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 31.0
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure(0.01)
+    assert breaker.state == "open"
+
+    clock.now = 62.0
+    assert breaker.allow()
+    breaker.record_success(0.01)
+    assert breaker.state == "closed"
+    assert breaker.snapshot().calls == 1  # the window restarts with the probe
+
+
+def test_breaker_opens_on_slow_p95_only_when_latency_is_tracked() -> None:
+    clock = FakeClock()
+    latency_aware = _breaker(clock)
+    latency_blind = _breaker(clock, p95_latency_ms=None)
+    for breaker in (latency_aware, latency_blind):
+        for _ in range(4):
+            breaker.record_success(2.0)
+
+    assert latency_aware.state == "open"
+    assert latency_aware.snapshot().p95_latency_ms == 2000.0
+    assert latency_blind.state == "closed"
+
+
+def test_breaker_replaces_a_probe_that_never_reports_back() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record_failure(0.01)
+
+    clock.now = 30.0
+    assert breaker.allow()
+    clock.now = 45.0
+    assert not breaker.allow()
+    clock.now = 60.0
+    assert breaker.allow()
+
+
+def test_breaker_ignores_failures_caused_by_the_callers_own_deadline() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock, min_calls=1)
+    set_request_meta(RequestMeta(request_id="out-of-budget", deadline=time.monotonic() - 1))
+    with pytest.raises(TimeoutError), breaker.track():
+        raise TimeoutError("request budget spent")
+    assert breaker.state == "closed"
+    assert breaker.snapshot().calls == 0
+
+    set_request_meta(RequestMeta(request_id="within-budget"))
+    with pytest.raises(TimeoutError), breaker.track():
+        raise TimeoutError("provider timed out")
+    assert breaker.state == "open"
@@ -0,0 +1,88 @@
+import json
+import sqlite3
+import threading
+
+from src.core.request_context import RequestMeta, set_deadline, set_request_meta
+from src.core.settings import clear_settings_cache
+from src.db import engine
+from src.db.engine import backfill_legacy_rows, close_connections, get_connection, init_db
+from src.db.vectors import unpack_embedding
+
+
+def test_connections_are_reused_per_thread_and_configured_for_wal() -> None:
+    connection = get_connection()
+    assert get_connection() is connection
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    other_thread_connections = []
+    worker = threading.Thread(target=lambda: other_thread_connections.append(get_connection()))
+    worker.start()
+    worker.join()
+    assert other_thread_connections[0] is not connection
+
+    close_connections()
+    assert get_connection() is not connection
+
+
+def test_legacy_json_embeddings_are_backfilled_after_init_db(monkeypatch, tmp_path) -> None:
+    db_path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute(
+        """
+        CREATE TABLE notes (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          audio_reference TEXT,
+          transcript_text TEXT NOT NULL,
+          reflection_json TEXT,
+          embedding_json TEXT NOT NULL,
+          created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    legacy.executemany(
+        "INSERT INTO notes (transcript_text, embedding_json) VALUES (?, ?)",
+        [(f"note {index}", json.dumps([index, 0.5, -0.25])) for index in range(7)],
+    )
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setenv("ECHO_NOTES_DB_PATH", str(db_path))
+    monkeypatch.setattr(engine, "EMBEDDING_BACKFILL_BATCH_SIZE", 3)
+    clear_settings_cache()
+    init_db()
+    connection = get_connection()
+    # Startup only migrates the schema; rows are converted by the background backfill.
+    pending = connection.execute("SELECT COUNT(*) FROM notes WHERE embedding_blob IS NULL")
+    assert pending.fetchone()[0] == 7
+    backfill_legacy_rows()
+
+    rows = (
+        get_connection()
+        .execute("SELECT id, embedding_json, embedding_blob, embedding_dim FROM notes ORDER BY id")
+        .fetchall()
+    )
+    assert len(rows) == 7
+    for index, row in enumerate(rows):
+        assert row["embedding_json"] == ""
+        assert row["embedding_dim"] == 3
+        assert list(unpack_embedding(row["embedding_blob"])) == [float(index), 0.5, -0.25]
+    assert connection.execute("SELECT COUNT(*) FROM note_chunks").fetchone()[0] == 7
+
+
+def test_busy_timeout_is_capped_by_the_request_deadline() -> None:
+    set_request_meta(RequestMeta(request_id="unbounded"))
+    connection = get_connection()
+    assert connection.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    set_request_meta(RequestMeta(request_id="bounded"))
+    set_deadline(800)
+    assert 500 <= get_connection().execute("PRAGMA busy_timeout").fetchone()[0] <= 800
+
+    set_request_meta(RequestMeta(request_id="exhausted"))
+    set_deadline(1)
+    assert get_connection().execute("PRAGMA busy_timeout").fetchone()[0] == 500
+
+    set_request_meta(RequestMeta(request_id="unbounded-again"))
+    assert get_connection().execute("PRAGMA busy_timeout").fetchone()[0] == 5000
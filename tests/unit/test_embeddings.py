@@ -1,4 +1,33 @@
-from src.services.embeddings import cosine_similarity, generate_embedding
+import asyncio
+import itertools
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.request_context import RequestMeta, get_request_meta, set_request_meta
+from src.db.engine import get_connection
+from src.services import embedding_cache, embeddings
+from src.services.embedding_cache import (
+    EmbeddingCache,
+    clear_embedding_caches,
+    get_embedding_cache,
+)
+from src.services.embeddings import (
+    CoalescingEmbeddingProvider,
+    EmbeddingResult,
+    LocalHashEmbeddingProvider,
+    aembed_text,
+    cosine_similarity,
+    cosine_similarity_many,
+    embed_text,
+    embed_texts,
+    generate_embedding,
+    mean_vector,
+    top_k_similar,
+)
 
 
 def test_embedding_similarity_prefers_related_text() -> None:
@@ -13,3 +42,219 @@ def test_embedding_similarity_prefers_related_text() -> None:
     sim_related = cosine_similarity(emb_a, emb_b)
     sim_unrelated = cosine_similarity(emb_a, emb_c)
     assert sim_related > sim_unrelated
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_top_k_similar_matches_pairwise_cosine(monkeypatch, use_numpy: bool) -> None:
+    if use_numpy and embeddings.np is None:
+        pytest.skip("numpy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(embeddings, "np", None)
+
+    query = [1.0, 2.0, 0.0]
+    matrix = [[1.0, 2.0, 0.1], [0.0, 0.0, 1.0], [2.0, 4.0, 0.0], [0.0, 0.0, 0.0]]
+    norms = [math.sqrt(sum(value * value for value in row)) for row in matrix]
+
+    scores = cosine_similarity_many(query, matrix, norms=norms)
+    for score, row in zip(scores, matrix, strict=True):
+        assert score == pytest.approx(cosine_similarity(query, row), abs=1e-6)
+
+    ranked = top_k_similar(query, matrix, 2, ids=[10, 11, 12, 13])
+    assert [note_id for note_id, _ in ranked] == [12, 10]
+    assert ranked[0][1] == pytest.approx(1.0)
+
+
+def test_repeated_embedding_is_served_from_cache_at_zero_cost() -> None:
+    text = "Rollback tooling needs an owner before the next release."
+    set_request_meta(RequestMeta(request_id="first"))
+    first = generate_embedding(text)
+    assert get_request_meta().cost.prompt_tokens > 0
+
+    set_request_meta(RequestMeta(request_id="second"))
+    assert generate_embedding("  Rollback tooling needs an owner\nbefore the next release. ") == (
+        pytest.approx(first, abs=1e-6)
+    )
+    assert get_request_meta().cost.prompt_tokens == 0
+    assert get_embedding_cache().stats().hits == 1
+
+    # A fresh process still hits the persistent SQLite tier.
+    clear_embedding_caches()
+    assert generate_embedding(text) == pytest.approx(first, abs=1e-6)
+    assert get_embedding_cache().stats().hits == 1
+
+
+def test_embedding_a_batch_writes_one_cost_row_and_reads_cache_without_writes() -> None:
+    texts = [f"Passage {index} of the rollout retrospective." for index in range(5)]
+    set_request_meta(RequestMeta(request_id="batched"))
+    embedded = embed_texts(texts)
+    connection = get_connection()
+    rows = connection.execute(
+        "SELECT prompt_tokens FROM cost_ledger WHERE request_id = 'batched'"
+    ).fetchall()
+    assert [row["prompt_tokens"] for row in rows] == [
+        sum(result.prompt_tokens for result in embedded)
+    ]
+
+    clear_embedding_caches()
+    set_request_meta(RequestMeta(request_id="cached"))
+    changes = connection.total_changes
+    cached = embed_texts(texts)
+    for first, second in zip(embedded, cached, strict=True):
+        assert second.vector == pytest.approx(first.vector, abs=1e-6)
+    assert connection.total_changes == changes
+    assert get_embedding_cache().stats().hits == len(texts)
+
+
+def test_coalescer_sends_concurrent_embeds_as_one_batch() -> None:
+    class CountingProvider(LocalHashEmbeddingProvider):
+        def __init__(self) -> None:
+            super().__init__()
+            self.batches: list[list[str]] = []
+
+        def embed_batch(self, *, texts: list[str], model: str):
+            self.batches.append(list(texts))
+            return super().embed_batch(texts=texts, model=model)
+
+    inner = CountingProvider()
+    # The window is far longer than the test, so only the eighth text sends the batch.
+    coalescer = CoalescingEmbeddingProvider(
+        inner, model="hash-emb-v1", window_seconds=60, max_batch=8
+    )
+    texts = [f"note number {index} about deployments" for index in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(lambda text: coalescer.embed(text=text, model="hash-emb-v1"), texts)
+        )
+
+    assert len(inner.batches) == 1
+    assert sorted(inner.batches[0]) == sorted(texts)
+    for text, result in zip(texts, results, strict=True):
+        assert result.vector == inner.embed(text=text, model="hash-emb-v1").vector
+        assert result.prompt_tokens > 0
+
+
+def test_identical_concurrent_embeddings_share_one_provider_call(monkeypatch) -> None:
+    calls = []
+    original_embed = LocalHashEmbeddingProvider.embed
+    original_join = embeddings._EMBEDDING_FLIGHTS._join
+    joins: list[object] = []
+    all_joined = asyncio.Event()
+
+    def counting_join(key):
+        joins.append(key)
+        if len(joins) == 3:
+            all_joined.set()
+        return original_join(key)
+
+    async def slow_aembed(self, *, text: str, model: str, timeout=None):
+        calls.append(text)
+        # Hold the leader until every request has joined its flight.
+        await asyncio.wait_for(all_joined.wait(), timeout=5)
+        return original_embed(self, text=text, model=model)
+
+    monkeypatch.setattr(embeddings._EMBEDDING_FLIGHTS, "_join", counting_join)
+    monkeypatch.setattr(LocalHashEmbeddingProvider, "aembed", slow_aembed)
+
+    async def embed_in_request(request_id: str):
+        set_request_meta(RequestMeta(request_id=request_id))
+        result = await aembed_text("Shared retry of the same voice note.")
+        return result, get_request_meta()
+
+    async def main():
+        return await asyncio.gather(*(embed_in_request(name) for name in "abc"))
+
+    outcomes = asyncio.run(main())
+    assert len(calls) == 1
+    vectors = {tuple(result.vector) for result, _ in outcomes}
+    assert len(vectors) == 1
+    assert sorted(meta.shared for _, meta in outcomes) == [[], ["embedding"], ["embedding"]]
+    assert sorted(result.prompt_tokens > 0 for result, _ in outcomes) == [False, False, True]
+
+
+def test_batch_fallback_re_embeds_cached_texts_with_the_fallback_model(monkeypatch) -> None:
+    class FlakyProvider:
+        name = "openai-embedding"
+
+        def embed(self, *, text: str, model: str, timeout=None) -> EmbeddingResult:
+            return EmbeddingResult(
+                vector=[1.0] * 8,
+                provider=self.name,
+                model=model,
+                prompt_tokens=1,
+                completion_tokens=0,
+                usd=0.0,
+            )
+
+        def embed_batch(self, *, texts: list[str], model: str, timeout=None):
+            raise RuntimeError("provider outage")
+
+    monkeypatch.setattr(
+        embeddings, "_resolve_embedding_provider", lambda: (FlakyProvider(), "large-model")
+    )
+    texts = ["Already embedded chunk.", "New chunk one.", "New chunk two."]
+    assert embed_text(texts[0]).model == "large-model"
+
+    results = embed_texts(texts)
+    assert {(result.provider, result.model) for result in results} == {
+        ("local-hash-embedding", "hash-emb-v1")
+    }
+    assert len(mean_vector([result.vector for result in results])) == 64
+
+
+def test_followers_of_a_shared_embedding_get_the_leaders_fallback_warning(monkeypatch) -> None:
+    joined = threading.Semaphore(0)
+    original_join = embeddings._EMBEDDING_FLIGHTS._join
+
+    def counting_join(key):
+        joined.release()
+        return original_join(key)
+
+    class FailingProvider:
+        name = "openai-embedding"
+
+        def embed(self, *, text: str, model: str, timeout=None) -> EmbeddingResult:
+            # Fail only once every caller has joined this flight.
+            for _ in range(3):
+                assert joined.acquire(timeout=5)
+            raise RuntimeError("provider outage")
+
+    monkeypatch.setattr(embeddings._EMBEDDING_FLIGHTS, "_join", counting_join)
+    monkeypatch.setattr(
+        embeddings, "_resolve_embedding_provider", lambda: (FailingProvider(), "large-model")
+    )
+
+    def embed_in_request(request_id: str) -> RequestMeta:
+        set_request_meta(RequestMeta(request_id=request_id))
+        embed_text("Retry of the same voice note during an outage.")
+        return get_request_meta()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        metas = list(pool.map(embed_in_request, "abc"))
+
+    assert sorted(meta.shared for meta in metas) == [[], ["embedding"], ["embedding"]]
+    for meta in metas:
+        assert meta.warnings == [
+            "External embedding call failed; local embedding fallback was used."
+        ]
+
+
+def test_sqlite_embedding_cache_evicts_least_recently_used_rows(monkeypatch) -> None:
+    clock = itertools.count(1)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    monkeypatch.setattr(embedding_cache, "_TRIM_EVERY", 1)
+    cache = EmbeddingCache(max_entries=1, max_rows=2)
+    for text in ("first", "second"):
+        cache.put(provider="local", model="m", text=text, vector=[1.0, 0.0])
+    connection = get_connection()
+    changes = connection.total_changes
+    # "first" is no longer in memory, so it is read from SQLite; lookups don't write.
+    assert cache.get(provider="local", model="m", text="first") == [1.0, 0.0]
+    assert cache.get(provider="local", model="m", text="missing") is None
+    assert connection.total_changes == changes
+    # The hit's last_used_at is written with the next insert, before it trims.
+    cache.put(provider="local", model="m", text="third", vector=[0.0, 1.0])
+
+    fresh = EmbeddingCache(max_entries=4, max_rows=2)
+    assert fresh.get(provider="local", model="m", text="second") is None
+    assert fresh.get(provider="local", model="m", text="first") == [1.0, 0.0]
+    assert fresh.get(provider="local", model="m", text="third") == [0.0, 1.0]
@@ -0,0 +1,54 @@
+from src.core.llm.breaker import get_circuit_breaker
+from src.core.llm.router import ModelRouter
+from src.core.request_context import (
+    RequestMeta,
+    begin_request,
+    end_request,
+    get_request_meta,
+    set_request_meta,
+)
+from src.core.settings import clear_settings_cache
+
+SUBSTANTIVE = (
+    "The quarterly planning session surfaced three competing priorities: migrating "
+    "billing to the new ledger service, hiring two backend engineers, and reducing "
+    "onboarding time for enterprise customers. Finance wants the ledger migration "
+    "first because reconciliation errors are growing every month."
+)
+
+
+def test_router_prefers_default_model_for_substantive_transcripts() -> None:
+    set_request_meta(RequestMeta(request_id="routing"))
+    decision = ModelRouter().decide(transcript=SUBSTANTIVE, provider="test-llm")
+    assert (decision.tier, decision.reason) == ("default", "default")
+    assert decision.model == "echo-default-v1"
+    assert get_request_meta().routing[0].reason == "default"
+
+
+def test_router_sends_short_and_low_signal_transcripts_to_cheap_model() -> None:
+    router = ModelRouter()
+    short = router.decide(transcript="Remember to call Sam.", provider="test-llm")
+    assert (short.tier, short.reason, short.model) == ("cheap", "short_transcript", "echo-cheap-v1")
+
+    filler = "yeah so like um I mean you know it was like okay and so on and so on. " * 6
+    assert router.decide(transcript=filler, provider="test-llm").reason == "low_signal"
+
+
+def test_router_sheds_load_to_cheap_model_when_overloaded_or_slow(monkeypatch) -> None:
+    monkeypatch.setenv("ECHO_NOTES_ROUTER_OVERLOAD_IN_FLIGHT", "2")
+
+    clear_settings_cache()
+    router = ModelRouter()
+    begin_request()
+    begin_request()
+    try:
+        assert router.decide(transcript=SUBSTANTIVE, provider="test-llm").reason == "overload"
+    finally:
+        end_request()
+        end_request()
+
+    breaker = get_circuit_breaker("slow-llm", track_latency=False)
+    for _ in range(5):
+        breaker.record_success(9.0)
+    assert router.decide(transcript=SUBSTANTIVE, provider="slow-llm").reason == "provider_latency"
+    assert router.decide(transcript=SUBSTANTIVE, provider="test-llm").tier == "default"
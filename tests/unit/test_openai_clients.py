@@ -0,0 +1,74 @@
+import httpx
+import openai
+import pytest
+
+from src.core.llm import clients
+from src.core.llm.clients import call_with_deadline, close_openai_clients, get_openai_client
+
+
+def test_openai_clients_are_shared_per_credentials() -> None:
+    client = get_openai_client(api_key="test-key", base_url=None)
+    assert get_openai_client(api_key="test-key", base_url=None) is client
+    assert get_openai_client(api_key="other-key", base_url=None) is not client
+
+    close_openai_clients()
+    assert client.is_closed()
+    assert get_openai_client(api_key="test-key", base_url=None) is not client
+    close_openai_clients()
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class _FakeClient:
+    def __init__(self) -> None:
+        self.timeouts: list[float] = []
+
+    def with_options(self, *, timeout: float, max_retries: int) -> "_FakeClient":
+        assert max_retries == 0
+        self.timeouts.append(timeout)
+        return self
+
+
+def test_first_attempt_gets_the_whole_budget_and_retries_use_what_is_left(monkeypatch) -> None:
+    clock = _FakeClock()
+    monkeypatch.setattr(clients, "time", clock)
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    client = _FakeClient()
+
+    def flaky(attempt: _FakeClient) -> str:
+        clock.now += 4.0
+        if len(attempt.timeouts) < 3:
+            raise openai.APIConnectionError(request=request)
+        return "ok"
+
+    assert call_with_deadline(client, 30.0, flaky) == "ok"
+    # 4s per failed attempt, then 0.5s and 1s of backoff before the retries.
+    assert client.timeouts == [30.0, 25.5, 20.5]
+
+    client = _FakeClient()
+    clock.now = 0.0
+    with pytest.raises(openai.APIConnectionError):
+        # After 4s and 0.5s of backoff, less than a second would remain.
+        call_with_deadline(client, 5.0, flaky)
+    assert client.timeouts == [5.0]
+
+    def rejected(attempt: _FakeClient) -> str:
+        response = httpx.Response(400, request=request)
+        raise openai.BadRequestError("bad request", response=response, body=None)
+
+    client = _FakeClient()
+    with pytest.raises(openai.BadRequestError):
+        call_with_deadline(client, 30.0, rejected)
+    assert len(client.timeouts) == 1
+
+    sentinel = object()
+    assert call_with_deadline(sentinel, None, lambda attempt: attempt) is sentinel
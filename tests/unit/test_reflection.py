@@ -1,4 +1,20 @@
-from src.services.reflection import reflect_transcript
+import asyncio
+import threading
+
+from src.core.llm import providers
+from src.core.llm.tokens import count_tokens, split_by_tokens
+from src.core.request_context import RequestMeta, get_request_meta, set_request_meta
+from src.core.settings import clear_settings_cache
+from src.db.engine import get_connection
+from src.schemas.reflection import Reflection
+from src.services import reflection as reflection_service
+from src.services.reflection import (
+    _ReflectionFieldParser,
+    areflect_transcript,
+    merge_reflections,
+    reflect_transcript,
+)
+from src.services.reflection_cache import clear_reflection_caches
 
 
 def test_reflection_output_structure() -> None:
@@ -16,3 +32,182 @@ def test_reflection_output_structure() -> None:
     assert isinstance(reflection.next_thoughts, list) and reflection.next_thoughts
     assert reflection.confidence in {"high", "medium", "low"}
     assert result.internal_metadata.interpretation_level in {"low", "medium"}
+
+
+def test_async_reflections_overlap_and_keep_request_meta_separate(monkeypatch) -> None:
+    both_started = asyncio.Barrier(2)
+
+    class SlowProvider(providers.LocalHeuristicLLMProvider):
+        async def agenerate(self, *, model: str, prompt: str, transcript: str, timeout=None):
+            # Only returns once both requests are inside a provider call at the same time.
+            await asyncio.wait_for(both_started.wait(), timeout=5)
+            return self.generate(model=model, prompt=prompt, transcript=transcript)
+
+    monkeypatch.setattr(
+        "src.services.reflection.resolve_llm_provider",
+        lambda: providers.ProviderResolution(provider=SlowProvider()),
+    )
+
+    async def reflect_in_request(request_id: str, transcript: str) -> RequestMeta:
+        set_request_meta(RequestMeta(request_id=request_id))
+        await areflect_transcript(transcript)
+        return get_request_meta()
+
+    async def main() -> list[RequestMeta]:
+        return await asyncio.gather(
+            reflect_in_request("a", "Short note about the deployment plan."),
+            reflect_in_request("b", "A much longer note about deployments. " * 20),
+        )
+
+    meta_a, meta_b = asyncio.run(main())
+    assert meta_a.request_id == "a" and meta_b.request_id == "b"
+    assert 0 < meta_a.cost.prompt_tokens < meta_b.cost.prompt_tokens
+
+
+def test_repeated_reflection_is_served_from_cache_at_zero_cost() -> None:
+    transcript = "The onboarding checklist is missing the database migration step."
+    set_request_meta(RequestMeta(request_id="first"))
+    first = reflect_transcript(transcript)
+    assert get_request_meta().cost.prompt_tokens > 0
+    assert get_request_meta().cache_hits == []
+
+    # Dropping the in-process LRU forces the lookup through reflection_events.
+    clear_reflection_caches()
+    set_request_meta(RequestMeta(request_id="second"))
+    second = reflect_transcript(f"  {transcript}\n")
+    meta = get_request_meta()
+    assert second.reflection == first.reflection
+    assert second.internal_metadata == first.internal_metadata
+    assert meta.cost.prompt_tokens == 0 and meta.cost.usd == 0.0
+    assert meta.cache_hits == ["reflection"]
+
+
+def test_reflection_field_parser_waits_for_complete_values() -> None:
+    content = '```json\n{"title": "Plan", "themes": ["a", "b"], "confidence": "low"}\n```'
+    parser = _ReflectionFieldParser()
+    emitted = []
+    for character in content:
+        for name, value in parser.feed(character):
+            emitted.append((name, value, parser._buffer))
+
+    assert [(name, value) for name, value, _ in emitted] == [
+        ("title", "Plan"),
+        ("themes", ["a", "b"]),
+        ("confidence", "low"),
+    ]
+    # Each field is reported once the delimiter that follows it has been seen.
+    assert [buffer[-1] for _, _, buffer in emitted] == [",", ",", "}"]
+
+
+def test_identical_concurrent_reflections_share_one_provider_call(monkeypatch) -> None:
+    calls = []
+    joined = threading.Semaphore(0)
+    original_join = reflection_service._REFLECTION_FLIGHTS._join
+
+    def counting_join(key):
+        joined.release()
+        return original_join(key)
+
+    class SlowProvider(providers.LocalHeuristicLLMProvider):
+        def generate(self, *, model: str, prompt: str, transcript: str, timeout=None):
+            calls.append(transcript)
+            # Hold the leader until every request has joined its flight.
+            for _ in range(3):
+                assert joined.acquire(timeout=5)
+            return super().generate(model=model, prompt=prompt, transcript=transcript)
+
+    monkeypatch.setattr(reflection_service._REFLECTION_FLIGHTS, "_join", counting_join)
+
+    monkeypatch.setattr(
+        "src.services.reflection.resolve_llm_provider",
+        lambda: providers.ProviderResolution(provider=SlowProvider()),
+    )
+
+    metas: dict[str, RequestMeta] = {}
+
+    def reflect_in_request(request_id: str) -> None:
+        set_request_meta(RequestMeta(request_id=request_id))
+        reflect_transcript("We double-submitted the retro notes from the web app.")
+        metas[request_id] = get_request_meta()
+
+    workers = [threading.Thread(target=reflect_in_request, args=(name,)) for name in "abc"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(calls) == 1
+    leaders = [meta for meta in metas.values() if not meta.shared]
+    followers = [meta for meta in metas.values() if meta.shared == ["reflection"]]
+    assert len(leaders) == 1 and len(followers) == 2
+    assert leaders[0].cost.prompt_tokens > 0
+    assert all(meta.cost.prompt_tokens == 0 for meta in followers)
+    ledger_rows = get_connection().execute("SELECT request_id FROM cost_ledger").fetchall()
+    assert [row["request_id"] for row in ledger_rows] == [leaders[0].request_id]
+
+
+def test_long_transcript_is_reflected_in_chunks_and_merged(monkeypatch) -> None:
+    monkeypatch.setenv("ECHO_NOTES_REFLECTION_CHUNK_TOKENS", "60")
+    clear_settings_cache()
+    transcript = " ".join(
+        f"Section {index} covers the migration plan for service {index} in detail."
+        for index in range(12)
+    )
+    chunks = split_by_tokens(transcript, 60)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+    assert " ".join(chunks) == transcript
+
+    set_request_meta(RequestMeta(request_id="chunked"))
+    reflection = reflect_transcript(transcript).reflection
+    meta = get_request_meta()
+
+    assert reflection.title and reflection.summary and reflection.themes
+    assert len(reflection.themes) <= 5 and len(reflection.questions) <= 3
+    assert any("chunks" in warning for warning in meta.warnings)
+    rows = get_connection().execute("SELECT COUNT(*) FROM cost_ledger").fetchone()[0]
+    assert rows == len(chunks)
+
+
+def test_merge_reflections_is_deterministic() -> None:
+    first = Reflection(
+        title="Migration plan",
+        summary="Part one.",
+        themes=["Latency", "Caching"],
+        questions=["Which service moves first?"],
+        next_thoughts=["List the services."],
+        confidence="high",
+    )
+    second = Reflection(
+        title="Rollout",
+        summary="Part two.",
+        themes=["caching", "Rollback"],
+        questions=["What is the rollback plan?", "Which service moves first?"],
+        next_thoughts=["Draft the rollback."],
+        confidence="medium",
+    )
+    merged = merge_reflections([first, second])
+
+    assert merged == merge_reflections([first, second])
+    assert merged.title == "Migration plan"
+    assert merged.summary == "Part one. Part two."
+    assert merged.themes == ["Caching", "Latency", "Rollback"]
+    assert merged.questions == ["Which service moves first?", "What is the rollback plan?"]
+    assert merged.confidence == "medium"
+
+
+def test_async_reflection_counts_tokens_off_the_event_loop(monkeypatch) -> None:
+    counting_threads: list[int] = []
+
+    def recording_count_tokens(text: str, model: str | None = None) -> int:
+        counting_threads.append(threading.get_ident())
+        return count_tokens(text, model)
+
+    monkeypatch.setattr(reflection_service, "count_tokens", recording_count_tokens)
+
+    async def main() -> int:
+        await areflect_transcript("Token counting should not stall other requests.")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert counting_threads and loop_thread not in counting_threads
@@ -0,0 +1,66 @@
+import io
+import itertools
+from types import SimpleNamespace
+
+from src.core.request_context import RequestMeta, get_request_meta, set_request_meta
+from src.schemas.transcript import Transcript, TranscriptMetadata
+from src.services import transcription, transcription_cache
+from src.services.transcription_cache import TranscriptionCache
+from src.services.uploads import spool_upload
+
+
+def _transcript(text: str) -> Transcript:
+    return Transcript(text=text, metadata=TranscriptMetadata(model="fake", source="fake"))
+
+
+def test_transcription_cache_evicts_least_recently_used_rows(monkeypatch) -> None:
+    clock = itertools.count(1)
+    monkeypatch.setattr(transcription_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    cache = TranscriptionCache(max_entries=2)
+    cache.put(("a", "fake", "m"), _transcript("first"))
+    cache.put(("b", "fake", "m"), _transcript("second"))
+    assert cache.get(("a", "fake", "m")) == _transcript("first")
+    cache.put(("c", "fake", "m"), _transcript("third"))
+
+    assert cache.get(("b", "fake", "m")) is None
+    assert cache.get(("a", "fake", "m-other")) is None
+    assert cache.get(("c", "fake", "m")) == _transcript("third")
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 2, 2)
+
+    disabled = TranscriptionCache(max_entries=0)
+    disabled.put(("d", "fake", "m"), _transcript("ignored"))
+    assert disabled.get(("d", "fake", "m")) is None
+
+
+def test_transcribe_spooled_reuses_transcript_for_identical_audio(monkeypatch) -> None:
+    calls: list[str] = []
+
+    class FakeProvider:
+        name = "fake"
+        model = "fake-1"
+
+        def transcribe(self, *, audio_path, filename, content_type, timeout=None) -> Transcript:
+            calls.append(filename)
+            return _transcript("Same recording, different device.")
+
+    monkeypatch.setattr(
+        transcription,
+        "_resolve_transcription_provider",
+        lambda: transcription.TranscriptionProviderResolution(provider=FakeProvider()),
+    )
+    audio = b"RIFF\x24\x00\x00\x00WAVEfmt " + bytes(range(256)) * 4
+
+    results = []
+    for filename in ("phone.wav", "laptop.wav"):
+        set_request_meta(RequestMeta(request_id=filename))
+        with spool_upload(io.BytesIO(audio), max_bytes=len(audio), chunk_bytes=64) as upload:
+            results.append(
+                transcription.transcribe_spooled(
+                    upload, filename=filename, content_type="audio/wav"
+                )
+            )
+
+    assert calls == ["phone.wav"]
+    assert results[0] == results[1]
+    assert get_request_meta().cache_hits == ["transcription"]
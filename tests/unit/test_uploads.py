@@ -0,0 +1,37 @@
+import hashlib
+import io
+import tempfile
+
+import pytest
+
+from src.services.uploads import UploadTooLargeError, sniff_audio_format, spool_upload
+
+
+def test_spool_upload_streams_hashes_and_sniffs_format() -> None:
+    content = b"RIFF\x24\x00\x00\x00WAVEfmt " + bytes(range(256)) * 40
+
+    with spool_upload(io.BytesIO(content), max_bytes=len(content), chunk_bytes=64) as upload:
+        assert upload.audio_format == "wav"
+        assert upload.path.suffix == ".wav"
+        assert upload.size == len(content)
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+        assert upload.path.read_bytes() == content
+        path = upload.path
+    assert not path.exists()
+
+    assert sniff_audio_format(b"ID3\x04\x00") == "mp3"
+    assert sniff_audio_format(b"\x00\x00\x00\x20ftypM4A ") == "m4a"
+    assert sniff_audio_format(b"plain words") is None
+
+
+def test_spool_upload_rejects_oversized_content_and_cleans_up(monkeypatch, tmp_path) -> None:
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool_dir))
+
+    with (
+        pytest.raises(UploadTooLargeError),
+        spool_upload(io.BytesIO(b"x" * 1000), max_bytes=999, chunk_bytes=100),
+    ):
+        pass
+    assert not list(spool_dir.iterdir())
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.db import vectors
+from src.services import ann_index, embeddings, vector_index
+from src.services.vector_index import VectorIndex
+
+
+@pytest.fixture(params=["numpy", "python"])
+def index(request, monkeypatch) -> VectorIndex:
+    if request.param == "numpy" and vectors.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(vector_index, "np", None)
+        monkeypatch.setattr(embeddings, "np", None)
+    return VectorIndex()
+
+
+def test_search_ranks_whole_corpus_by_cosine_similarity(index: VectorIndex) -> None:
+    index.add(1, [1.0, 0.0, 0.0])
+    for note_id in range(2, 2000):
+        index.add(note_id, [0.0, 1.0, float(note_id % 7)])
+    index.add(2000, [0.9, 0.1, 0.0])
+
+    results = index.search([1.0, 0.0, 0.0], k=2)
+
+    assert [note_id for note_id, _ in results] == [1, 2000]
+    assert results[0][1] == pytest.approx(1.0)
+    assert len(index) == 2000
+
+
+def test_search_ignores_vectors_of_other_dimensions(index: VectorIndex) -> None:
+    index.add(1, [1.0, 0.0])
+    index.add(2, [1.0, 0.0, 0.0])
+
+    assert [note_id for note_id, _ in index.search([1.0, 0.0], k=5)] == [1]
+
+
+def test_removed_vectors_are_not_returned(index: VectorIndex) -> None:
+    for note_id in range(1, 6):
+        index.add(note_id, [1.0, float(note_id)])
+
+    assert index.remove(1)
+    assert not index.remove(1)
+    assert 1 not in [note_id for note_id, _ in index.search([1.0, 1.0], k=10)]
+    assert len(index) == 4
+
+
+def test_search_reads_sqlite_at_most_once_per_sync_interval(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(vector_index, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    index = VectorIndex()
+    sync = index.sync
+    synced_at: list[float] = []
+    monkeypatch.setattr(index, "sync", lambda: synced_at.append(now[0]) or sync())
+    index.add(1, [1.0, 0.0])
+
+    for _ in range(3):
+        assert [note_id for note_id, _ in index.search([1.0, 0.0], k=5)] == [1]
+    now[0] += 2.0
+    index.search([1.0, 0.0], k=5)
+
+    assert synced_at == [100.0, 102.0]
+
+
+def test_ivf_index_persists_trains_and_tombstones(monkeypatch, tmp_path) -> None:
+    if vectors.np is None:
+        pytest.skip("numpy is not installed")
+
+    monkeypatch.setattr(ann_index, "IVF_TRAIN_THRESHOLD", 64)
+    db_path = tmp_path / "notes.db"
+    index = ann_index.open_ivf_index(db_path, nprobe=4)
+    for note_id in range(1, 101):
+        angle = note_id / 100
+        index.add(note_id, [1.0 - angle, angle, 0.25])
+
+    for store in index.stores:
+        store.join_training()
+    assert all(store.trained for store in index.stores)
+    assert index.remove(1)
+    assert not index.remove(1)
+
+    reopened = ann_index.open_ivf_index(db_path, nprobe=4)
+    assert len(reopened) == 99
+    results = reopened.stores[0].top_k([1.0, 0.0, 0.25], k=3)
+    assert 1 not in [note_id for note_id, _ in results]
+    assert results[0][0] == 2
+
+
+def test_ivf_remap_merges_new_rows_into_the_list_order(monkeypatch, tmp_path) -> None:
+    if vectors.np is None:
+        pytest.skip("numpy is not installed")
+
+    monkeypatch.setattr(ann_index, "IVF_TRAIN_THRESHOLD", 64)
+    monkeypatch.setattr(ann_index, "_REMAP_EVERY", 8)
+    index = ann_index.open_ivf_index(tmp_path / "notes.db", nprobe=2)
+    for note_id in range(1, 201):
+        angle = (note_id * 37 % 100) / 100
+        index.add(note_id, [1.0 - angle, angle, 0.25])
+        if note_id == 64:
+            index.stores[0].join_training()
+
+    store = index.stores[0]
+    lists = vectors.np.asarray(store._lists)
+    assert len(set(lists.tolist())) > 1
+    assert store._list_order.tolist() == vectors.np.argsort(lists, kind="stable").tolist()
+    assert {note_id for note_id, _ in store.top_k([1.0, 0.0, 0.25], k=2)} == {100, 200}
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from src.services.whisper_models import WhisperModelPool
+
+MB = 2**20
+
+
+def _pool(**kwargs) -> tuple[WhisperModelPool, list[object]]:
+    loaded: list[object] = []
+
+    def loader(model_name: str) -> object:
+        model = object()
+        loaded.append(model)
+        return model
+
+    kwargs.setdefault("sizer", lambda model: 300 * MB)
+    return WhisperModelPool("base", loader=loader, **kwargs), loaded
+
+
+def test_warm_up_preloads_replicas_within_the_memory_budget() -> None:
+    pool, loaded = _pool(replicas=4, memory_budget_bytes=1000 * MB)
+    assert pool.snapshot().state == "idle" and not pool.snapshot().ready
+
+    pool.warm_up()
+
+    snapshot = pool.snapshot()
+    assert len(loaded) == 3
+    assert snapshot.state == "ready" and snapshot.ready
+    assert snapshot.replicas_loaded == 3 and snapshot.replicas_target == 4
+    assert snapshot.model_memory_mb == 300.0 and snapshot.memory_budget_mb == 1000.0
+    assert pool.process_allowance(8) == 1
+
+
+def test_worker_processes_wait_for_a_measurement_and_count_against_the_budget() -> None:
+    pool, loaded = _pool(replicas=3, memory_budget_bytes=1000 * MB)
+    assert pool.process_allowance(8) == 1
+
+    with pool.acquire():
+        assert pool.process_allowance(8) == 2
+    # The two worker copies leave no room for a second in-process replica.
+    with pool.acquire(), pytest.raises(TimeoutError), pool.acquire(timeout=0):
+        pass
+    assert len(loaded) == 1 and pool.process_allowance(4) == 2
+
+
+def test_replicas_are_lent_exclusively_and_waiters_time_out() -> None:
+    pool, loaded = _pool(replicas=1, memory_budget_bytes=None)
+    pool.warm_up()
+
+    with pool.acquire() as model:
+        assert model is loaded[0]
+        assert pool.snapshot().replicas_in_use == 1
+        with pytest.raises(TimeoutError), pool.acquire(timeout=0.05):
+            pass
+
+        borrowed: list[object] = []
+
+        def borrow() -> None:
+            with pool.acquire() as waited:
+                borrowed.append(waited)
+
+        waiter = threading.Thread(target=borrow)
+        waiter.start()
+        waiter.join(0.05)
+        assert waiter.is_alive()
+    waiter.join(1)
+    assert borrowed == [loaded[0]] and len(loaded) == 1
+
+
+def test_lazy_pool_loads_on_first_acquire() -> None:
+    pool, loaded = _pool(replicas=2, memory_budget_bytes=None)
+
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first is not second
+    assert len(loaded) == 2 and pool.snapshot().replicas_loaded == 2